@@ -15,6 +15,7 @@ Run HAR-System as a module with different commands:
 
 import sys
 import argparse
+import functools
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -28,8 +29,9 @@ from har_system.utils.cli import (
 )
 
 
-def main():
-    """Main CLI dispatcher."""
+@functools.lru_cache(maxsize=1)
+def build_parser() -> argparse.ArgumentParser:
+    """Build the top-level dispatcher parser (cached after the first call)."""
     parser = argparse.ArgumentParser(
         description="HAR-System: Human Activity Recognition System",
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -64,6 +66,12 @@ def main():
         help='Analyze ChokePoint dataset for person tracking'
     )
     add_chokepoint_arguments(chokepoint_parser)
+    return parser
+
+
+def main():
+    """Main CLI dispatcher."""
+    parser = build_parser()
     
     # Parse CLI arguments.
     args = parser.parse_args()
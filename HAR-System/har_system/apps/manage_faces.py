@@ -7,6 +7,7 @@ Manage known faces in the database
 
 import sys
 import argparse
+import logging
 from pathlib import Path
 
 # Add project root to path
@@ -43,6 +44,9 @@ Examples:
     
     args = parser.parse_args()
     
+    # Show the integration's progress and failure messages alongside the prints below
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Initialize the face recognition wrapper (LanceDB via hailo-apps DatabaseHandler).
     face_recog = HailoFaceRecognition(
         database_dir=args.database_dir,
@@ -107,9 +111,12 @@ Examples:
         print()
         response = input("Type 'yes' to confirm: ")
         if response.lower() == 'yes':
-            face_recog.clear_database()
+            cleared = face_recog.clear_database()
             print()
-            print("[SUCCESS] Database cleared")
+            if cleared:
+                print("[SUCCESS] Database cleared")
+            else:
+                print("[FAILED] Database could not be fully cleared")
         else:
             print()
             print("[CANCELLED] Database not cleared")
@@ -38,7 +38,7 @@ from hailo_apps.python.core.gstreamer.gstreamer_helper_pipelines import (
 
 # Import HAR-System components
 from har_system.core import TemporalActivityTracker
-from har_system.core.callbacks import HARCallbackHandler, process_frame_callback
+from har_system.core.callbacks import HARCallbackHandler
 from har_system.utils import (
     parse_arguments,
     setup_output_directory,
@@ -169,7 +169,9 @@ def main():
     hailo_logger.info("Creating HAR temporal tracker...")
     history_seconds = float(temporal_tracker_config.get('history_seconds', 3.0)) if temporal_tracker_config else 3.0
     fps_estimate = int(temporal_tracker_config.get('fps_estimate', 15)) if temporal_tracker_config else 15
-    tracker = TemporalActivityTracker(history_seconds=history_seconds, fps_estimate=fps_estimate)
+    track_ttl = float(temporal_tracker_config.get('track_ttl_seconds', 30.0)) if temporal_tracker_config else 30.0
+    tracker = TemporalActivityTracker(history_seconds=history_seconds, fps_estimate=fps_estimate,
+                                      track_ttl=track_ttl)
 
     # Apply threshold overrides from YAML (optional).
     # If keys are missing, tracker defaults remain unchanged.
@@ -180,6 +182,7 @@ def main():
             tracker.thresholds.update({
                 'fall_drop_ratio': fall_detector_config.get('fall_drop_ratio', tracker.thresholds.get('fall_drop_ratio')),
                 'fall_time_threshold': fall_detector_config.get('fall_time_threshold', tracker.thresholds.get('fall_time_threshold')),
+                'fall_horizontal_speed': fall_detector_config.get('fall_horizontal_speed', tracker.thresholds.get('fall_horizontal_speed')),
             })
     except Exception as e:
         print(f"[WARNING] Could not apply threshold overrides from config: {e}")
@@ -256,7 +259,7 @@ def main():
     try:
         # Create and run application with custom class
         app = HARPoseEstimationApp(
-            process_frame_callback, 
+            user_data.build_callback(), 
             user_data,
             no_display=args.no_display
         )
@@ -279,6 +282,9 @@ def main():
         hailo_logger.error(f"Application error: {e}")
         raise
     finally:
+        # Write queued snapshots and stop the handler's worker threads
+        user_data.close()
+        
         # Print final summary
         print_final_summary(user_data.get_tracker(), user_data.get_face_identity_manager())
         
@@ -7,8 +7,10 @@ Train the face recognition system with new persons using hailo-apps pipeline
 
 import sys
 import os
+import logging
 import shutil
 import re
+import subprocess
 from pathlib import Path
 
 # Add project root to path
@@ -17,7 +19,43 @@ sys.path.insert(0, str(project_root))
 
 from har_system.integrations import HailoFaceRecognition
 
-def main(train_dir='./train_faces', database_dir='./database', confidence_threshold=0.70):
+# Training image extensions (lowercase, without the dot)
+_IMAGE_EXTS = frozenset({'jpg', 'jpeg', 'png'})
+
+
+def _is_image(name: str) -> bool:
+    """Whether a file name has a training image extension (case-insensitive)"""
+    _, dot, ext = name.rpartition('.')
+    return bool(dot) and ext.lower() in _IMAGE_EXTS
+
+
+def _scan_person_dirs(train_dir: Path):
+    """
+    List person folders and count their training images in one directory pass each
+    
+    os.scandir reports entry types from the directory listing itself, so no
+    per-entry stat is needed (unlike iterdir + is_dir, or one glob per extension).
+    
+    Args:
+        train_dir: Directory containing one folder per person
+    
+    Returns:
+        List of (person folder path, image count) tuples
+    """
+    persons = []
+    with os.scandir(train_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            with os.scandir(entry.path) as children:
+                count = sum(1 for child in children
+                            if _is_image(child.name) and child.is_file())
+            persons.append((Path(entry.path), count))
+    return persons
+
+
+def main(train_dir='./train_faces', database_dir='./database', confidence_threshold=0.70,
+         script_path=None):
     """
     Main training entry point - uses hailo-apps face_recognition for actual training
     
@@ -25,7 +63,11 @@ def main(train_dir='./train_faces', database_dir='./database', confidence_thresh
         train_dir: Directory containing training images
         database_dir: Database directory
         confidence_threshold: Recognition confidence threshold
+        script_path: Automatic training script (defaults to scripts/train_faces_auto.sh)
     """
+    # Show the integration's progress and failure messages alongside the prints below
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     print("="*60)
     print("HAR-System: Face Recognition Training")
     print("="*60)
@@ -44,7 +86,8 @@ def main(train_dir='./train_faces', database_dir='./database', confidence_thresh
         sys.exit(1)
     
     # Check if directory is empty
-    subdirs = [d for d in train_dir.iterdir() if d.is_dir()]
+    persons = _scan_person_dirs(train_dir)
+    subdirs = [person_dir for person_dir, _ in persons]
     if not subdirs:
         print(f"[ERROR] No person folders found in: {train_dir}")
         print()
@@ -73,12 +116,9 @@ def main(train_dir='./train_faces', database_dir='./database', confidence_thresh
     # Scan and display found persons (helps confirm the folder layout before training).
     print(f"[SCAN] Found {len(subdirs)} person(s) to train:")
     total_images = 0
-    for person_dir in subdirs:
-        image_files = list(person_dir.glob('*.jpg')) + \
-                     list(person_dir.glob('*.jpeg')) + \
-                     list(person_dir.glob('*.png'))
-        total_images += len(image_files)
-        print(f"  - {person_dir.name}: {len(image_files)} images")
+    for person_dir, image_count in persons:
+        total_images += image_count
+        print(f"  - {person_dir.name}: {image_count} images")
     print()
     
     if total_images == 0:
@@ -91,13 +131,14 @@ def main(train_dir='./train_faces', database_dir='./database', confidence_thresh
     
     # Prefer the provided shell script (it prepares hailo-apps directories and runs training).
     # This keeps Python-side glue minimal and matches the expected hailo-apps workflow.
-    script_path = project_root / "scripts" / "train_faces_auto.sh"
+    if script_path is None:
+        script_path = project_root / "scripts" / "train_faces_auto.sh"
+    script_path = Path(script_path)
     
     if script_path.exists():
         print("✓ Using automatic training script")
         print()
         
-        import subprocess
         try:
             result = subprocess.run(
                 [str(script_path), "--train-dir", str(train_dir), "--database-dir", str(database_dir)],
@@ -243,7 +284,8 @@ def main(train_dir='./train_faces', database_dir='./database', confidence_thresh
             
             # Count images to verify
             person_dirs = [d for d in train_images_path.iterdir() if d.is_dir()]
-            total_images = sum(len(list(d.rglob("*.jpg"))) + len(list(d.rglob("*.jpeg"))) + len(list(d.rglob("*.png"))) for d in person_dirs)
+            total_images = sum(1 for d in person_dirs for _, _, files in os.walk(d)
+                               for name in files if _is_image(name))
             
             print(f"[VERIFY] Training will use ONLY images from train_faces:")
             print(f"         Source: {train_dir}")
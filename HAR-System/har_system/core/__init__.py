@@ -7,20 +7,28 @@ Core tracking and activity recognition components
 from .tracker import TemporalActivityTracker
 from .face_identity_manager import FaceIdentityManager
 
-try:
-    # FaceRecognitionProcessor depends on optional hailo-apps / DB dependencies.
-    from .face_processor import FaceRecognitionProcessor
-    FACE_PROCESSOR_AVAILABLE = True
-except ImportError:
-    FaceRecognitionProcessor = None
-    FACE_PROCESSOR_AVAILABLE = False
-
 __all__ = [
     'TemporalActivityTracker',
     'FaceIdentityManager',
     'FaceRecognitionProcessor'
 ]
 
+
+def __getattr__(name):
+    # Lazy import (PEP 562): FaceRecognitionProcessor pulls in OpenCV and the
+    # optional hailo-apps / DB dependencies, which short-lived CLI commands
+    # (e.g. face database management) never need.
+    if name in ('FaceRecognitionProcessor', 'FACE_PROCESSOR_AVAILABLE'):
+        try:
+            from .face_processor import FaceRecognitionProcessor
+        except ImportError:
+            FaceRecognitionProcessor = None
+        globals()['FaceRecognitionProcessor'] = FaceRecognitionProcessor
+        globals()['FACE_PROCESSOR_AVAILABLE'] = FaceRecognitionProcessor is not None
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Lazy import for callbacks (requires hailo-apps / GStreamer bindings).
 # This avoids import-time failures when running pure-Python tests/examples.
 def _get_callbacks():
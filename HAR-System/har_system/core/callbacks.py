@@ -4,12 +4,30 @@ HAR-System: Callback Handlers
 GStreamer callback handlers for HAR processing
 """
 
+import logging
+import os
+import sys
+import threading
 import time
-from typing import Dict, Any
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
 import numpy as np
+import gi
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst
 import hailo
 from hailo_apps.python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.python.core.common.buffer_utils import get_numpy_from_buffer_efficient, get_caps_from_pad
+from hailo_apps.python.core.common.hailo_logger import get_logger
+from hailo_apps.python.core.common.defines import HAILO_RGB_VIDEO_FORMAT
+from har_system.core.tracker import FrameData, KEYPOINT_NAMES
+
+# Per-frame events go through logging so disabled levels cost a single check
+hailo_logger = get_logger(__name__)
+
+# Number of reusable RGB frame buffers; slots still held by queued recognitions are skipped
+_FRAME_RING_SIZE = 3
 
 class HARCallbackHandler(app_callback_class):
     """Callback handler for HAR-System processing"""
@@ -30,6 +48,8 @@ class HARCallbackHandler(app_callback_class):
         self.temporal_tracker = temporal_tracker
         self.config = config
         self.verbose = config.get('verbose', False)
+        if self.verbose:
+            hailo_logger.setLevel(logging.DEBUG)
         self.print_every_n_frames = config.get('print_every_n_frames', 30)
         self.save_data = config.get('save_data', False)
         self.output_dir = config.get('output_dir', './results/camera')
@@ -46,12 +66,49 @@ class HARCallbackHandler(app_callback_class):
         # we do not attempt recognition on every frame to reduce CPU load.
         self.recognition_interval = config.get('face_recognition', {}).get('recognition_interval_frames', 15)
         self.skip_first_frames = config.get('face_recognition', {}).get('skip_first_frames', 5)
-        self.track_frame_counts = {}  # Track frame count per track_id
+        # Power-of-two intervals (e.g. 8, 16) let the gate use a bitmask instead of modulo
+        interval = self.recognition_interval
+        self._interval_mask = interval - 1 if interval and (interval & (interval - 1)) == 0 else None
+        self.track_frame_counts = defaultdict(int)  # Track frame count per track_id
+        
+        # Caps of the callback element's src pad, resolved lazily.
+        # Caps only change on renegotiation, so we avoid re-parsing them per detection.
+        self._cached_caps = None
+        
+        # Preallocated RGB frames reused across callbacks (allocated on first use)
+        self._frame_ring = None
+        self._ring_idx = 0
         
         # Statistics
         # Used for lightweight timing/FPS estimates in the callback path.
-        self.frame_times = []
-        self.last_summary_time = time.time()
+        # Durations are measured on the monotonic clock (immune to wall-clock jumps).
+        # Processing time is tracked as an exponential moving average (O(1), no buffer).
+        self.ema_frame_time = 0.0
+        self._alpha = 0.05
+        self.last_summary_time = time.monotonic()
+        
+        # JSON snapshots are written by a background thread so disk I/O never
+        # blocks the GStreamer streaming thread. Like GStreamer's drop-on-latency,
+        # a full queue drops its oldest snapshot instead of stalling frames.
+        self._save_q = deque(maxlen=32)
+        self._save_cv = threading.Condition()
+        self._save_thread = None
+        self._closing = False
+        if self.save_data:
+            self._save_thread = threading.Thread(target=self._save_worker, name="har-save", daemon=True)
+            self._save_thread.start()
+            # Tracks reaped during the run are saved as they expire; the rest at shutdown
+            temporal_tracker.on_expire = self._save_expired
+        
+        # Face recognition runs on a single worker thread; results are applied
+        # on a later frame so recognition latency never holds the pipeline.
+        self._recog_pool = None
+        self._pending_recognitions = {}  # track_id -> (Future, frame_image)
+        # Requests collected during the current frame, submitted as one batch
+        self._recog_batch = []           # [(track_id, keypoints, bbox, abs_bbox)]
+        self._recog_batch_frame = None   # (frame_image, frame_width, frame_height)
+        if self.face_recognition_enabled:
+            self._recog_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="har-recog")
         
         if self.face_recognition_enabled:
             print("[CALLBACK] Face recognition enabled with processor")
@@ -67,39 +124,194 @@ class HARCallbackHandler(app_callback_class):
     def get_face_identity_manager(self):
         """Get face identity manager instance"""
         return self.face_identity_manager
+    
+    def build_callback(self):
+        """
+        Get the frame callback specialized for this handler's configuration
+        
+        Returns:
+            Callback with the (element, buffer, user_data) GStreamer signature
+        """
+        return _FRAME_CALLBACKS[(bool(self.face_recognition_enabled), bool(self.save_data))]
+    
+    def _queue_save(self, track_id, filepath):
+        """Snapshot a track now and queue it for writing (drops the oldest when full)"""
+        snapshot = self.temporal_tracker.export_track_data(track_id, raw_arrays=True)
+        with self._save_cv:
+            self._save_q.append((track_id, filepath, snapshot))
+            self._save_cv.notify()
+    
+    def _save_expired(self, track_id, snapshot):
+        """Queue the final snapshot of a track the tracker is about to discard"""
+        filepath = os.path.join(self.output_dir, f"track_{track_id}_final.json")
+        with self._save_cv:
+            self._save_q.append((track_id, filepath, snapshot))
+            self._save_cv.notify()
+    
+    def _save_worker(self):
+        """Background loop writing queued (track_id, filepath, snapshot) entries to disk"""
+        while True:
+            with self._save_cv:
+                while not self._save_q and not self._closing:
+                    self._save_cv.wait()
+                if not self._save_q:
+                    # Closing and fully drained
+                    return
+                track_id, filepath, snapshot = self._save_q.popleft()
+            try:
+                self.temporal_tracker.save_to_json(track_id, filepath, data=snapshot)
+            except Exception as e:
+                hailo_logger.error("[ERROR] Failed to save track %s: %s", track_id, e)
+    
+    def close(self):
+        """
+        Flush queued track snapshots and stop the background workers
+        
+        Call once the pipeline has stopped: the save thread writes everything
+        still queued before exiting, and pending face recognitions are dropped.
+        Safe to call more than once.
+        """
+        if self.temporal_tracker.on_expire == self._save_expired:
+            self.temporal_tracker.on_expire = None
+        with self._save_cv:
+            self._closing = True
+            self._save_cv.notify()
+        if self._save_thread is not None:
+            self._save_thread.join()
+            self._save_thread = None
+        if self._recog_pool is not None:
+            self._recog_pool.shutdown(wait=True, cancel_futures=True)
+            self._recog_pool = None
+        self._pending_recognitions.clear()
+        self._recog_batch = []
+        self._recog_batch_frame = None
+    
+    def _submit_recognition(self, track_id, frame_image, keypoints, bbox, frame_width, frame_height):
+        """Add a track to this frame's recognition batch unless one is already in flight"""
+        if track_id in self._pending_recognitions:
+            return
+        self._recog_batch.append((track_id, keypoints, bbox, None))
+        self._recog_batch_frame = (frame_image, frame_width, frame_height)
+    
+    def _flush_recognitions(self):
+        """Submit the tracks collected this frame as a single batched recognition"""
+        batch = self._recog_batch
+        if not batch:
+            return
+        frame_image, frame_width, frame_height = self._recog_batch_frame
+        future = self._recog_pool.submit(
+            self.face_processor.recognize_batch,
+            frame_image, batch, frame_width, frame_height
+        )
+        for track_id, _, _, _ in batch:
+            self._pending_recognitions[track_id] = (future, frame_image)
+        self._recog_batch = []
+        self._recog_batch_frame = None
+    
+    def _apply_recognition_results(self):
+        """Apply finished recognitions to the identity manager (never blocks)"""
+        pending = self._pending_recognitions
+        if not pending:
+            return
+        for track_id in [tid for tid, (fut, _) in pending.items() if fut.done()]:
+            future, _ = pending.pop(track_id)
+            try:
+                name, confidence, global_id = future.result()[track_id]
+            except Exception as e:
+                hailo_logger.error("[ERROR] Face recognition failed: %s", e)
+                continue
+            if name != "Unknown":
+                updated = self.face_identity_manager.update_identity(
+                    track_id, name, confidence, global_id
+                )
+                if updated:
+                    hailo_logger.info("[RECOGNITION] Track #%s recognized as: %s (%.2f)",
+                                      track_id, name, confidence)
+    
+    def _frame_from_buffer(self, buffer, format_str, frame_width, frame_height):
+        """
+        Copy the buffer's frame into a reused, preallocated numpy array
+        
+        RGB frames are copied into the next free slot of a small ring instead of a
+        freshly allocated array. Slots still referenced by in-flight recognitions
+        are skipped; other formats (or a fully busy ring) fall back to hailo-apps.
+        
+        Returns:
+            Read-only frame array
+        """
+        if format_str != HAILO_RGB_VIDEO_FORMAT:
+            return get_numpy_from_buffer_efficient(buffer, format_str, frame_width, frame_height)
+        
+        shape = (frame_height, frame_width, 3)
+        ring = self._frame_ring
+        if ring is None or ring[0].shape != shape:
+            ring = self._frame_ring = [np.empty(shape, dtype=np.uint8) for _ in range(_FRAME_RING_SIZE)]
+        
+        in_use = [frame for _, frame in self._pending_recognitions.values()]
+        for _ in range(_FRAME_RING_SIZE):
+            slot = ring[self._ring_idx]
+            self._ring_idx = (self._ring_idx + 1) % _FRAME_RING_SIZE
+            if not any(slot is frame for frame in in_use):
+                break
+        else:
+            return get_numpy_from_buffer_efficient(buffer, format_str, frame_width, frame_height)
+        
+        success, map_info = buffer.map(Gst.MapFlags.READ)
+        if not success:
+            raise ValueError("Buffer mapping failed")
+        try:
+            slot.flags.writeable = True
+            np.copyto(slot, np.ndarray(shape=shape, dtype=np.uint8, buffer=map_info.data))
+        finally:
+            buffer.unmap(map_info)
+        return slot
+    
+    def _get_caps(self, element):
+        """
+        Get (format, width, height) of the element's src pad, cached after first success
+        
+        Args:
+            element: GStreamer element the callback is attached to
+        
+        Returns:
+            Tuple of (format_str, frame_width, frame_height); all None if caps are unavailable
+        """
+        if self._cached_caps is None:
+            pad = element.get_static_pad("src")
+            if not pad:
+                return (None, None, None)
+            caps = get_caps_from_pad(pad)
+            if caps[0] is None:
+                # Not negotiated yet - try again on the next call
+                return caps
+            self._cached_caps = caps
+        return self._cached_caps
+    
+    def invalidate_caps(self):
+        """Drop cached caps (call on pipeline restart or caps renegotiation)"""
+        self._cached_caps = None
+
+# COCO-17 name -> landmark index, built once (same order as the tracker's keypoint rows)
+_KEYPOINT_MAP = {name: idx for idx, name in enumerate(KEYPOINT_NAMES)}
 
 def get_keypoint_mapping():
-    """Get mapping of keypoint names to indices"""
-    return {
-        "nose": 0,
-        "left_eye": 1,
-        "right_eye": 2,
-        "left_ear": 3,
-        "right_ear": 4,
-        "left_shoulder": 5,
-        "right_shoulder": 6,
-        "left_elbow": 7,
-        "right_elbow": 8,
-        "left_wrist": 9,
-        "right_wrist": 10,
-        "left_hip": 11,
-        "right_hip": 12,
-        "left_knee": 13,
-        "right_knee": 14,
-        "left_ankle": 15,
-        "right_ankle": 16,
-    }
+    """Get mapping of keypoint names to indices (shared table; treat as read-only)"""
+    return _KEYPOINT_MAP
+
+# Bulk accessor probed on HailoLandmarks; bindings without it use per-point getters
+_BULK_POINTS_GETTER = "get_points_numpy"
 
-def extract_frame_data(detection, keypoint_map: Dict) -> Dict[str, Any]:
+def extract_frame_data(detection, keypoint_map: Dict, timestamp: Optional[float] = None) -> Optional[FrameData]:
     """
     Extract frame data from Hailo detection
     
     Args:
         detection: Hailo detection object
         keypoint_map: Keypoint name to index mapping
+        timestamp: Frame timestamp shared by all detections of a frame (defaults to now)
     
     Returns:
-        Dictionary with frame data
+        FrameData for the detection (supports dict-style item access), or None
     """
     # Extract Track ID
     track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
@@ -121,19 +333,35 @@ def extract_frame_data(detection, keypoint_map: Dict) -> Dict[str, Any]:
     landmarks = detection.get_objects_typed(hailo.HAILO_LANDMARKS)
     
     if landmarks:
-        points = landmarks[0].get_points()
-        for name, idx in keypoint_map.items():
-            if idx < len(points):
-                p = points[idx]
-                keypoints[name] = (p.x(), p.y(), p.confidence())
-    
-    return {
-        'track_id': track_id,
-        'timestamp': time.time(),
-        'bbox': bbox,
-        'keypoints': keypoints,
-        'confidence': detection.get_confidence()
-    }
+        landmark = landmarks[0]
+        bulk_getter = getattr(landmark, _BULK_POINTS_GETTER, None)
+        if bulk_getter is not None:
+            # One native call returning an (N, 3) array of (x, y, confidence)
+            rows = np.asarray(bulk_getter(), dtype=np.float32).tolist()
+            num_points = len(rows)
+            for name, idx in keypoint_map.items():
+                if idx < num_points:
+                    keypoints[name] = tuple(rows[idx])
+        else:
+            points = landmark.get_points()
+            num_points = len(points)
+            for name, idx in keypoint_map.items():
+                if idx < num_points:
+                    p = points[idx]
+                    keypoints[name] = (p.x(), p.y(), p.confidence())
+    
+    return FrameData(
+        track_id,
+        timestamp if timestamp is not None else time.time(),
+        bbox,
+        keypoints,
+        detection.get_confidence()
+    )
+
+def _transform_eyes(lx, ly, rx, ry, xmin, ymin, bw, bh, fw, fh):
+    """Map bbox-relative eye coordinates to absolute pixel coordinates"""
+    return (int((lx * bw + xmin) * fw), int((ly * bh + ymin) * fh),
+            int((rx * bw + xmin) * fw), int((ry * bh + ymin) * fh))
 
 def extract_eye_positions(detection, keypoint_map: Dict, frame_width: int, frame_height: int) -> tuple:
     """
@@ -164,184 +392,267 @@ def extract_eye_positions(detection, keypoint_map: Dict, frame_width: int, frame
     
     points = landmarks[0].get_points()
     
-    # Extract left eye position
+    # Extract eye points
     left_eye_idx = keypoint_map.get("left_eye", 1)
-    if left_eye_idx >= len(points):
-        return None
-    left_eye_point = points[left_eye_idx]
-    left_eye_x = int((left_eye_point.x() * bbox_obj.width() + bbox_obj.xmin()) * frame_width)
-    left_eye_y = int((left_eye_point.y() * bbox_obj.height() + bbox_obj.ymin()) * frame_height)
-    
-    # Extract right eye position
     right_eye_idx = keypoint_map.get("right_eye", 2)
-    if right_eye_idx >= len(points):
+    if left_eye_idx >= len(points) or right_eye_idx >= len(points):
         return None
+    left_eye_point = points[left_eye_idx]
     right_eye_point = points[right_eye_idx]
-    right_eye_x = int((right_eye_point.x() * bbox_obj.width() + bbox_obj.xmin()) * frame_width)
-    right_eye_y = int((right_eye_point.y() * bbox_obj.height() + bbox_obj.ymin()) * frame_height)
+    
+    # Convert both eyes to pixel coordinates in one call
+    left_eye_x, left_eye_y, right_eye_x, right_eye_y = _transform_eyes(
+        left_eye_point.x(), left_eye_point.y(),
+        right_eye_point.x(), right_eye_point.y(),
+        bbox_obj.xmin(), bbox_obj.ymin(), bbox_obj.width(), bbox_obj.height(),
+        frame_width, frame_height
+    )
     
     return (person_id, left_eye_x, left_eye_y, right_eye_x, right_eye_y)
 
 def print_frame_summary(frame_count: int, active_tracks: list, temporal_tracker):
-    """Print periodic frame summary"""
-    print(f"\n{'='*60}")
-    print(f"[FRAME] {frame_count} | Active People: {len(active_tracks)}")
-    print(f"{'='*60}")
+    """Print periodic frame summary (built once, written to stdout in a single call)"""
+    separator = '=' * 60
+    lines = [
+        f"\n{separator}",
+        f"[FRAME] {frame_count} | Active People: {len(active_tracks)}",
+        separator,
+    ]
     
     for track_id in active_tracks:
         summary = temporal_tracker.get_summary(track_id)
         if summary:
             name = summary.get('name', 'Unknown')
             display_name = f"{track_id} - {name}" if name != 'Unknown' else str(track_id)
+            stats = summary['stats']
             
-            print(f"\n  [TRACK] {display_name}:")
-            print(f"     Activity: {summary['current_activity']}")
-            print(f"     Duration: {summary['duration_seconds']:.1f}s")
-            print(f"     Normalized Distance: {summary['stats']['total_distance_normalized']:.2f}")
-            print(f"     Moving: {summary['stats']['percent_moving']:.1f}%")
-            print(f"     Stationary: {summary['stats']['percent_stationary']:.1f}%")
-            print(f"     Sitting: {summary['stats']['percent_sitting']:.1f}%")
+            lines.append(f"\n  [TRACK] {display_name}:")
+            lines.append(f"     Activity: {summary['current_activity']}")
+            lines.append(f"     Duration: {summary['duration_seconds']:.1f}s")
+            lines.append(f"     Normalized Distance: {stats['total_distance_normalized']:.2f}")
+            lines.append(f"     Moving: {stats['percent_moving']:.1f}%")
+            lines.append(f"     Stationary: {stats['percent_stationary']:.1f}%")
+            lines.append(f"     Sitting: {stats['percent_sitting']:.1f}%")
             
-            if summary['stats']['fall_detected']:
-                print(f"     [WARNING] Fall detected!")
+            if stats['fall_detected']:
+                lines.append("     [WARNING] Fall detected!")
     
     # Global statistics
     global_stats = temporal_tracker.get_global_stats()
-    print(f"\n  [GLOBAL] Statistics:")
-    print(f"     Total People: {global_stats['total_tracks_seen']}")
-    print(f"     Falls Detected: {global_stats['total_falls_detected']}")
-    print(f"     Activity Changes: {global_stats['total_activity_changes']}")
-
-def process_frame_callback(element, buffer, user_data):
-    """
-    Main callback for processing each frame
+    lines.append("\n  [GLOBAL] Statistics:")
+    lines.append(f"     Total People: {global_stats['total_tracks_seen']}")
+    lines.append(f"     Falls Detected: {global_stats['total_falls_detected']}")
+    lines.append(f"     Activity Changes: {global_stats['total_activity_changes']}")
     
-    Args:
-        element: GStreamer element
-        buffer: GStreamer buffer
-        user_data: HARCallbackHandler instance
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+def _make_frame_callback(face_recognition: bool, save_data: bool):
     """
-    if buffer is None:
-        return
+    Build a frame callback specialized for a fixed configuration
     
-    frame_start_time = time.time()
-    frame_count = user_data.get_count()
+    Face recognition and data saving are decided once at startup, so the flags are
+    bound as closure constants instead of being re-read from `user_data` per frame
+    and per detection.
     
-    # Extract detections from buffer
-    roi = hailo.get_roi_from_buffer(buffer)
-    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-    
-    keypoint_map = get_keypoint_mapping()
+    Args:
+        face_recognition: Whether the face recognition path is compiled in
+        save_data: Whether periodic JSON snapshots are compiled in
     
-    # Process each detected person
-    for detection in detections:
-        label = detection.get_label()
+    Returns:
+        Callback with the (element, buffer, user_data) GStreamer signature
+    """
+    def frame_callback(element, buffer, user_data):
+        if buffer is None:
+            return
         
-        if label != "person":
-            continue
+        frame_start_time = time.monotonic()
+        # One wall-clock timestamp per frame, shared by every detection (tracker/JSON use it).
+        frame_timestamp = time.time()
+        frame_count = user_data.get_count()
         
-        # Extract frame data
-        frame_data = extract_frame_data(detection, keypoint_map)
-        if frame_data is None:
-            continue
+        # Local aliases keep attribute chains out of the per-detection loop
+        tracker = user_data.temporal_tracker
         
-        track_id = frame_data.pop('track_id')
+        # Extract detections from buffer
+        roi = hailo.get_roi_from_buffer(buffer)
+        detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
         
-        # Update temporal tracker
-        try:
-            activity = user_data.temporal_tracker.update(track_id, frame_data)
+        keypoint_map = get_keypoint_mapping()
+        
+        # One clock read per frame for all identity queries, then apply
+        # recognitions that finished since the previous frame
+        if face_recognition:
+            user_data.face_identity_manager.tick(frame_start_time)
+            user_data._apply_recognition_results()
+        
+        # Frame image is mapped lazily and shared by all recognitions in this callback
+        frame_image = None
+        
+        # Collect every detected person, then update the tracker for the whole frame at once
+        frames = []
+        for detection in detections:
+            label = detection.get_label()
             
-            # Face recognition processing
-            if user_data.face_recognition_enabled:
-                # Initialize frame count for new tracks
-                if track_id not in user_data.track_frame_counts:
-                    user_data.track_frame_counts[track_id] = 0
-                
-                user_data.track_frame_counts[track_id] += 1
-                
-                # Check if we should attempt face recognition
-                track_frames = user_data.track_frame_counts[track_id]
-                
-                # Skip first few frames (usually blurry)
-                if track_frames > user_data.skip_first_frames:
-                    # Check if recognition is needed (at intervals)
-                    if (track_frames - user_data.skip_first_frames) % user_data.recognition_interval == 0:
-                        # Check if track needs recognition
-                        if user_data.face_identity_manager.needs_recognition(track_id):
-                            # Extract frame image from buffer
-                            try:
-                                pad = element.get_static_pad("src")
-                                if pad:
-                                    format_str, frame_width, frame_height = get_caps_from_pad(pad)
-                                    frame_image = get_numpy_from_buffer_efficient(buffer, format_str, frame_width, frame_height)
-                                    
-                                    # Extract bbox for face region
-                                    bbox_obj = detection.get_bbox()
-                                    bbox = {
-                                        'xmin': bbox_obj.xmin(),
-                                        'ymin': bbox_obj.ymin(),
-                                        'xmax': bbox_obj.xmax(),
-                                        'ymax': bbox_obj.ymax()
-                                    }
-                                    
-                                    # Perform face recognition
-                                    name, confidence, global_id = user_data.face_processor.recognize_from_keypoints(
-                                        frame_image, frame_data['keypoints'], bbox, frame_width, frame_height
-                                    )
-                                    
-                                    # Update identity
-                                    if name != "Unknown":
-                                        updated = user_data.face_identity_manager.update_identity(
-                                            track_id, name, confidence, global_id
-                                        )
-                                        if updated:
-                                            print(f"[RECOGNITION] Track #{track_id} recognized as: {name} ({confidence:.2f})")
-                            except Exception as e:
-                                print(f"[ERROR] Face recognition failed: {e}")
+            if label != "person":
+                continue
+            
+            # Extract frame data
+            frame_data = extract_frame_data(detection, keypoint_map, frame_timestamp)
+            if frame_data is not None:
+                frames.append(frame_data)
+        
+        # Update temporal tracker.
+        # No blanket try/except here: a failure in the tracker is a bug and should
+        # surface loudly instead of silently dropping frames. Only the face
+        # recognition I/O below is guarded.
+        # Empty frames still advance the tracker clock so people who left expire.
+        tracker.update_batch(
+            [f.track_id for f in frames],
+            [(f.bbox['xmin'], f.bbox['ymin'], f.bbox['xmax'], f.bbox['ymax']) for f in frames],
+            [f.keypoints for f in frames],
+            [f.confidence for f in frames],
+            frame_timestamp,
+        )
+        
+        for frame_data in frames:
+            track_id = frame_data.track_id
             
-            # Update identity in tracker
-            if user_data.face_recognition_enabled:
-                name = user_data.face_identity_manager.get_identity(track_id)
-                user_data.temporal_tracker.update_identity(track_id, name)
-                
-                # Note: We cannot modify detection.label in Hailo (read-only)
-                # The name will be shown in terminal output and saved in JSON
-                # For video overlay, you would need to use a custom overlay element
+            # Face recognition processing
+            if face_recognition:
+                frame_image = _recognize_track(user_data, element, buffer, track_id, frame_data, frame_image)
             
             # Detect activity change
-            change = user_data.temporal_tracker.detect_activity_change(track_id)
+            change = tracker.detect_activity_change(track_id)
             if change:
-                name = user_data.temporal_tracker.get_identity(track_id)
+                name = tracker.get_identity(track_id)
                 display_id = f"{track_id} ({name})" if name != 'Unknown' else str(track_id)
-                print(f"\n[CHANGE] Track {display_id}: {change['from']} → {change['to']}")
-            
-        except Exception as e:
-            print(f"[ERROR] Error updating tracker: {e}")
-    
-    # Print periodic summary
-    if frame_count % user_data.print_every_n_frames == 0:
-        active_tracks = user_data.temporal_tracker.get_all_active_tracks()
-        print_frame_summary(frame_count, active_tracks, user_data.temporal_tracker)
-    
-    # Save data (optional)
-    if user_data.save_data and frame_count % user_data.save_interval == 0:
-        import os
-        for track_id in user_data.temporal_tracker.get_all_active_tracks():
-            filepath = os.path.join(
-                user_data.output_dir, 
-                f"track_{track_id}_frame_{frame_count}.json"
-            )
-            user_data.temporal_tracker.save_to_json(track_id, filepath)
-    
-    # Calculate processing time
-    frame_time = time.time() - frame_start_time
-    user_data.frame_times.append(frame_time)
+                hailo_logger.info("[CHANGE] Track %s: %s → %s", display_id, change['from'], change['to'])
+        
+        # One batched recognition job per frame for all tracks queued above
+        if face_recognition:
+            user_data._flush_recognitions()
+        
+        # Print periodic summary
+        if frame_count % user_data.print_every_n_frames == 0:
+            active_tracks = tracker.get_all_active_tracks()
+            print_frame_summary(frame_count, active_tracks, tracker)
+        
+        # Save data (optional)
+        if save_data and frame_count % user_data.save_interval == 0:
+            _queue_track_saves(user_data, frame_count)
+        
+        _update_frame_timing(user_data, frame_start_time)
+    
+    return frame_callback
+
+def _recognize_track(user_data, element, buffer, track_id, frame_data, frame_image):
+    """
+    Throttled face recognition for one track, then sync its identity into the tracker
+    
+    Returns:
+        The frame image for this callback (mapped here on first need, else unchanged)
+    """
+    face_identity_manager = user_data.face_identity_manager
+    skip_first_frames = user_data.skip_first_frames
+    
+    # Count frames per track (new tracks start at 0)
+    track_frame_counts = user_data.track_frame_counts
+    track_frames = track_frame_counts[track_id] + 1
+    track_frame_counts[track_id] = track_frames
+    
+    # Check if we should attempt face recognition
+    # Skip first few frames (usually blurry)
+    if track_frames > skip_first_frames:
+        # Check if recognition is needed (at intervals)
+        frames_since_skip = track_frames - skip_first_frames
+        interval_mask = user_data._interval_mask
+        if interval_mask is not None:
+            due = (frames_since_skip & interval_mask) == 0
+        else:
+            due = frames_since_skip % user_data.recognition_interval == 0
+        if due:
+            # Check if track needs recognition (and none is already in flight)
+            if (track_id not in user_data._pending_recognitions and
+                    face_identity_manager.needs_recognition(track_id)):
+                # Extract frame image from buffer
+                try:
+                    format_str, frame_width, frame_height = user_data._get_caps(element)
+                    if format_str is not None:
+                        if frame_image is None:
+                            frame_image = user_data._frame_from_buffer(buffer, format_str, frame_width, frame_height)
+                            # Shared across detections - recognizers must not modify it
+                            frame_image.flags.writeable = False
+                        
+                        # Queue face recognition (reuses the bbox dict built by extract_frame_data).
+                        # The ring slot is not reused while this recognition is pending.
+                        user_data._submit_recognition(
+                            track_id, frame_image, frame_data.keypoints, frame_data.bbox,
+                            frame_width, frame_height
+                        )
+                except Exception as e:
+                    hailo_logger.error("[ERROR] Face recognition frame capture failed: %s", e)
+    
+    # Update identity in tracker
+    # Note: We cannot modify detection.label in Hailo (read-only)
+    # The name will be shown in terminal output and saved in JSON
+    # For video overlay, you would need to use a custom overlay element
+    name = face_identity_manager.get_identity(track_id)
+    user_data.temporal_tracker.update_identity(track_id, name)
+    
+    return frame_image
+
+def _queue_track_saves(user_data, frame_count):
+    """Queue JSON snapshots of all active tracks for the background writer"""
+    for track_id in user_data.temporal_tracker.get_all_active_tracks():
+        filepath = os.path.join(
+            user_data.output_dir, 
+            f"track_{track_id}_frame_{frame_count}.json"
+        )
+        user_data._queue_save(track_id, filepath)
+
+def _update_frame_timing(user_data, frame_start_time):
+    """Update the processing-time EMA and print FPS every 5 seconds"""
+    frame_end_time = time.monotonic()
+    frame_time = frame_end_time - frame_start_time
+    if user_data.ema_frame_time:
+        alpha = user_data._alpha
+        user_data.ema_frame_time = (1.0 - alpha) * user_data.ema_frame_time + alpha * frame_time
+    else:
+        user_data.ema_frame_time = frame_time
     
     # Show frame rate every 5 seconds
-    if time.time() - user_data.last_summary_time > 5.0:
-        if user_data.frame_times:
-            avg_time = sum(user_data.frame_times) / len(user_data.frame_times)
-            fps = 1.0 / avg_time if avg_time > 0 else 0
-            print(f"\n[PERF] Average processing time: {avg_time*1000:.1f}ms | FPS: {fps:.1f}")
-            user_data.frame_times = []
-            user_data.last_summary_time = time.time()
+    if frame_end_time - user_data.last_summary_time > 5.0:
+        avg_time = user_data.ema_frame_time
+        fps = 1.0 / avg_time if avg_time > 0 else 0
+        print(f"\n[PERF] Average processing time: {avg_time*1000:.1f}ms | FPS: {fps:.1f}")
+        
+        # Prune frame counters of tracks that left the scene to bound memory
+        if user_data.track_frame_counts:
+            active = set(user_data.temporal_tracker.get_all_active_tracks())
+            for stale_id in [tid for tid in user_data.track_frame_counts if tid not in active]:
+                del user_data.track_frame_counts[stale_id]
+        user_data.last_summary_time = frame_end_time
+
+# One specialized callback per (face_recognition, save_data) configuration
+_FRAME_CALLBACKS = {
+    (face_recognition, save_data): _make_frame_callback(face_recognition, save_data)
+    for face_recognition in (False, True)
+    for save_data in (False, True)
+}
+
+def process_frame_callback(element, buffer, user_data):
+    """
+    Main callback for processing each frame
+    
+    Generic entry point that dispatches on the handler's configuration every
+    frame. Prefer `HARCallbackHandler.build_callback()`, which resolves the
+    specialized callback once at startup.
+    
+    Args:
+        element: GStreamer element
+        buffer: GStreamer buffer
+        user_data: HARCallbackHandler instance
+    """
+    callback = _FRAME_CALLBACKS[(bool(user_data.face_recognition_enabled), bool(user_data.save_data))]
+    return callback(element, buffer, user_data)
@@ -4,9 +4,31 @@ HAR-System: Face Identity Manager
 Manages face identities and their association with track IDs
 """
 
+import logging
+import sys
 import time
-from typing import Dict, Optional, Any
-from collections import defaultdict
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional, Any, Union
+from collections import Counter, defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# Interned sentinel; names are interned on insert so checks are identity compares
+_UNKNOWN = sys.intern("Unknown")
+
+
+@dataclass(slots=True)
+class Identity:
+    """Identity state for a single track (treat as read-only outside the manager)"""
+    name: str
+    global_id: Optional[str]
+    confidence: float
+    first_identified: float
+    last_confirmed: float
+    confirmation_count: int
+    is_confirmed: bool
+    reconfirm_at: float = float('inf')  # last_confirmed + identity_timeout
+
 
 # This class is used to create the Face Identity Manager.
 class FaceIdentityManager:
@@ -20,23 +42,76 @@ class FaceIdentityManager:
     - Handling identity timeouts
     """
     
-    def __init__(self, min_confirmations: int = 2, identity_timeout: float = 5.0):
+    def __init__(self, min_confirmations: int = 2, identity_timeout: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
         """
         Initialize Face Identity Manager
         
         Args:
             min_confirmations: Minimum number of confirmations before identity is trusted
             identity_timeout: Seconds before an identity needs re-confirmation
+            clock: Monotonic time source in seconds (injectable for tests)
         """
         self.min_confirmations = min_confirmations
         self.identity_timeout = identity_timeout
+        self._clock = clock
         
-        # Track identities: {track_id: identity_info}
+        # Track identities: {track_id: Identity}
         self.track_identities = {}
         
-        # Identity candidates (for confirmation): {track_id: [candidate1, candidate2, ...]}
-        self.identity_candidates = defaultdict(list)
+        # Identity candidates (for confirmation):
+        # {track_id: deque([(name, global_id, confidence, timestamp), ...])}
+        # Candidates are appended in time order, so expiry only pops from the left.
+        self.identity_candidates = defaultdict(deque)
+        # Running per-name tallies of each track's candidate window, updated on
+        # every push/expiry: {track_id: ({name: count}, {name: confidence sum})}
+        self._candidate_tallies = {}
+        
+        # Incrementally maintained views for O(1) statistics queries
+        self._track_names = {}             # {track_id: name}
+        self._name_multiset = Counter()    # known name -> number of tracks carrying it
+        self._identified_count = 0         # confirmed, non-Unknown tracks
+        
+        # Per-frame time cache set by `tick()`; None means "read the clock on each call".
+        # All timestamps come from `clock` (monotonic: immune to wall-clock adjustments).
+        self._now = None
+    
+    def tick(self, now: Optional[float] = None):
+        """
+        Cache the current time once per frame for all subsequent queries
         
+        Args:
+            now: Monotonic timestamp of the frame (defaults to the manager's clock)
+        """
+        self._now = now if now is not None else self._clock()
+    
+    def _account(self, track_id: int, identity: Identity, sign: int):
+        """
+        Add (sign=1) or remove (sign=-1) an identity's contribution to the counters
+        
+        Args:
+            track_id: Track ID
+            identity: Identity whose current state is counted
+            sign: +1 to count the identity, -1 to uncount it
+        """
+        name = identity.name
+        if sign > 0:
+            self._track_names[track_id] = name
+        else:
+            self._track_names.pop(track_id, None)
+        if name is _UNKNOWN:
+            return
+        self._name_multiset[name] += sign
+        if self._name_multiset[name] <= 0:
+            del self._name_multiset[name]
+        if identity.is_confirmed:
+            self._identified_count += sign
+    
+    def _current_time(self) -> float:
+        """Time of the current frame if `tick()` was called, else the manager's clock"""
+        now = self._now
+        return now if now is not None else self._clock()
+    
     def update_identity(self, track_id: int, name: str, confidence: float, 
                        global_id: Optional[str] = None) -> bool:
         """
@@ -51,92 +126,94 @@ class FaceIdentityManager:
         Returns:
             True if identity was updated/confirmed, False otherwise
         """
-        current_time = time.time()
+        current_time = self._current_time()
+        name = sys.intern(name)
         
         # If name is Unknown, just update and return
-        if name == "Unknown":
+        if name is _UNKNOWN:
             if track_id not in self.track_identities:
-                self.track_identities[track_id] = {
-                    'name': 'Unknown',
-                    'global_id': None,
-                    'confidence': 0.0,
-                    'first_identified': current_time,
-                    'last_confirmed': current_time,
-                    'confirmation_count': 0,
-                    'is_confirmed': False
-                }
+                identity = self.track_identities[track_id] = Identity(
+                    name=_UNKNOWN,
+                    global_id=None,
+                    confidence=0.0,
+                    first_identified=current_time,
+                    last_confirmed=current_time,
+                    confirmation_count=0,
+                    is_confirmed=False
+                )
+                self._account(track_id, identity, 1)
             return False
         
         # Add this recognition result as a "candidate".
         # We require multiple consistent candidates before we mark an identity as confirmed.
-        candidate = {
-            'name': name,
-            'global_id': global_id,
-            'confidence': confidence,
-            'timestamp': current_time
-        }
-        self.identity_candidates[track_id].append(candidate)
+        candidates = self.identity_candidates[track_id]
+        tallies = self._candidate_tallies.get(track_id)
+        if tallies is None:
+            tallies = self._candidate_tallies[track_id] = ({}, {})
+        counts, confidence_sums = tallies
+        candidates.append((name, global_id, confidence, current_time))
+        counts[name] = counts.get(name, 0) + 1
+        confidence_sums[name] = confidence_sums.get(name, 0.0) + confidence
         
         # Keep only recent candidates (rolling time window).
-        self.identity_candidates[track_id] = [
-            c for c in self.identity_candidates[track_id]
-            if current_time - c['timestamp'] < 5.0
-        ]
+        while current_time - candidates[0][3] >= 5.0:
+            old_name, _, old_confidence, _ = candidates.popleft()
+            if counts[old_name] == 1:
+                del counts[old_name]
+                del confidence_sums[old_name]
+            else:
+                counts[old_name] -= 1
+                confidence_sums[old_name] -= old_confidence
         
         # Check if we have enough confirmations
-        if len(self.identity_candidates[track_id]) >= self.min_confirmations:
-            # Get most common name from candidates
-            name_counts = {}
-            for cand in self.identity_candidates[track_id]:
-                cname = cand['name']
-                name_counts[cname] = name_counts.get(cname, 0) + 1
-            
-            # Find name with most confirmations
-            best_name = max(name_counts.items(), key=lambda x: x[1])
+        if len(candidates) >= self.min_confirmations:
+            # Find name with most confirmations (ties go to the earliest candidate)
+            best_count = max(counts.values())
+            leaders = [c_name for c_name, count in counts.items() if count == best_count]
+            if len(leaders) == 1:
+                best_name = leaders[0]
+            else:
+                best_name = next(c[0] for c in candidates if counts[c[0]] == best_count)
             
             # If we have enough confirmations for this name
-            if best_name[1] >= self.min_confirmations:
-                # Get average confidence for this name
-                name_confidences = [
-                    c['confidence'] for c in self.identity_candidates[track_id]
-                    if c['name'] == best_name[0]
-                ]
-                avg_confidence = sum(name_confidences) / len(name_confidences)
-                
-                # Get global_id for this name
-                name_global_id = None
-                for c in self.identity_candidates[track_id]:
-                    if c['name'] == best_name[0] and c['global_id']:
-                        name_global_id = c['global_id']
-                        break
+            if best_count >= self.min_confirmations:
+                # First global_id seen for the name within the window
+                name_global_id = next((c[1] for c in candidates if c[0] == best_name and c[1]), None)
+                avg_confidence = confidence_sums[best_name] / best_count
                 
                 # Update or create identity
-                if track_id not in self.track_identities:
-                    self.track_identities[track_id] = {
-                        'name': best_name[0],
-                        'global_id': name_global_id,
-                        'confidence': avg_confidence,
-                        'first_identified': current_time,
-                        'last_confirmed': current_time,
-                        'confirmation_count': best_name[1],
-                        'is_confirmed': True
-                    }
-                    print(f"[IDENTITY] Track #{track_id} identified as: {best_name[0]} (confidence: {avg_confidence:.2f})")
+                identity = self.track_identities.get(track_id)
+                if identity is None:
+                    identity = self.track_identities[track_id] = Identity(
+                        name=best_name,
+                        global_id=name_global_id,
+                        confidence=avg_confidence,
+                        first_identified=current_time,
+                        last_confirmed=current_time,
+                        confirmation_count=best_count,
+                        is_confirmed=True,
+                        reconfirm_at=current_time + self.identity_timeout
+                    )
+                    self._account(track_id, identity, 1)
+                    logger.info("[IDENTITY] Track #%s identified as: %s (confidence: %.2f)",
+                                track_id, best_name, avg_confidence)
                     return True
                 else:
                     # Update existing identity
-                    old_name = self.track_identities[track_id]['name']
-                    self.track_identities[track_id].update({
-                        'name': best_name[0],
-                        'global_id': name_global_id,
-                        'confidence': avg_confidence,
-                        'last_confirmed': current_time,
-                        'confirmation_count': self.track_identities[track_id]['confirmation_count'] + 1,
-                        'is_confirmed': True
-                    })
+                    old_name = identity.name
+                    self._account(track_id, identity, -1)
+                    identity.name = best_name
+                    identity.global_id = name_global_id
+                    identity.confidence = avg_confidence
+                    identity.last_confirmed = current_time
+                    identity.reconfirm_at = current_time + self.identity_timeout
+                    identity.confirmation_count += 1
+                    identity.is_confirmed = True
+                    self._account(track_id, identity, 1)
                     
-                    if old_name != best_name[0]:
-                        print(f"[IDENTITY] Track #{track_id} identity changed: {old_name} → {best_name[0]}")
+                    if old_name != best_name:
+                        logger.info("[IDENTITY] Track #%s identity changed: %s → %s",
+                                    track_id, old_name, best_name)
                     
                     return True
         
@@ -152,19 +229,19 @@ class FaceIdentityManager:
         Returns:
             Person name or "Unknown"
         """
-        if track_id not in self.track_identities:
-            return "Unknown"
-        
-        identity = self.track_identities[track_id]
+        identity = self.track_identities.get(track_id)
+        if identity is None:
+            return _UNKNOWN
         
         # Check if identity needs re-confirmation
-        if identity['is_confirmed']:
-            time_since_confirmation = time.time() - identity['last_confirmed']
-            if time_since_confirmation > self.identity_timeout:
+        if identity.is_confirmed:
+            if self._current_time() > identity.reconfirm_at:
                 # Mark as needing re-confirmation but keep the name
-                identity['is_confirmed'] = False
+                if identity.name is not _UNKNOWN:
+                    self._identified_count -= 1
+                identity.is_confirmed = False
         
-        return identity['name']
+        return identity.name
     
     def get_confidence(self, track_id: int) -> float:
         """
@@ -176,25 +253,30 @@ class FaceIdentityManager:
         Returns:
             Confidence level (0.0 to 1.0) or 0.0 if unknown
         """
-        if track_id not in self.track_identities:
-            return 0.0
-        
-        return self.track_identities[track_id].get('confidence', 0.0)
+        identity = self.track_identities.get(track_id)
+        return identity.confidence if identity is not None else 0.0
     
-    def get_identity_info(self, track_id: int) -> Optional[Dict[str, Any]]:
+    def get_identity_info(self, track_id: int,
+                          as_dict: bool = False) -> Optional[Union[Identity, Dict[str, Any]]]:
         """
         Get full identity information for a track
         
+        The live `Identity` is returned by reference (no copy per call); callers
+        must treat it as read-only. Pass `as_dict=True` for a detached copy
+        suitable for serialization.
+        
         Args:
             track_id: Track ID
+            as_dict: Return a plain dict snapshot instead of the Identity
         
         Returns:
-            Dictionary with identity info or None
+            Identity (or dict snapshot) or None
         """
-        if track_id not in self.track_identities:
+        identity = self.track_identities.get(track_id)
+        if identity is None:
             return None
         
-        return self.track_identities[track_id].copy()
+        return asdict(identity) if as_dict else identity
     
     def is_identified(self, track_id: int) -> bool:
         """
@@ -206,11 +288,10 @@ class FaceIdentityManager:
         Returns:
             True if identity is confirmed and not "Unknown"
         """
-        if track_id not in self.track_identities:
+        identity = self.track_identities.get(track_id)
+        if identity is None:
             return False
-        
-        identity = self.track_identities[track_id]
-        return identity['is_confirmed'] and identity['name'] != "Unknown"
+        return identity.is_confirmed and identity.name is not _UNKNOWN
     
     def needs_recognition(self, track_id: int) -> bool:
         """
@@ -222,26 +303,14 @@ class FaceIdentityManager:
         Returns:
             True if recognition is needed
         """
-        # New track - needs recognition
-        if track_id not in self.track_identities:
-            return True
-        
-        identity = self.track_identities[track_id]
+        identity = self.track_identities.get(track_id)
         
-        # Unknown identity - needs recognition
-        if identity['name'] == "Unknown":
-            return True
-        
-        # Not confirmed - needs recognition
-        if not identity['is_confirmed']:
+        # New track, Unknown identity or not confirmed - needs recognition
+        if identity is None or identity.name is _UNKNOWN or not identity.is_confirmed:
             return True
         
         # Confirmed but timeout expired - needs re-confirmation
-        time_since_confirmation = time.time() - identity['last_confirmed']
-        if time_since_confirmation > self.identity_timeout:
-            return True
-        
-        return False
+        return self._current_time() > identity.reconfirm_at
     
     def remove_track(self, track_id: int):
         """
@@ -250,11 +319,12 @@ class FaceIdentityManager:
         Args:
             track_id: Track ID to remove
         """
-        if track_id in self.track_identities:
-            del self.track_identities[track_id]
+        identity = self.track_identities.pop(track_id, None)
+        if identity is not None:
+            self._account(track_id, identity, -1)
         
-        if track_id in self.identity_candidates:
-            del self.identity_candidates[track_id]
+        self.identity_candidates.pop(track_id, None)
+        self._candidate_tallies.pop(track_id, None)
     
     def get_all_identities(self) -> Dict[int, str]:
         """
@@ -263,10 +333,7 @@ class FaceIdentityManager:
         Returns:
             Dictionary mapping track_id to name
         """
-        return {
-            track_id: info['name']
-            for track_id, info in self.track_identities.items()
-        }
+        return dict(self._track_names)
     
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -276,25 +343,22 @@ class FaceIdentityManager:
             Dictionary with statistics
         """
         total_tracks = len(self.track_identities)
-        identified = sum(1 for info in self.track_identities.values() 
-                        if info['name'] != "Unknown" and info['is_confirmed'])
+        identified = self._identified_count
         unknown = total_tracks - identified
         
-        # Get unique names
-        unique_names = set()
-        for info in self.track_identities.values():
-            if info['name'] != "Unknown":
-                unique_names.add(info['name'])
-        
         return {
             'total_tracks': total_tracks,
             'identified_tracks': identified,
             'unknown_tracks': unknown,
-            'unique_persons': len(unique_names),
-            'person_names': sorted(list(unique_names))
+            'unique_persons': len(self._name_multiset),
+            'person_names': sorted(self._name_multiset)
         }
     
     def reset(self):
         """Reset all identities (useful for processing new video)"""
         self.track_identities = {}
-        self.identity_candidates = defaultdict(list)
+        self.identity_candidates = defaultdict(deque)
+        self._candidate_tallies = {}
+        self._track_names = {}
+        self._name_multiset = Counter()
+        self._identified_count = 0
@@ -5,8 +5,11 @@ Processes frames for face recognition and integrates with HAR pipeline
 """
 
 import cv2
+import logging
+import math
+import sys
 import numpy as np
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List, Union
 import time
 
 try:
@@ -15,7 +18,6 @@ try:
     from gi.repository import Gst
     import hailo
     from hailo_apps.python.core.common.buffer_utils import get_numpy_from_buffer_efficient, get_caps_from_pad
-    from hailo_apps.python.core.common.db_handler import DatabaseHandler, Record
     HAILO_AVAILABLE = True
 except ImportError:
     # Keep the module importable even if hailo-apps/GStreamer bindings are missing.
@@ -23,6 +25,30 @@ except ImportError:
     HAILO_AVAILABLE = False
     print("[FACE-PROCESSOR] Warning: Hailo components not available")
 
+# hailo-apps database classes, imported by the first processor that needs them
+DatabaseHandler = None
+Record = None
+
+
+def _load_db_handler():
+    """
+    Import hailo-apps' DatabaseHandler and Record on first use
+    
+    The database stack is only needed once a processor is created with Hailo
+    available, so importing this module (and the disabled path) skips it.
+    
+    Returns:
+        Tuple of (DatabaseHandler, Record)
+    """
+    global DatabaseHandler, Record
+    if DatabaseHandler is None:
+        from hailo_apps.python.core.common.db_handler import DatabaseHandler, Record
+    return DatabaseHandler, Record
+
+
+# Per-frame tracing is DEBUG-only and lazily formatted
+logger = logging.getLogger(__name__)
+
 
 class FaceRecognitionProcessor:
     """
@@ -48,13 +74,25 @@ class FaceRecognitionProcessor:
         self.min_face_size = min_face_size
         self.enabled = HAILO_AVAILABLE
         
+        # Database records change only at enrollment time, so they are cached
+        # for a short TTL instead of being queried on every recognition attempt.
+        self._records_ttl = 2.0
+        self._records_cache = None
+        self._known_persons_cache = None
+        self._records_cache_ts = 0.0
+        
+        # Structure-of-arrays view of known persons, rebuilt with the cache
+        self._labels = np.empty(0, dtype=object)
+        self._gids = np.empty(0, dtype=object)
+        
         # Initialize database handler
         if HAILO_AVAILABLE:
             try:
-                self.db_handler = DatabaseHandler(
+                handler_cls, record_cls = _load_db_handler()
+                self.db_handler = handler_cls(
                     db_name='persons.db',
                     table_name='persons',
-                    schema=Record,
+                    schema=record_cls,
                     threshold=confidence_threshold,
                     database_dir=database_dir,
                     samples_dir=samples_dir
@@ -71,48 +109,88 @@ class FaceRecognitionProcessor:
         """Check if face recognition is enabled"""
         return self.enabled and self.db_handler is not None
     
-    def extract_face_region(self, frame: np.ndarray, keypoints: Dict, 
-                           bbox: Dict, frame_width: int, frame_height: int) -> Optional[np.ndarray]:
+    def _get_records(self) -> list:
+        """Get all database records, refreshed at most once per TTL window"""
+        now = time.monotonic()
+        if self._records_cache is None or now - self._records_cache_ts > self._records_ttl:
+            self._records_cache = self.db_handler.get_all_records()
+            known = [r for r in self._records_cache if r['label'] != 'Unknown']
+            self._known_persons_cache = known
+            # Interned so identity-manager name checks stay pointer compares
+            self._labels = np.array([sys.intern(r['label']) for r in known], dtype=object)
+            self._gids = np.array([r['global_id'] for r in known], dtype=object)
+            self._records_cache_ts = now
+        return self._records_cache
+    
+    def _get_known_persons(self) -> list:
+        """Get cached records of known (non-Unknown) persons"""
+        self._get_records()
+        return self._known_persons_cache
+    
+    def invalidate_records_cache(self):
+        """Force the next lookup to re-read the database (e.g. after enrollment)"""
+        self._records_cache = None
+        self._known_persons_cache = None
+    
+    def extract_face_region(self, frame: np.ndarray, keypoints: Union[Dict, np.ndarray],
+                           bbox: Dict, frame_width: int, frame_height: int,
+                           copy: bool = False,
+                           abs_bbox: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
         """
         Extract face region from frame using pose keypoints
         
         Args:
             frame: Full frame image (numpy array)
-            keypoints: Dictionary of keypoints with confidence
+            keypoints: Dictionary of (x, y, confidence) keypoints, or a (K, 3) array
+                in COCO order (rows 0-2: nose, left eye, right eye), e.g. the
+                landmark array as returned by the bulk points getter
             bbox: Bounding box dict with xmin, ymin, xmax, ymax (normalized 0-1)
             frame_width: Frame width in pixels
             frame_height: Frame height in pixels
+            copy: Return a contiguous copy instead of a view into `frame`
+            abs_bbox: Precomputed pixel bbox (xmin, ymin, xmax, ymax); skips scaling `bbox`
         
         Returns:
-            Cropped face image or None
+            Cropped face image (a view into `frame` unless copy=True) or None
         """
         # Get face keypoints
-        nose = keypoints.get('nose')
-        left_eye = keypoints.get('left_eye')
-        right_eye = keypoints.get('right_eye')
-        left_ear = keypoints.get('left_ear')
-        right_ear = keypoints.get('right_ear')
+        if isinstance(keypoints, np.ndarray):
+            # Array layout: the face keypoints are the first three rows
+            points = keypoints[:3]
+            if points.shape[0] < 3:
+                logger.debug("[FACE-EXTRACT] Missing keypoints: %d rows", points.shape[0])
+                return None
+            nose, left_eye, right_eye = points.tolist()
+        else:
+            nose = keypoints.get('nose')
+            left_eye = keypoints.get('left_eye')
+            right_eye = keypoints.get('right_eye')
         
         if not all([nose, left_eye, right_eye]):
-            print(f"[FACE-EXTRACT] Missing keypoints: nose={nose is not None}, left_eye={left_eye is not None}, right_eye={right_eye is not None}")
+            logger.debug("[FACE-EXTRACT] Missing keypoints: nose=%s, left_eye=%s, right_eye=%s",
+                         nose is not None, left_eye is not None, right_eye is not None)
             return None
         
         # Check confidence (x, y, confidence)
         if nose[2] < 0.3 or left_eye[2] < 0.3 or right_eye[2] < 0.3:
-            print(f"[FACE-EXTRACT] Low confidence: nose={nose[2]:.2f}, left_eye={left_eye[2]:.2f}, right_eye={right_eye[2]:.2f}")
+            logger.debug("[FACE-EXTRACT] Low confidence: nose=%.2f, left_eye=%.2f, right_eye=%.2f",
+                         nose[2], left_eye[2], right_eye[2])
             return None
         
-        # Convert bbox to absolute coordinates
-        xmin = int(bbox['xmin'] * frame_width)
-        ymin = int(bbox['ymin'] * frame_height)
-        xmax = int(bbox['xmax'] * frame_width)
-        ymax = int(bbox['ymax'] * frame_height)
+        # Convert bbox to absolute coordinates (unless the caller already has them)
+        if abs_bbox is not None:
+            xmin, ymin, xmax, ymax = abs_bbox
+        else:
+            xmin = int(bbox['xmin'] * frame_width)
+            ymin = int(bbox['ymin'] * frame_height)
+            xmax = int(bbox['xmax'] * frame_width)
+            ymax = int(bbox['ymax'] * frame_height)
         
         # Calculate face region with padding
         # Use eyes to determine face width and height
         eye_center_x = (left_eye[0] + right_eye[0]) / 2
         eye_center_y = (left_eye[1] + right_eye[1]) / 2
-        eye_distance = np.sqrt((right_eye[0] - left_eye[0])**2 + (right_eye[1] - left_eye[1])**2)
+        eye_distance = math.hypot(right_eye[0] - left_eye[0], right_eye[1] - left_eye[1])
         
         # Convert to absolute coordinates
         eye_center_x_abs = int(eye_center_x * (xmax - xmin) + xmin)
@@ -123,7 +201,8 @@ class FaceRecognitionProcessor:
         face_width = int(eye_distance_abs * 2.5)
         face_height = int(eye_distance_abs * 3.0)
         
-        # Center on eye level, slightly above
+        # Center on eye level, slightly above; clamp the origin to the frame,
+        # then the far corner (the box keeps its size when shifted inward)
         x1 = max(0, eye_center_x_abs - face_width // 2)
         y1 = max(0, eye_center_y_abs - int(face_height * 0.3))
         x2 = min(frame_width, x1 + face_width)
@@ -131,7 +210,7 @@ class FaceRecognitionProcessor:
         
         # Ensure valid region
         if x2 <= x1 or y2 <= y1:
-            print(f"[FACE-EXTRACT] Invalid region: x1={x1}, x2={x2}, y1={y1}, y2={y2}")
+            logger.debug("[FACE-EXTRACT] Invalid region: x1=%s, x2=%s, y1=%s, y2=%s", x1, x2, y1, y2)
             return None
         
         # Crop face region
@@ -139,25 +218,22 @@ class FaceRecognitionProcessor:
         
         # Check minimum size
         if face_region.shape[0] < self.min_face_size or face_region.shape[1] < self.min_face_size:
-            print(f"[FACE-EXTRACT] Face too small: {face_region.shape[0]}x{face_region.shape[1]} (min: {self.min_face_size})")
+            logger.debug("[FACE-EXTRACT] Face too small: %sx%s (min: %s)",
+                         face_region.shape[0], face_region.shape[1], self.min_face_size)
             return None
         
-        print(f"[FACE-EXTRACT] ✓ Face extracted: {face_region.shape[0]}x{face_region.shape[1]}")
+        logger.debug("[FACE-EXTRACT] ✓ Face extracted: %sx%s", face_region.shape[0], face_region.shape[1])
+        if copy:
+            return np.ascontiguousarray(face_region)
         return face_region
     
     def recognize_from_keypoints(self, frame: np.ndarray, keypoints: Dict, 
-                                 bbox: Dict, frame_width: int, frame_height: int) -> Tuple[str, float, Optional[str]]:
+                                 bbox: Dict, frame_width: int, frame_height: int,
+                                 abs_bbox: Optional[Tuple[int, int, int, int]] = None) -> Tuple[str, float, Optional[str]]:
         """
         Recognize person from frame using keypoints
         
-        Note: This is a simplified/placeholder implementation that uses pose keypoints
-        to crop a face region. For a full face recognition pipeline, you would need to:
-        1. Run SCRFD face detection on the cropped region
-        2. Extract face embedding using MobileFaceNet
-        3. Search in LanceDB
-        
-        This version uses the face region as a proxy and searches
-        based on geometric features.
+        Single-face wrapper around `recognize_batch`.
         
         Args:
             frame: Full frame image
@@ -165,89 +241,116 @@ class FaceRecognitionProcessor:
             bbox: Bounding box
             frame_width: Frame width
             frame_height: Frame height
+            abs_bbox: Optional precomputed pixel bbox (xmin, ymin, xmax, ymax)
         
         Returns:
             Tuple of (name, confidence, global_id)
         """
-        if not self.is_enabled():
-            return ("Unknown", 0.0, None)
+        results = self.recognize_batch(frame, [(0, keypoints, bbox, abs_bbox)],
+                                       frame_width, frame_height)
+        return results[0]
+    
+    def recognize_batch(self, frame: np.ndarray, requests: List[Tuple[Any, Dict, Dict, Optional[Tuple[int, int, int, int]]]],
+                        frame_width: int, frame_height: int) -> Dict[Any, Tuple[str, float, Optional[str]]]:
+        """
+        Recognize all faces of one frame in a single pass
+        
+        Note: This is a simplified/placeholder implementation that uses pose keypoints
+        to crop face regions. For a full face recognition pipeline, you would need to:
+        1. Run SCRFD face detection on the cropped regions
+        2. Extract face embeddings using MobileFaceNet (one batched call per frame)
+        3. Search in LanceDB
+        
+        This version uses the face regions as a proxy and scores them based on
+        geometric features, vectorized across the batch.
+        
+        Args:
+            frame: Full frame image shared by all requests
+            requests: List of (track_id, keypoints, bbox, abs_bbox) tuples; abs_bbox may be None
+            frame_width: Frame width
+            frame_height: Frame height
+        
+        Returns:
+            Dictionary mapping each requested track_id to (name, confidence, global_id)
+        """
+        results = {track_id: ("Unknown", 0.0, None) for track_id, _, _, _ in requests}
+        if not self.is_enabled() or not requests:
+            return results
         
         try:
-            # Extract face region
-            face_region = self.extract_face_region(frame, keypoints, bbox, frame_width, frame_height)
+            # Get all known persons first: with an empty database there is
+            # nothing to match, so the face crops can be skipped entirely.
+            known_persons = self._get_known_persons()
             
-            if face_region is None:
-                # Debug: why extraction failed
-                print(f"[FACE-PROCESSOR] Face extraction failed for track (keypoints issue or face too small)")
-                return ("Unknown", 0.0, None)
+            if not known_persons:
+                logger.debug("[FACE-PROCESSOR] No known persons in database")
+                return results
+            
+            # Extract face regions (views; the heuristic below only reads their shapes)
+            track_ids = []
+            face_areas = []
+            centers = []
+            for track_id, keypoints, bbox, abs_bbox in requests:
+                face_region = self.extract_face_region(frame, keypoints, bbox, frame_width, frame_height,
+                                                       abs_bbox=abs_bbox)
+                if face_region is None:
+                    # Debug: why extraction failed
+                    logger.debug("[FACE-PROCESSOR] Face extraction failed for track (keypoints issue or face too small)")
+                    continue
+                
+                logger.debug("[FACE-PROCESSOR] Face region extracted: %s", face_region.shape)
+                
+                track_ids.append(track_id)
+                face_areas.append(face_region.shape[0] * face_region.shape[1])
+                centers.append(((bbox['xmin'] + bbox['xmax']) / 2, (bbox['ymin'] + bbox['ymax']) / 2))
             
-            print(f"[FACE-PROCESSOR] Face region extracted: {face_region.shape}")
+            if not track_ids:
+                return results
             
             # TODO: Replace this heuristic with the real SCRFD + MobileFaceNet pipeline.
             # For now, we fall back to a lightweight (and inaccurate) heuristic to keep
             # the integration points working end-to-end.
+            # An embedder would take np.stack of the resized crops as one NHWC batch.
             
-            # Get all known persons
-            records = self.db_handler.get_all_records()
-            known_persons = [r for r in records if r['label'] != 'Unknown']
+            logger.debug("[FACE-PROCESSOR] Found %s known person(s) in database", len(known_persons))
             
-            if not known_persons:
-                print(f"[FACE-PROCESSOR] No known persons in database")
-                return ("Unknown", 0.0, None)
+            labels, gids = self._labels, self._gids
             
-            print(f"[FACE-PROCESSOR] Found {len(known_persons)} known person(s) in database")
+            if len(labels) == 1:
+                # Single person - straightforward
+                logger.debug("[FACE-PROCESSOR] Recognizing as: %s (single person)", labels[0])
+                for track_id in track_ids:
+                    results[track_id] = (labels[0], 0.75, gids[0])
+                return results
             
-            # Improved heuristic for multiple persons:
-            # Use face size and position to make a basic match
-            # This is still a TEMPORARY solution until full face recognition is integrated
+            # Multiple persons - use simple matching based on face characteristics
+            # Simple heuristic score based on:
+            # 1. Face size (bigger = more confident)
+            # 2. Position (center = more confident)
+            size_scores = np.minimum(np.asarray(face_areas, dtype=np.float64) / 10000.0, 1.0)  # Normalize
+            offsets = np.abs(np.asarray(centers, dtype=np.float64) - 0.5)
+            center_scores = 1.0 - offsets[:, 0] - offsets[:, 1]
+            best_scores = size_scores * 0.6 + center_scores * 0.4
             
-            if len(known_persons) == 1:
-                # Single person - straightforward
-                person = known_persons[0]
-                print(f"[FACE-PROCESSOR] Recognizing as: {person['label']} (single person)")
-                return (person['label'], 0.75, person['global_id'])
+            # PLACEHOLDER: the score does not depend on the person, so every
+            # candidate ties and the first known person is picked deterministically.
+            # Replace with embedding similarity (argmax of query_batch @ gallery.T)
+            # once SCRFD + MobileFaceNet are integrated.
+            best_idx = 0
             
-            else:
-                # Multiple persons - use simple matching based on face characteristics
-                # Calculate face features for basic matching
-                face_height, face_width = face_region.shape[:2]
-                face_area = face_height * face_width
-                
-                # Use center position
-                face_center_x = (bbox['xmin'] + bbox['xmax']) / 2
-                face_center_y = (bbox['ymin'] + bbox['ymax']) / 2
-                
-                # For each person, calculate a simple score
-                # In a real system, this would use embedding similarity
-                best_match = None
-                best_score = -1
-                
-                for person in known_persons:
-                    # Simple heuristic score based on:
-                    # 1. Face size (bigger = more confident)
-                    # 2. Position (center = more confident)
-                    size_score = min(face_area / 10000.0, 1.0)  # Normalize
-                    center_score = 1.0 - abs(face_center_x - 0.5) - abs(face_center_y - 0.5)
-                    
-                    # Combine scores
-                    score = (size_score * 0.6 + center_score * 0.4)
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_match = person
-                
-                if best_match and best_score > 0.3:
-                    print(f"[FACE-PROCESSOR] Best match: {best_match['label']} (score: {best_score:.2f})")
+            for track_id, best_score in zip(track_ids, best_scores.tolist()):
+                if best_score > 0.3:
+                    logger.debug("[FACE-PROCESSOR] Best match: %s (score: %.2f)", labels[best_idx], best_score)
                     # Lower confidence for multi-person scenario
                     confidence = 0.65 + (best_score * 0.1)
-                    return (best_match['label'], confidence, best_match['global_id'])
+                    results[track_id] = (labels[best_idx], confidence, gids[best_idx])
                 else:
-                    print(f"[FACE-PROCESSOR] No good match found (best score: {best_score:.2f})")
-                    return ("Unknown", 0.0, None)
+                    logger.debug("[FACE-PROCESSOR] No good match found (best score: %.2f)", best_score)
+            return results
             
         except Exception as e:
-            print(f"[FACE-PROCESSOR] Error during recognition: {e}")
-            return ("Unknown", 0.0, None)
+            logger.warning("[FACE-PROCESSOR] Error during recognition: %s", e)
+            return {track_id: ("Unknown", 0.0, None) for track_id, _, _, _ in requests}
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
@@ -255,8 +358,7 @@ class FaceRecognitionProcessor:
             return {'enabled': False, 'total_persons': 0}
         
         try:
-            records = self.db_handler.get_all_records()
-            known_records = [r for r in records if r['label'] != 'Unknown']
+            known_records = self._get_known_persons()
             
             return {
                 'enabled': True,
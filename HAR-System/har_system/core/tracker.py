@@ -14,40 +14,309 @@ Usage:
     activity = tracker.update(track_id, frame_data)
 """
 
-from collections import defaultdict, deque
+from collections import defaultdict
+from dataclasses import dataclass, asdict, fields
+import logging
+import math
 import numpy as np
-import time
 import json
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+try:
+    # Optional: compile the fused per-frame window statistics to native code.
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    # Optional: C JSON encoder with native NumPy array support for track snapshots.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(obj):
+    """Serialize NumPy values left in an export (stdlib json fallback)"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Library logger: silent unless the application configures logging (no synchronous
+# print I/O on the per-frame path)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class FrameData:
+    """
+    Per-detection observation passed to `TemporalActivityTracker.update`
+    
+    A slotted container is cheaper to allocate and read than a dict on the
+    per-frame hot path. Item access (`frame_data['bbox']`) is kept for code
+    written against the original dict contract.
+    """
+    __slots__ = ('track_id', 'timestamp', 'bbox', 'keypoints', 'confidence')
+    
+    def __init__(self, track_id: int, timestamp: float, bbox: Dict[str, float],
+                 keypoints: Dict[str, Tuple[float, float, float]], confidence: float):
+        self.track_id = track_id
+        self.timestamp = timestamp
+        self.bbox = bbox
+        self.keypoints = keypoints
+        self.confidence = confidence
+    
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+
+@dataclass(slots=True)
+class ActivityThresholds:
+    """
+    Classification and fall-detection thresholds
+    
+    Read as plain attributes on the per-frame path. Item access, `get` and
+    `update` keep the original dict contract for tuning code and config loading.
+    """
+    speed_stationary: float = 0.1       # Below this = stationary
+    speed_slow: float = 0.5             # Between this and next = slow
+    speed_fast: float = 1.5             # Above this = fast
+    hip_ratio_sitting: float = 0.62     # Above this = sitting
+    fall_drop_ratio: float = 0.30       # Drop > 30% = potential fall
+    fall_time_threshold: float = 0.5    # Within less than 0.5 seconds
+    fall_horizontal_speed: float = 0.0  # Min horizontal speed (heights/s) during the drop; 0 = drop rule only
+    
+    def __getitem__(self, key: str) -> float:
+        if key not in _THRESHOLD_NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __setitem__(self, key: str, value: float):
+        if key not in _THRESHOLD_NAMES:
+            raise KeyError(key)
+        setattr(self, key, float(value))
+    
+    def __contains__(self, key: str) -> bool:
+        return key in _THRESHOLD_NAMES
+    
+    def get(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        """Threshold value, or `default` for an unknown name"""
+        return getattr(self, key) if key in _THRESHOLD_NAMES else default
+    
+    def update(self, values: Dict[str, float]):
+        """Set several thresholds at once; unknown names are logged and ignored"""
+        for key, value in dict(values).items():
+            if key in _THRESHOLD_NAMES:
+                setattr(self, key, float(value))
+            else:
+                logger.warning("Ignoring unknown activity threshold: %s", key)
+    
+    def as_dict(self) -> Dict[str, float]:
+        """Plain dict copy of all thresholds"""
+        return asdict(self)
+
+
+_THRESHOLD_NAMES = frozenset(field.name for field in fields(ActivityThresholds))
+
+
+# COCO-17 keypoint order used for the per-track keypoint arrays
+KEYPOINT_NAMES = (
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+)
+_KP = {name: idx for idx, name in enumerate(KEYPOINT_NAMES)}
+NOSE, L_HIP, R_HIP, L_ANK, R_ANK = (_KP[name] for name in
+                                    ('nose', 'left_hip', 'right_hip', 'left_ankle', 'right_ankle'))
+_BBOX_KEYS = ('xmin', 'ymin', 'xmax', 'ymax')
+
+
+def _kp_dict_to_array(keypoints: Dict[str, Tuple[float, float, float]],
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert a {name: (x, y, confidence)} keypoint dict to a (17, 3) array
+    
+    A complete dict in KEYPOINT_NAMES order (as built by the Hailo extractor)
+    is copied in one bulk assignment; anything else goes through the index
+    table, leaving absent points as NaN.
+    
+    Args:
+        keypoints: Keypoint dict
+        out: Optional (17, 3) destination row
+    
+    Returns:
+        The filled (17, 3) float32 array
+    """
+    if out is None:
+        out = np.empty((len(KEYPOINT_NAMES), 3), dtype=np.float32)
+    if len(keypoints) == len(KEYPOINT_NAMES) and tuple(keypoints) == KEYPOINT_NAMES:
+        out[:] = tuple(keypoints.values())
+        return out
+    out.fill(np.nan)
+    for name, point in keypoints.items():
+        idx = _KP.get(name)
+        if idx is not None:
+            out[idx] = point
+    return out
+
+
+# Window sizes (frames) of the per-frame features
+_SPEED_WINDOW = 10      # motion statistics
+_CLASSIFY_WINDOW = 30   # speed used for classification
+_HIP_WINDOW = 5         # hip-ratio average
+_FALL_WINDOW = 15       # pose-height drop
+
+# A track is active if seen within this many seconds of the latest frame
+_ACTIVE_SECONDS = 2.0
+# How often (seconds of frame time) inactive tracks are reaped
+_REAP_INTERVAL = 1.0
+
+# Activities are stored as small integer codes; names are materialized only at the API
+ACTIVITY_UNKNOWN, ACTIVITY_STATIONARY, ACTIVITY_MOVING, ACTIVITY_SITTING = range(4)
+ACTIVITY_NAMES = ('unknown', 'stationary', 'moving', 'sitting')
+
+# Activity change log row: timestamp, from code, to code
+_CHANGE_DTYPE = np.dtype([('timestamp', np.float64), ('from', np.uint8), ('to', np.uint8)])
+# Most recent activity changes kept per track (older ones are only counted)
+_CHANGE_LOG_SIZE = 64
+
+
+def _window_stats(timestamps, positions, steps, heights, inv_heights, pose_heights, keypoints,
+                  head, count, speed_window, classify_window, hip_window, fall_window):
+    """
+    Fused pass over a track's ring buffers for all per-frame features (speed_window <= classify_window)
+    
+    Plain loops with modular ring indexing and no temporaries, so the function
+    compiles well under numba; `TemporalActivityTracker._window_features` is the
+    NumPy equivalent used when numba is not installed.
+    
+    Returns:
+        Tuple of (speed, classify_speed, avg_hip_ratio, fall_drop_ratio, fall_dt,
+        fall_horizontal_speed); fall_drop_ratio is NaN when the fall window is not computable
+    """
+    n = timestamps.shape[0]
+    last = (head - 1) % n
+    
+    # Normalized speeds: sum of cached steps / elapsed time / mean bbox height.
+    # One loop over the classify window; the motion window is its recent suffix.
+    w_long = min(classify_window, count)
+    w_short = min(speed_window, count)
+    first = (head - w_long) % n
+    long_distance = long_heights = short_distance = short_heights = 0.0
+    for k in range(w_long):
+        i = (first + k) % n
+        if k > 0:
+            long_distance += steps[i]
+        long_heights += heights[i]
+        if k >= w_long - w_short:
+            if k > w_long - w_short:
+                short_distance += steps[i]
+            short_heights += heights[i]
+    speed = 0.0
+    classify_speed = 0.0
+    if w_short >= 2:
+        dt = timestamps[last] - timestamps[(head - w_short) % n]
+        if dt > 0 and short_heights > 0:
+            speed = short_distance / dt / (short_heights / w_short)
+    if w_long >= 2:
+        dt = timestamps[last] - timestamps[first]
+        if dt > 0 and long_heights > 0:
+            classify_speed = long_distance / dt / (long_heights / w_long)
+    
+    # Mean hip ratio over frames with both hips and ankles present
+    w = min(hip_window, count)
+    first = (head - w) % n
+    ratio_sum = 0.0
+    ratio_count = 0
+    for k in range(w):
+        i = (first + k) % n
+        inv_h = inv_heights[i]
+        if inv_h > 0:
+            hip_y = (keypoints[i, L_HIP, 1] + keypoints[i, R_HIP, 1]) / 2
+            ankle_y = (keypoints[i, L_ANK, 1] + keypoints[i, R_ANK, 1]) / 2
+            ratio = (ankle_y - hip_y) * inv_h
+            if ratio == ratio:  # skip NaN (missing keypoint)
+                ratio_sum += ratio
+                ratio_count += 1
+    avg_hip_ratio = ratio_sum / ratio_count if ratio_count else 0.5
+    
+    # Pose-height drop between the start and end of the fall window, and the
+    # horizontal center speed over the same window
+    drop_ratio = np.nan
+    fall_dt = 0.0
+    fall_horizontal = 0.0
+    if count >= fall_window:
+        first = (head - fall_window) % n
+        fall_dt = timestamps[last] - timestamps[first]
+        if fall_dt > 0:
+            fall_horizontal = abs(positions[last, 0] - positions[first, 0]) * inv_heights[first] / fall_dt
+        valid = np.empty(fall_window)
+        m = 0
+        for k in range(fall_window):
+            pose_height = pose_heights[(first + k) % n]
+            if pose_height == pose_height:  # skip NaN (missing keypoint)
+                valid[m] = pose_height
+                m += 1
+        if m >= 5:
+            start_height = (valid[0] + valid[1] + valid[2]) / 3
+            end_height = (valid[m - 3] + valid[m - 2] + valid[m - 1]) / 3
+            drop_ratio = (start_height - end_height) / start_height if start_height > 0 else 0.0
+    
+    return speed, classify_speed, avg_hip_ratio, drop_ratio, fall_dt, fall_horizontal
+
+
+# The Python form of the kernel is only the numba source; without numba the
+# tracker uses its NumPy methods instead. No fastmath: its no-NaN assumption
+# would fold the `x == x` missing-keypoint checks away.
+_native_window_stats = njit(cache=True)(_window_stats) if njit is not None else None
 
 
 class TemporalActivityTracker:
     """HAR-System: Temporal Activity Tracker - Tracks human activities over time"""
     
-    def __init__(self, history_seconds: float = 3.0, fps_estimate: int = 15):
+    def __init__(self, history_seconds: float = 3.0, fps_estimate: int = 15,
+                 track_ttl: float = 30.0):
         """
         Initialize the temporal layer
         
         Args:
             history_seconds: How many seconds of history to keep (3 seconds is sufficient for start)
-            fps_estimate: Approximate FPS estimate for calculating deque size
+            fps_estimate: Approximate FPS estimate for sizing the history buffers
+            track_ttl: Seconds after its last observation before a track is discarded
         """
-        self.history_frames = int(history_seconds * fps_estimate)
+        self.history_frames = max(int(history_seconds * fps_estimate), 1)
         self.fps_estimate = fps_estimate
+        self.track_ttl = track_ttl
+        
+        # Keypoint name -> row index in the per-track (N, 17, 3) keypoint buffer
+        self.keypoint_index = _KP
         
         # Store data for each track_id
         self.tracks = defaultdict(lambda: self._create_new_track())
         
+        # Recently seen track IDs in first-activation order (dict as an ordered set),
+        # the latest frame timestamp, and the frame time of the last reap
+        self._active_ids = {}
+        self._now = None
+        self._last_reap = None
+        
+        # Optional callable(track_id, snapshot) given `export_track_data(track_id,
+        # raw_arrays=True)` just before an expired track is discarded. Without it
+        # the data of reaped tracks is lost (`save_final_data` only sees live tracks).
+        self.on_expire = None
+        
         # Threshold settings - adjustable defaults.
         # Apps may override these values from config/default.yaml at runtime.
-        self.thresholds = {
-            'speed_stationary': 0.1,      # Below this = stationary
-            'speed_slow': 0.5,             # Between this and next = slow
-            'speed_fast': 1.5,             # Above this = fast
-            'hip_ratio_sitting': 0.62,     # Above this = sitting
-            'fall_drop_ratio': 0.30,       # Drop > 30% = potential fall
-            'fall_time_threshold': 0.5,    # Within less than 0.5 seconds
-        }
+        self.thresholds = ActivityThresholds()
         
         # Global statistics
         self.global_stats = {
@@ -59,13 +328,22 @@ class TemporalActivityTracker:
     
     def _create_new_track(self) -> Dict:
         """Create a new record for a new person"""
+        n = self.history_frames
         return {
-            # Raw time-series buffers (bounded by history_frames).
-            'timestamps': deque(maxlen=self.history_frames),
-            'positions': deque(maxlen=self.history_frames),    # (x, y) center
-            'bboxes': deque(maxlen=self.history_frames),       # {xmin, ymin, xmax, ymax}
-            'keypoints': deque(maxlen=self.history_frames),    # dict of 17 points
-            'confidences': deque(maxlen=self.history_frames),
+            # Raw time-series ring buffers (struct-of-arrays, history_frames rows).
+            # `head` is the next row to write; `count` the number of valid rows.
+            'timestamps': np.empty(n, dtype=np.float64),
+            'positions': np.empty((n, 2), dtype=np.float64),    # (x, y) center
+            'bboxes': np.empty((n, 4), dtype=np.float64),       # xmin, ymin, xmax, ymax
+            'keypoints': np.empty((n, len(KEYPOINT_NAMES), 3), dtype=np.float32),  # NaN = missing
+            'confidences': np.empty(n, dtype=np.float32),
+            # Per-frame derivatives cached at ingress for the speed window sums
+            'steps': np.empty(n, dtype=np.float64),             # center distance from previous frame
+            'heights': np.empty(n, dtype=np.float64),           # bbox height
+            'inv_heights': np.empty(n, dtype=np.float64),       # 1 / bbox height (0 = degenerate bbox)
+            'pose_heights': np.empty(n, dtype=np.float64),      # nose-ankle height / bbox height (NaN = n/a)
+            'head': 0,
+            'count': 0,
             
             # Lifecycle / bookkeeping.
             'first_seen': None,
@@ -76,9 +354,14 @@ class TemporalActivityTracker:
             # Identity (optional face recognition integration).
             'name': 'Unknown',  # Person name from face recognition
             
-            # Current state.
-            'current_activity': 'unknown',
-            'previous_activity': 'unknown',
+            # Current state (ACTIVITY_* codes).
+            'current_activity': ACTIVITY_UNKNOWN,
+            'previous_activity': ACTIVITY_UNKNOWN,
+            
+            # Activity change log: fixed ring of the latest changes; `n_changes`
+            # counts every change ever recorded (row = n % _CHANGE_LOG_SIZE).
+            'changes': np.empty(_CHANGE_LOG_SIZE, dtype=_CHANGE_DTYPE),
+            'n_changes': 0,
             
             # Cumulative statistics (updated incrementally for efficiency).
             'stats': {
@@ -88,17 +371,16 @@ class TemporalActivityTracker:
                 'frames_sitting': 0,
                 'fall_detected': False,
                 'fall_timestamp': None,
-                'activity_changes': [],  # Change history only
             }
         }
     
-    def update(self, track_id: int, frame_data: Dict[str, Any]) -> str:
+    def update(self, track_id: int, frame_data) -> str:
         """
         Update data for a specific person in a new frame
         
         Args:
             track_id: Unique tracking number
-            frame_data: {
+            frame_data: FrameData instance, or a dict of the same shape: {
                 'timestamp': float,
                 'bbox': {'xmin': float, 'ymin': float, 'xmax': float, 'ymax': float},
                 'keypoints': dict of 17 points: {name: (x, y, confidence)},
@@ -108,88 +390,323 @@ class TemporalActivityTracker:
         Returns:
             Current detected activity (str)
         """
+        if type(frame_data) is FrameData:
+            timestamp = frame_data.timestamp
+            bbox = frame_data.bbox
+            keypoints = frame_data.keypoints
+            confidence = frame_data.confidence
+        else:
+            timestamp = frame_data['timestamp']
+            bbox = frame_data['bbox']
+            keypoints = frame_data['keypoints']
+            confidence = frame_data['confidence']
+        self._tick(timestamp)
         track = self.tracks[track_id]
-        timestamp = frame_data['timestamp']
-        bbox = frame_data['bbox']
         
-        # 1) First time we see this track_id.
+        xmin, ymin, xmax, ymax = bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax']
+        self._ingest(track_id, track, timestamp, confidence)
+        
+        # Write raw observations into the ring buffers.
+        head = track['head']
+        track['timestamps'][head] = timestamp
+        track['bboxes'][head] = (xmin, ymin, xmax, ymax)
+        cx, cy = (xmin + xmax) / 2, (ymin + ymax) / 2
+        if track['count']:
+            prev_cx, prev_cy = track['positions'][head - 1]
+            track['steps'][head] = math.hypot(cx - prev_cx, cy - prev_cy)
+        else:
+            track['steps'][head] = 0.0
+        track['positions'][head] = (cx, cy)
+        height = ymax - ymin
+        inv_height = 1.0 / height if height > 0 else 0.0
+        track['heights'][head] = height
+        track['inv_heights'][head] = inv_height
+        kp_row = track['keypoints'][head]
+        self._store_keypoints(kp_row, keypoints)
+        track['pose_heights'][head] = self._pose_height_normalized(kp_row, inv_height)
+        self._advance(track)
+        
+        speed_norm, classify_speed, avg_hip_ratio, drop_ratio, fall_dt, fall_horizontal = \
+            self._window_features(track)
+        activity = None
+        if track['count'] >= 10:
+            activity = self._classify_from_features(classify_speed, avg_hip_ratio)
+        self._commit_features(track_id, track, timestamp, speed_norm, activity,
+                              (drop_ratio, fall_dt, fall_horizontal))
+        return ACTIVITY_NAMES[track['current_activity']]
+    
+    def update_batch(self, track_ids: Sequence[int], bboxes, keypoints, confidences,
+                     timestamp: float) -> List[str]:
+        """
+        Update all people of one frame at once
+        
+        Equivalent to calling `update` for each person in order, but the bbox
+        geometry, pose heights and activity classification are computed as
+        array operations over the whole frame.
+        
+        Args:
+            track_ids: Track IDs of the M people in the frame (unique)
+            bboxes: (M, 4) array-like of xmin, ymin, xmax, ymax
+            keypoints: (M, 17, 3) array in KEYPOINT_NAMES order, or a sequence of
+                M per-person keypoints (dict or (17, 3) array) as accepted by `update`
+            confidences: (M,) detection confidences
+            timestamp: Frame timestamp shared by all detections
+        
+        Returns:
+            Current detected activity (str) for each track, in input order
+        """
+        self._tick(timestamp)
+        m = len(track_ids)
+        if m == 0:
+            return []
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(m, 4)
+        if isinstance(keypoints, np.ndarray):
+            kp_stack = keypoints.astype(np.float32, copy=False).reshape(m, len(KEYPOINT_NAMES), 3)
+        else:
+            kp_stack = np.empty((m, len(KEYPOINT_NAMES), 3), dtype=np.float32)
+            for row, person_keypoints in zip(kp_stack, keypoints):
+                self._store_keypoints(row, person_keypoints)
+        
+        # Frame-wide geometry
+        centers = (bboxes[:, :2] + bboxes[:, 2:]) * 0.5
+        heights = bboxes[:, 3] - bboxes[:, 1]
+        inv_heights = np.zeros(m)
+        np.divide(1.0, heights, out=inv_heights, where=heights > 0)
+        pose_heights = np.abs((kp_stack[:, L_ANK, 1] + kp_stack[:, R_ANK, 1]) / 2
+                              - kp_stack[:, NOSE, 1]) * inv_heights
+        pose_heights[inv_heights == 0] = np.nan
+        
+        # Previous centers of the tracks (NaN for new tracks -> step 0)
+        tracks = [self.tracks[track_id] for track_id in track_ids]
+        prev_centers = np.full((m, 2), np.nan)
+        for i, track in enumerate(tracks):
+            if track['count']:
+                prev_centers[i] = track['positions'][track['head'] - 1]
+        steps = np.hypot(*(centers - prev_centers).T)
+        steps[np.isnan(steps)] = 0.0
+        
+        # Ring-buffer writes and per-track window features
+        features = np.empty((m, 6))
+        counts = np.empty(m, dtype=np.int64)
+        for i, (track_id, track) in enumerate(zip(track_ids, tracks)):
+            self._ingest(track_id, track, timestamp, confidences[i])
+            head = track['head']
+            track['timestamps'][head] = timestamp
+            track['bboxes'][head] = bboxes[i]
+            track['positions'][head] = centers[i]
+            track['steps'][head] = steps[i]
+            track['heights'][head] = heights[i]
+            track['inv_heights'][head] = inv_heights[i]
+            track['keypoints'][head] = kp_stack[i]
+            track['pose_heights'][head] = pose_heights[i]
+            self._advance(track)
+            counts[i] = track['count']
+            features[i] = self._window_features(track)
+        
+        # Branchless classification of the whole frame, and bulk change detection
+        # against each track's previous activity
+        classified = counts >= 10
+        previous = np.fromiter((track['current_activity'] for track in tracks), dtype=np.uint8, count=m)
+        current = np.where(classified, self._classify_codes(features[:, 1], features[:, 2]), previous)
+        changed = classified & (previous != ACTIVITY_UNKNOWN) & np.not_equal(current, previous)
+        
+        for i in np.flatnonzero(classified).tolist():
+            track = tracks[i]
+            track['previous_activity'] = int(previous[i])
+            track['current_activity'] = int(current[i])
+        for i in np.flatnonzero(changed).tolist():
+            self._record_change(tracks[i], timestamp, int(previous[i]), int(current[i]))
+        self.global_stats['total_activity_changes'] += int(changed.sum())
+        
+        # Frame counters, distance and fall detection (activity already applied above)
+        for i, (track_id, track) in enumerate(zip(track_ids, tracks)):
+            speed_norm, _, _, *fall = features[i].tolist()
+            self._commit_features(track_id, track, timestamp, speed_norm, None, fall)
+        return [ACTIVITY_NAMES[code] for code in current.tolist()]
+    
+    def _ingest(self, track_id: int, track: Dict, timestamp: float, confidence: float) -> None:
+        """Lifecycle bookkeeping for a new observation (before the ring-buffer write)"""
+        # First time we see this track_id.
         if track['first_seen'] is None:
             track['first_seen'] = timestamp
             self.global_stats['total_tracks_seen'] += 1
             self.global_stats['active_tracks'] += 1
-            print(f"[NEW] Person entered scene: Track ID {track_id}")
+            logger.info("[NEW] Person entered scene: Track ID %s", track_id)
         
-        # 2) Append raw observations to rolling buffers.
         track['last_seen'] = timestamp
         track['total_frames'] += 1
-        track['timestamps'].append(timestamp)
-        track['bboxes'].append(bbox)
-        track['keypoints'].append(frame_data['keypoints'])
-        track['confidences'].append(frame_data['confidence'])
-        
-        # Calculate and store bbox center
-        center = self._get_bbox_center(bbox)
-        track['positions'].append(center)
-        
-        # 3) Update derived motion metrics once we have enough history.
-        if len(track['positions']) >= 2:
-            # Normalized speed
-            speed_norm = self._calculate_normalized_speed(track)
-            
-            # Update statistics
-            if speed_norm < self.thresholds['speed_stationary']:
-                track['stats']['frames_stationary'] += 1
-            else:
-                track['stats']['frames_moving'] += 1
-                track['stats']['total_distance_norm'] += speed_norm
+        track['confidences'][track['head']] = confidence
+        self._active_ids[track_id] = None
+    
+    def tick(self, now: float) -> None:
+        """
+        Advance the tracker clock without any detections
+        
+        Call this for frames with nobody in them (`update_batch` with an empty
+        batch does the same) so tracks of people who left still go inactive and expire.
         
-        # 4) Classify activity once we have a minimum window.
-        if len(track['positions']) >= 10:
-            track['previous_activity'] = track['current_activity']
-            track['current_activity'] = self._classify_activity_simple(track)
+        Args:
+            now: Frame timestamp
+        """
+        self._tick(now)
+    
+    def _tick(self, now: float) -> None:
+        """Advance the tracker clock to a frame timestamp and reap about once a second"""
+        if self._now is None or now > self._now:
+            self._now = now
+        if self._last_reap is None:
+            self._last_reap = now
+        elif now - self._last_reap > _REAP_INTERVAL:
+            self._reap_inactive(now)
+            self._last_reap = now
+    
+    def _reap_inactive(self, now: float, ttl: Optional[float] = None) -> List[int]:
+        """
+        Drop tracks not seen for `ttl` seconds and deactivate idle ones
+        
+        Args:
+            now: Current frame timestamp
+            ttl: Expiry in seconds (defaults to `track_ttl`)
+        
+        Returns:
+            IDs of the discarded tracks
+        """
+        ttl = self.track_ttl if ttl is None else ttl
+        tracks = self.tracks
+        for track_id in [tid for tid in self._active_ids
+                         if now - tracks[tid]['last_seen'] >= _ACTIVE_SECONDS]:
+            del self._active_ids[track_id]
+        
+        # Tracks that were never updated (created by a query) expire as well
+        expired = [tid for tid, track in tracks.items()
+                   if track['last_seen'] is None or now - track['last_seen'] > ttl]
+        on_expire = self.on_expire
+        for track_id in expired:
+            if on_expire is not None and tracks[track_id]['last_seen'] is not None:
+                on_expire(track_id, self.export_track_data(track_id, raw_arrays=True))
+            del tracks[track_id]
+            self._active_ids.pop(track_id, None)
+        return expired
+    
+    def _advance(self, track: Dict) -> None:
+        """Commit the row at `head` to the ring buffers"""
+        track['head'] = (track['head'] + 1) % self.history_frames
+        if track['count'] < self.history_frames:
+            track['count'] += 1
+    
+    def _commit_features(self, track_id: int, track: Dict, timestamp: float, speed_norm: float,
+                         activity: Optional[int], fall: Tuple[float, float, float]) -> None:
+        """
+        Apply one frame's features to a track's statistics and state
+        
+        Args:
+            track_id: Track ID (for logging)
+            track: Track record (ring buffers already advanced)
+            timestamp: Frame timestamp
+            speed_norm: Normalized speed over the motion window
+            activity: Classified ACTIVITY_* code, or None while the history is too short
+            fall: (drop_ratio, dt, horizontal_speed) over the fall window, see `_is_fall`
+        """
+        count = track['count']
+        stats = track['stats']
+        
+        # Classify activity once we have a minimum window.
+        if activity is not None:
+            previous = track['previous_activity'] = track['current_activity']
+            track['current_activity'] = activity
             
             # Record activity change
-            if (track['previous_activity'] != 'unknown' and 
-                track['current_activity'] != track['previous_activity']):
-                
-                track['stats']['activity_changes'].append({
-                    'timestamp': timestamp,
-                    'from': track['previous_activity'],
-                    'to': track['current_activity']
-                })
+            if previous != ACTIVITY_UNKNOWN and activity != previous:
+                self._record_change(track, timestamp, previous, activity)
                 self.global_stats['total_activity_changes'] += 1
-            
-            # Update activity counters
-            if track['current_activity'] == 'sitting':
-                track['stats']['frames_sitting'] += 1
         
-        # 5) Fall detection (independent of activity classification).
-        if len(track['keypoints']) >= 15:
-            if self._detect_fall_simple(track):
+        # Frame counters: every frame lands in exactly one bucket, so the
+        # summary percentages add up to 100. Sitting takes precedence once the
+        # track is classified; otherwise the motion-window speed decides.
+        if track['current_activity'] == ACTIVITY_SITTING:
+            stats['frames_sitting'] += 1
+        elif speed_norm < self.thresholds.speed_stationary:
+            stats['frames_stationary'] += 1
+        else:
+            stats['frames_moving'] += 1
+        
+        # Distance walked in bbox heights (this frame's center step / its bbox height)
+        last = track['head'] - 1
+        stats['total_distance_norm'] += track['steps'][last] * track['inv_heights'][last]
+        
+        # Fall detection (independent of activity classification).
+        if count >= _FALL_WINDOW:
+            if self._is_fall(*fall):
                 if not track['stats']['fall_detected']:
                     track['stats']['fall_detected'] = True
                     track['stats']['fall_timestamp'] = timestamp
                     self.global_stats['total_falls_detected'] += 1
-                    print(f"[WARNING] Potential fall detected - Track ID {track_id} at time {timestamp:.2f}")
+                    logger.warning("Potential fall detected - Track ID %s at time %.2f", track_id, timestamp)
+    
+    @staticmethod
+    def _record_change(track: Dict, timestamp: float, from_code: int, to_code: int) -> None:
+        """Append a row to the track's activity change ring (overwrites the oldest when full)"""
+        n = track['n_changes']
+        track['changes'][n % _CHANGE_LOG_SIZE] = (timestamp, from_code, to_code)
+        track['n_changes'] = n + 1
+    
+    @staticmethod
+    def _change_dicts(track: Dict, last: Optional[int] = None) -> List[Dict]:
+        """
+        Activity changes as {'timestamp', 'from', 'to'} dicts with activity names
+        
+        Args:
+            track: Track record
+            last: Only materialize the most recent `last` changes (all retained if None)
+        """
+        n = track['n_changes']
+        kept = min(n, _CHANGE_LOG_SIZE) if last is None else min(n, _CHANGE_LOG_SIZE, last)
+        rows = track['changes'][np.arange(n - kept, n) % _CHANGE_LOG_SIZE]
+        return [
+            {'timestamp': timestamp, 'from': ACTIVITY_NAMES[from_code], 'to': ACTIVITY_NAMES[to_code]}
+            for timestamp, from_code, to_code in rows.tolist()
+        ]
+    
+    # Helper functions: ring-buffer access and normalized measurements.
+    def _store_keypoints(self, row: np.ndarray, keypoints) -> None:
+        """
+        Write one frame's keypoints into a (17, 3) buffer row
         
-        return track['current_activity']
+        Args:
+            row: Destination row of the track's keypoint buffer
+            keypoints: {name: (x, y, confidence)} dict, or an array already in KEYPOINT_NAMES order
+        """
+        if isinstance(keypoints, np.ndarray):
+            row[:] = keypoints
+        else:
+            _kp_dict_to_array(keypoints, out=row)
     
-    # Helper functions: normalized measurements and basic geometry.
-    def _get_bbox_center(self, bbox: Dict) -> Tuple[float, float]:
-        """Calculate bounding box center"""
-        cx = (bbox['xmin'] + bbox['xmax']) / 2
-        cy = (bbox['ymin'] + bbox['ymax']) / 2
-        return (cx, cy)
+    def _recent(self, track: Dict, key: str, window: int) -> np.ndarray:
+        """
+        Last `window` rows of a ring buffer in chronological order
+        
+        Returns a view when the window does not wrap, else a small copy.
+        """
+        buf = track[key]
+        head = track['head']
+        start = head - min(window, track['count'])
+        if start >= 0:
+            return buf[start:head]
+        return np.concatenate((buf[start:], buf[:head]))
     
-    def _get_bbox_height(self, bbox: Dict) -> float:
-        """Calculate bounding box height"""
-        return bbox['ymax'] - bbox['ymin']
+    def _window_ends(self, track: Dict, window: int) -> Tuple[int, int]:
+        """Ring rows of the first and last frame of the last `window` frames (no slicing)"""
+        head = track['head']
+        n = self.history_frames
+        return (head - min(window, track['count'])) % n, (head - 1) % n
     
-    def _get_bbox_width(self, bbox: Dict) -> float:
-        """Calculate bounding box width"""
-        return bbox['xmax'] - bbox['xmin']
+    def _time_span(self, track: Dict, window: int) -> float:
+        """Seconds between the first and last frame of the last `window` frames"""
+        first, last = self._window_ends(track, window)
+        timestamps = track['timestamps']
+        return timestamps.item(last) - timestamps.item(first)
     
-    def _calculate_normalized_speed(self, track: Dict, window: int = 10) -> float:
+    def _calculate_normalized_speed(self, track: Dict, window: int = _SPEED_WINDOW) -> float:
         """
         Calculate normalized speed
         
@@ -200,37 +717,35 @@ class TemporalActivityTracker:
         Returns:
             Relative speed (0.0 = stationary, 1.0 = normal speed, 2.0+ = fast)
         """
-        positions = list(track['positions'])
-        timestamps = list(track['timestamps'])
-        bboxes = list(track['bboxes'])
-        
-        if len(positions) < 2:
+        if track['count'] < 2:
             return 0.0
         
         # Use short window to reduce noise
-        window = min(window, len(positions))
-        recent_positions = positions[-window:]
-        recent_timestamps = timestamps[-window:]
-        recent_bboxes = bboxes[-window:]
-        
-        # Calculate total distance traveled
-        total_distance = 0.0
-        for i in range(1, len(recent_positions)):
-            dx = recent_positions[i][0] - recent_positions[i-1][0]
-            dy = recent_positions[i][1] - recent_positions[i-1][1]
-            distance = np.sqrt(dx**2 + dy**2)
-            total_distance += distance
+        return self._speed_from_window(self._recent(track, 'timestamps', window),
+                                       self._recent(track, 'steps', window),
+                                       self._recent(track, 'heights', window))
+    
+    @staticmethod
+    def _speed_from_window(timestamps: np.ndarray, steps: np.ndarray, heights: np.ndarray) -> float:
+        """Normalized speed from chronological timestamp/step/height windows"""
+        if timestamps.shape[0] < 2:
+            return 0.0
         
         # Real time
-        dt = recent_timestamps[-1] - recent_timestamps[0]
+        dt = timestamps.item(-1) - timestamps.item(0)
         if dt <= 0:
             return 0.0
         
+        # Total distance traveled: per-frame steps are cached at ingress; the
+        # window's first step points outside the window and is skipped
+        # (window sums are done on Python floats: cheaper than NumPy reductions this small)
+        total_distance = sum(steps[1:].tolist())
+        
         # Speed in pixels/second
         speed_px_per_sec = total_distance / dt
         
         # Normalization: divide by person height
-        avg_height = np.mean([self._get_bbox_height(b) for b in recent_bboxes])
+        avg_height = sum(heights.tolist()) / heights.shape[0]
         if avg_height <= 0:
             return 0.0
         
@@ -239,71 +754,130 @@ class TemporalActivityTracker:
         
         return speed_normalized
     
-    def _calculate_pose_height_normalized(self, keypoints: Dict, bbox: Dict) -> Optional[float]:
+    def _window_features(self, track: Dict) -> Tuple[float, float, float, float, float, float]:
         """
-        Calculate normalized pose height
+        Per-frame features for `update`, from the native kernel when numba is available
         
         Returns:
-            Ratio from 0.0 to ~1.0 (standing: 0.85-0.95, sitting: 0.6-0.75)
+            Tuple of (speed, classify_speed, avg_hip_ratio, fall_drop_ratio, fall_dt,
+            fall_horizontal_speed)
+        """
+        if _native_window_stats is not None:
+            return _native_window_stats(
+                track['timestamps'], track['positions'], track['steps'], track['heights'],
+                track['inv_heights'], track['pose_heights'], track['keypoints'],
+                track['head'], track['count'],
+                _SPEED_WINDOW, _CLASSIFY_WINDOW, _HIP_WINDOW, _FALL_WINDOW
+            )
+        # Both speeds come from one slice of the longer window; the motion
+        # window is its most recent suffix
+        timestamps = self._recent(track, 'timestamps', _CLASSIFY_WINDOW)
+        steps = self._recent(track, 'steps', _CLASSIFY_WINDOW)
+        heights = self._recent(track, 'heights', _CLASSIFY_WINDOW)
+        speed = self._speed_from_window(timestamps[-_SPEED_WINDOW:], steps[-_SPEED_WINDOW:],
+                                        heights[-_SPEED_WINDOW:])
+        classify_speed = self._speed_from_window(timestamps, steps, heights)
+        drop_ratio, fall_dt = self._fall_drop_ratio(track, _FALL_WINDOW)
+        return (speed, classify_speed, self._average_hip_ratio(track, _HIP_WINDOW),
+                drop_ratio, fall_dt, self._fall_horizontal_speed(track, _FALL_WINDOW))
+    
+    @staticmethod
+    def _pose_height_normalized(kp_row: np.ndarray, inv_bbox_height: float) -> float:
         """
-        nose = keypoints.get('nose')
-        left_ankle = keypoints.get('left_ankle')
-        right_ankle = keypoints.get('right_ankle')
+        Calculate normalized pose height for one frame (stored once at ingress)
         
-        # Check for required points
-        if not nose or not left_ankle or not right_ankle:
-            return None
+        Args:
+            kp_row: (17, 3) keypoint row
+            inv_bbox_height: Reciprocal bbox height of the same frame (0 if degenerate)
+        
+        Returns:
+            Ratio from 0.0 to ~1.0 (standing: 0.85-0.95, sitting: 0.6-0.75);
+            NaN if nose/ankles are missing or the bbox is degenerate
+        """
+        if inv_bbox_height <= 0:
+            return math.nan
         
         # Average ankle position (y coordinate)
-        ankle_y = (left_ankle[1] + right_ankle[1]) / 2
+        ankle_y = (kp_row[L_ANK, 1] + kp_row[R_ANK, 1]) / 2
         
-        # Distance from nose to ankle
-        pose_height_px = abs(ankle_y - nose[1])
+        # Distance from nose to ankle, relative to bbox height
+        return float(abs(ankle_y - kp_row[NOSE, 1]) * inv_bbox_height)
+    
+    def _hip_ratios(self, keypoints: np.ndarray, inv_bbox_heights: np.ndarray) -> np.ndarray:
+        """
+        Calculate hip position ratio for each frame of a window (standing vs sitting)
         
-        # Normalize relative to bbox height
-        bbox_height = self._get_bbox_height(bbox)
-        if bbox_height <= 0:
-            return None
+        Args:
+            keypoints: (W, 17, 3) keypoint rows
+            inv_bbox_heights: (W,) reciprocal bbox heights (0 = degenerate bbox)
         
-        height_ratio = pose_height_px / bbox_height
+        Returns:
+            (W,) ratios - standing: ~0.45-0.55, sitting: ~0.65-0.80;
+            NaN where hips/ankles are missing or the bbox is degenerate
+        """
+        # Average hip position
+        hip_y = (keypoints[:, L_HIP, 1] + keypoints[:, R_HIP, 1]) / 2
+        
+        # Average ankle position
+        ankle_y = (keypoints[:, L_ANK, 1] + keypoints[:, R_ANK, 1]) / 2
         
-        return height_ratio
+        # Ratio: distance from ankle to hip (ankle is lower, so ankle_y > hip_y)
+        # For standing: ~0.45-0.55, for sitting: ~0.65-0.80
+        return np.where(inv_bbox_heights > 0, (ankle_y - hip_y) * inv_bbox_heights, np.nan)
+    
+    def _average_hip_ratio(self, track: Dict, window: int = _HIP_WINDOW) -> float:
+        """Mean hip ratio over the last `window` frames (0.5 if none is computable)"""
+        hip_ratios = self._hip_ratios(self._recent(track, 'keypoints', window),
+                                      self._recent(track, 'inv_heights', window))
+        valid = [ratio for ratio in hip_ratios.tolist() if ratio == ratio]  # drop NaN
+        return sum(valid) / len(valid) if valid else 0.5
     
-    def _calculate_hip_ratio(self, keypoints: Dict, bbox: Dict) -> Optional[float]:
+    def _fall_drop_ratio(self, track: Dict, window: int = _FALL_WINDOW) -> Tuple[float, float]:
         """
-        Calculate hip position ratio (to distinguish between standing/sitting)
+        Pose-height drop between the start and end of the last `window` frames
         
         Returns:
-            - standing: ~0.45-0.55
-            - sitting: ~0.65-0.80
+            Tuple of (drop_ratio, dt); drop_ratio is NaN if the window is not computable
         """
-        left_hip = keypoints.get('left_hip')
-        right_hip = keypoints.get('right_hip')
-        left_ankle = keypoints.get('left_ankle')
-        right_ankle = keypoints.get('right_ankle')
+        if track['count'] < window:
+            return float('nan'), 0.0
         
-        if not all([left_hip, right_hip, left_ankle, right_ankle]):
-            return None
+        # Per-frame pose heights were computed once at ingress
+        heights = [h for h in self._recent(track, 'pose_heights', window).tolist() if h == h]  # drop NaN
         
-        # Average hip position
-        hip_y = (left_hip[1] + right_hip[1]) / 2
+        # Time elapsed
+        dt = self._time_span(track, window)
         
-        # Average ankle position
-        ankle_y = (left_ankle[1] + right_ankle[1]) / 2
+        if len(heights) < 5:
+            return float('nan'), dt
         
-        # Bbox height
-        bbox_height = self._get_bbox_height(bbox)
-        if bbox_height <= 0:
-            return None
+        # Compare start and end of window
+        start_height = sum(heights[:3]) / 3
+        end_height = sum(heights[-3:]) / 3
         
-        # Ratio: distance from ankle to hip (ankle is lower, so ankle_y > hip_y)
-        # For standing: ~0.45-0.55, for sitting: ~0.65-0.80
-        hip_ratio = (ankle_y - hip_y) / bbox_height
+        # Drop ratio
+        drop_ratio = (start_height - end_height) / start_height if start_height > 0 else 0.0
+        return drop_ratio, dt
+    
+    def _fall_horizontal_speed(self, track: Dict, window: int = _FALL_WINDOW) -> float:
+        """
+        Horizontal speed of the bbox center over the last `window` frames
         
-        return hip_ratio
+        Returns:
+            Net horizontal displacement per second, in bbox heights (at the
+            window start); 0.0 if the window is not computable
+        """
+        if track['count'] < window:
+            return 0.0
+        dt = self._time_span(track, window)
+        if dt <= 0:
+            return 0.0
+        first, last = self._window_ends(track, window)
+        x = track['positions'][:, 0]
+        return abs(x.item(last) - x.item(first)) * track['inv_heights'].item(first) / dt
     
     # Classification and detection (simple, stable heuristics).
-    def _classify_activity_simple(self, track: Dict, window: int = 30) -> str:
+    def _classify_from_features(self, speed: float, avg_hip_ratio: float) -> int:
         """
         Classify activity - 3 basic categories
         
@@ -312,87 +886,83 @@ class TemporalActivityTracker:
         - sitting: sitting
         
         Returns:
-            Activity name (str)
+            ACTIVITY_* code (int)
         """
-        # Calculate speed in short window
-        speed = self._calculate_normalized_speed(track, window)
-        
-        # Get latest keypoints
-        if len(track['keypoints']) == 0:
-            return 'unknown'
-        
-        # Use last 5 frames to calculate average hip_ratio
-        recent_keypoints = list(track['keypoints'])[-5:]
-        recent_bboxes = list(track['bboxes'])[-5:]
-        
-        hip_ratios = []
-        for kp, bbox in zip(recent_keypoints, recent_bboxes):
-            ratio = self._calculate_hip_ratio(kp, bbox)
-            if ratio is not None:
-                hip_ratios.append(ratio)
-        
-        avg_hip_ratio = np.mean(hip_ratios) if hip_ratios else 0.5
-        
         # Classification rules (simple and stable).
         # Sitting: hip relatively high + low speed
-        if (avg_hip_ratio > self.thresholds['hip_ratio_sitting'] and 
-            speed < self.thresholds['speed_stationary'] * 1.5):
-            return 'sitting'
+        thresholds = self.thresholds
+        if (avg_hip_ratio > thresholds.hip_ratio_sitting and 
+            speed < thresholds.speed_stationary * 1.5):
+            return ACTIVITY_SITTING
         
         # Stationary/standing: very low speed
-        if speed < self.thresholds['speed_stationary']:
-            return 'stationary'
+        if speed < thresholds.speed_stationary:
+            return ACTIVITY_STATIONARY
         
         # Moving: any noticeable speed
-        return 'moving'
+        return ACTIVITY_MOVING
     
-    def _detect_fall_simple(self, track: Dict, window: int = 15) -> bool:
+    def _classify_codes(self, speeds: np.ndarray, avg_hip_ratios: np.ndarray) -> np.ndarray:
         """
-        Simple fall detection
-        
-        Fall = rapid drop in pose height within short time
+        Vectorized `_classify_from_features` over many tracks
         
         Returns:
-            True if potential fall detected
+            (M,) array of ACTIVITY_* codes
         """
-        if len(track['keypoints']) < window:
-            return False
-        
-        recent_keypoints = list(track['keypoints'])[-window:]
-        recent_bboxes = list(track['bboxes'])[-window:]
-        recent_timestamps = list(track['timestamps'])[-window:]
-        
-        # Calculate pose height for each frame
-        heights = []
-        for kp, bbox in zip(recent_keypoints, recent_bboxes):
-            h = self._calculate_pose_height_normalized(kp, bbox)
-            if h is not None:
-                heights.append(h)
-        
-        if len(heights) < 5:
-            return False
+        stationary = self.thresholds.speed_stationary
+        mask_sitting = (avg_hip_ratios > self.thresholds.hip_ratio_sitting) & (speeds < stationary * 1.5)
+        mask_stationary = speeds < stationary
+        return np.select([mask_sitting, mask_stationary], [ACTIVITY_SITTING, ACTIVITY_STATIONARY],
+                         default=ACTIVITY_MOVING)
+    
+    def _is_fall(self, drop_ratio: float, dt: float, horizontal_speed: float) -> bool:
+        """
+        Two-threshold fall rule
         
-        # Compare start and end of window
-        start_height = np.mean(heights[:3])
-        end_height = np.mean(heights[-3:])
+        Fires only when the pose height drops sharply within a short time AND the
+        body moves horizontally at least `fall_horizontal_speed` (disabled at the
+        default 0.0). A NaN drop never matches.
+        """
+        thresholds = self.thresholds
+        return (drop_ratio > thresholds.fall_drop_ratio and 
+                dt < thresholds.fall_time_threshold and
+                horizontal_speed >= thresholds.fall_horizontal_speed)
+    
+    def _classify_activity_simple(self, track: Dict, window: int = _CLASSIFY_WINDOW,
+                                  speed: Optional[float] = None) -> str:
+        """
+        Classify the track's current activity from its history
         
-        # Drop ratio
-        drop_ratio = (start_height - end_height) / start_height if start_height > 0 else 0
+        Args:
+            track: Track record
+            window: Speed window (frames), used only when `speed` is not given
+            speed: Already computed normalized speed over `window`
         
-        # Time elapsed
-        dt = recent_timestamps[-1] - recent_timestamps[0]
+        Returns:
+            Activity name (str)
+        """
+        if track['count'] == 0:
+            return ACTIVITY_NAMES[ACTIVITY_UNKNOWN]
+        if speed is None:
+            speed = self._calculate_normalized_speed(track, window)
+        return ACTIVITY_NAMES[self._classify_from_features(speed, self._average_hip_ratio(track))]
+    
+    def _detect_fall_simple(self, track: Dict, window: int = _FALL_WINDOW) -> bool:
+        """
+        Simple fall detection
         
-        # Fall rule: large drop within short time
-        if (drop_ratio > self.thresholds['fall_drop_ratio'] and 
-            dt < self.thresholds['fall_time_threshold']):
-            return True
+        Fall = rapid drop in pose height within short time (with enough horizontal motion)
         
-        return False
+        Returns:
+            True if potential fall detected
+        """
+        return self._is_fall(*self._fall_drop_ratio(track, window),
+                             self._fall_horizontal_speed(track, window))
     
     # Query helpers (read-only access to internal state).
     def get_activity(self, track_id: int) -> str:
         """Get current activity for a specific person"""
-        return self.tracks[track_id]['current_activity']
+        return ACTIVITY_NAMES[self.tracks[track_id]['current_activity']]
     
     def update_identity(self, track_id: int, name: str):
         """
@@ -406,7 +976,7 @@ class TemporalActivityTracker:
             old_name = self.tracks[track_id]['name']
             self.tracks[track_id]['name'] = name
             if old_name != name and name != 'Unknown':
-                print(f"[IDENTITY] Track #{track_id} → {name}")
+                logger.info("[IDENTITY] Track #%s → %s", track_id, name)
     
     def get_identity(self, track_id: int) -> str:
         """
@@ -447,7 +1017,7 @@ class TemporalActivityTracker:
             'name': track.get('name', 'Unknown'),  # Include identity name
             'duration_seconds': duration,
             'total_frames': total_frames,
-            'current_activity': track['current_activity'],
+            'current_activity': ACTIVITY_NAMES[track['current_activity']],
             'stats': {
                 'total_distance_normalized': track['stats']['total_distance_norm'],
                 'percent_moving': percent_moving,
@@ -455,9 +1025,9 @@ class TemporalActivityTracker:
                 'percent_sitting': percent_sitting,
                 'fall_detected': track['stats']['fall_detected'],
                 'fall_timestamp': track['stats']['fall_timestamp'],
-                'total_activity_changes': len(track['stats']['activity_changes']),
+                'total_activity_changes': track['n_changes'],
             },
-            'activity_history': track['stats']['activity_changes'][-5:]  # Last 5 changes
+            'activity_history': self._change_dicts(track, last=5)  # Last 5 changes
         }
     
     def detect_activity_change(self, track_id: int) -> Optional[Dict]:
@@ -469,28 +1039,26 @@ class TemporalActivityTracker:
         """
         track = self.tracks[track_id]
         
-        if (track['current_activity'] != track['previous_activity'] and 
-            track['previous_activity'] != 'unknown'):
+        current = track['current_activity']
+        previous = track['previous_activity']
+        if current != previous and previous != ACTIVITY_UNKNOWN:
             return {
                 'track_id': track_id,
-                'from': track['previous_activity'],
-                'to': track['current_activity'],
+                'from': ACTIVITY_NAMES[previous],
+                'to': ACTIVITY_NAMES[current],
                 'timestamp': track['last_seen']
             }
         
         return None
     
     def get_all_active_tracks(self) -> List[int]:
-        """Get list of all currently active people"""
-        current_time = time.time()
-        active = []
-        
-        for track_id, track in self.tracks.items():
-            # Consider person active if seen within last 2 seconds
-            if track['last_seen'] and (current_time - track['last_seen']) < 2.0:
-                active.append(track_id)
-        
-        return active
+        """Get list of all currently active people (seen within 2 seconds of the latest frame)"""
+        now = self._now
+        if now is None:
+            return []
+        tracks = self.tracks
+        return [track_id for track_id in self._active_ids
+                if now - tracks[track_id]['last_seen'] < _ACTIVE_SECONDS]
     
     def get_global_stats(self) -> Dict:
         """Get global system statistics"""
@@ -501,10 +1069,24 @@ class TemporalActivityTracker:
             'total_activity_changes': self.global_stats['total_activity_changes'],
         }
     
-    def export_track_data(self, track_id: int) -> Dict:
+    def reset(self):
+        """Forget every track and zero the global statistics (buffer sizing and thresholds are kept)"""
+        self.tracks.clear()
+        self._active_ids.clear()
+        self._now = None
+        self._last_reap = None
+        for key in self.global_stats:
+            self.global_stats[key] = 0
+    
+    def export_track_data(self, track_id: int, raw_arrays: bool = False) -> Dict:
         """
         Export all data for a specific person (for saving or sending)
         
+        Args:
+            track_id: Track ID
+            raw_arrays: Return `raw_data` as NumPy array copies instead of lists
+                (cheaper; serialized natively by `save_to_json`)
+        
         Returns:
             dict with all raw and derived data
         """
@@ -513,6 +1095,17 @@ class TemporalActivityTracker:
         if track['first_seen'] is None:
             return {}
         
+        count = track['count']
+        if raw_arrays:
+            timestamps = self._recent(track, 'timestamps', count).copy()
+            positions = self._recent(track, 'positions', count).copy()
+        else:
+            timestamps = self._recent(track, 'timestamps', count).tolist()
+            positions = self._recent(track, 'positions', count).tolist()
+        last_bbox = None
+        if count:
+            last_bbox = dict(zip(_BBOX_KEYS, self._recent(track, 'bboxes', 1)[0].tolist()))
+        
         return {
             'track_id': track_id,
             'name': track.get('name', 'Unknown'),  # Include identity name
@@ -523,21 +1116,39 @@ class TemporalActivityTracker:
                 'duration_seconds': track['last_seen'] - track['first_seen'],
             },
             'current_state': {
-                'activity': track['current_activity'],
-                'last_position': list(track['positions'])[-1] if track['positions'] else None,
-                'last_bbox': list(track['bboxes'])[-1] if track['bboxes'] else None,
+                'activity': ACTIVITY_NAMES[track['current_activity']],
+                'last_position': self._recent(track, 'positions', 1)[0].tolist() if count else None,
+                'last_bbox': last_bbox,
+            },
+            # Copied so the export is a stable snapshot of the live counters
+            'statistics': {
+                **track['stats'],
+                'activity_changes': self._change_dicts(track),
             },
-            'statistics': track['stats'],
             'raw_data': {
-                'timestamps': list(track['timestamps']),
-                'positions': list(track['positions']),
+                'timestamps': timestamps,
+                'positions': positions,
                 # Can add more as needed
             }
         }
     
-    def save_to_json(self, track_id: int, filepath: str):
-        """Save data for a specific person to JSON file"""
-        data = self.export_track_data(track_id)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"[SAVED] Track {track_id} data saved to {filepath}")
+    def save_to_json(self, track_id: int, filepath: str, data: Optional[Dict] = None):
+        """
+        Save data for a specific person to JSON file
+        
+        Args:
+            track_id: Track ID
+            filepath: Output JSON path
+            data: Pre-exported snapshot from `export_track_data` (exported now if None)
+        """
+        if data is None:
+            data = self.export_track_data(track_id, raw_arrays=True)
+        if orjson is not None:
+            payload = orjson.dumps(data, default=_json_default,
+                                   option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            with open(filepath, 'wb') as f:
+                f.write(payload)
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False, default=_json_default)
+        logger.info("[SAVED] Track %s data saved to %s", track_id, filepath)
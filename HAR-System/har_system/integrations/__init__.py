@@ -4,7 +4,14 @@ HAR-System: Integrations
 Integration modules for external systems
 """
 
-from .hailo_face_recognition import HailoFaceRecognition
-
 # Public integration surface.
 __all__ = ['HailoFaceRecognition']
+
+
+def __getattr__(name):
+    # Lazy import (PEP 562): the Hailo integration pulls in device SDK bindings,
+    # so `import har_system.integrations` stays cheap until it is actually used.
+    if name == 'HailoFaceRecognition':
+        from .hailo_face_recognition import HailoFaceRecognition
+        return HailoFaceRecognition
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
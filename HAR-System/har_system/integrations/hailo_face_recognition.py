@@ -4,9 +4,18 @@ HAR-System: Hailo Face Recognition Integration
 Integration with Hailo-Apps Face Recognition system
 """
 
+import hashlib
+import logging
+import math
+import operator
+import os
+import time
 import numpy as np
 from pathlib import Path
-from typing import Dict, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 # Import Hailo face recognition components
 try:
@@ -18,10 +27,320 @@ try:
 except ImportError:
     # Allow the rest of HAR-System to run without face recognition dependencies.
     # The caller can check `is_enabled()` and behave accordingly.
-    print("[WARNING] Hailo apps not found. Face recognition will not work.")
+    logger.warning("[FACE-RECOG] Hailo apps not found. Face recognition will not work.")
     DatabaseHandler = None
     Record = None
 
+try:
+    # Optional: compile the face crop kernel to native code.
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Keypoints the face crop is built from, in (nose, left_eye, right_eye) order
+_FACE_KEYPOINTS = operator.itemgetter('nose', 'left_eye', 'right_eye')
+
+# Smallest accepted face crop (pixels per side) and the matching eye distance bound
+_MIN_FACE_SIZE = 40
+_MIN_EYE_DISTANCE_SQ = (_MIN_FACE_SIZE / 2.5) ** 2
+
+
+def _compute_crop_box(nose_x, nose_y, left_eye_x, left_eye_y, right_eye_x, right_eye_y,
+                      xmin, ymin, xmax, ymax, frame_width, frame_height):
+    """
+    Face crop bounds from bbox-relative nose and eye keypoints (pure scalar)
+    
+    Args:
+        nose_x, nose_y, left_eye_x, left_eye_y, right_eye_x, right_eye_y:
+            Keypoint coordinates relative to the bbox (0-1)
+        xmin, ymin, xmax, ymax: Bbox corners, normalized to the frame (0-1)
+        frame_width, frame_height: Frame size in pixels
+    
+    Returns:
+        (x1, y1, x2, y2) pixel bounds, or (-1, -1, -1, -1) if the face is
+        rejected as too small or outside the frame
+    """
+    # Convert bbox to absolute coordinates
+    bbox_x = int(xmin * frame_width)
+    bbox_y = int(ymin * frame_height)
+    bbox_width = int(xmax * frame_width) - bbox_x
+    bbox_height = int(ymax * frame_height) - bbox_y
+    
+    # Convert keypoints to absolute coordinates (they are relative to bbox)
+    nose_px = int(nose_x * bbox_width + bbox_x)
+    nose_py = int(nose_y * bbox_height + bbox_y)
+    eye_dx = int(right_eye_x * bbox_width + bbox_x) - int(left_eye_x * bbox_width + bbox_x)
+    eye_dy = int(right_eye_y * bbox_height + bbox_y) - int(left_eye_y * bbox_height + bbox_y)
+    
+    # Eyes closer than this can never yield a crop of the minimum size
+    # (the width, 2.5x the eye distance, is the binding side)
+    if eye_dx * eye_dx + eye_dy * eye_dy < _MIN_EYE_DISTANCE_SQ:
+        return -1, -1, -1, -1
+    eye_distance = math.sqrt(eye_dx * eye_dx + eye_dy * eye_dy)
+    
+    # Face region: 2.5x eye distance wide, 3x high, centered on the nose and
+    # starting slightly above it
+    face_width = int(eye_distance * 2.5)
+    face_height = int(eye_distance * 3.0)
+    x1 = max(0, nose_px - face_width // 2)
+    y1 = max(0, nose_py - int(face_height * 0.4))
+    x2 = min(frame_width, x1 + face_width)
+    y2 = min(frame_height, y1 + face_height)
+    
+    # Ensure a valid region of minimum size before slicing
+    if x2 - x1 < _MIN_FACE_SIZE or y2 - y1 < _MIN_FACE_SIZE:
+        return -1, -1, -1, -1
+    return x1, y1, x2, y2
+
+
+compute_crop_box = (njit(cache=True)(_compute_crop_box)
+                    if njit is not None else _compute_crop_box)
+
+
+def _default_cache_dir() -> Path:
+    """Per-user cache directory for the shared embedding index (XDG layout)"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'har_system' / 'embedding_index'
+
+
+# FAISS is optional: without it the index falls back to a NumPy matmul
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+class FaissIndex:
+    """
+    In-memory nearest-neighbour cache over the database records' embeddings
+    
+    Like `DatabaseHandler.search_record`, the top-1 search runs over every
+    record, "Unknown" clusters included, so a face closest to an Unknown
+    cluster stays unknown instead of matching the next-nearest person.
+    
+    Embeddings are L2-normalized so inner product equals cosine similarity.
+    Small galleries use an exact `IndexFlatIP`; large ones switch to an
+    `IndexIVFPQ` approximate index.
+    Given a cache directory, the built index is also written there and
+    memory-mapped by every process that derives the same index, so concurrent
+    apps share one copy through the page cache. Each save prunes the
+    directory to the `CACHE_KEEP` newest files; unlinking a file another
+    process still maps is safe, its mapping stays valid. The database stays
+    the ground truth.
+    """
+    
+    IVF_MIN_SIZE = 10000  # Persons before switching to the approximate index
+    IVF_NPROBE = 8
+    MAX_FACES_PER_FRAME = 16  # Initial rows of the reused query buffers
+    CACHE_KEEP = 4  # Shared index files kept in the cache directory
+    
+    def __init__(self, records: list, threshold: float = 0.70, directory: Optional[str] = None):
+        """
+        Build the index from database records
+        
+        Args:
+            records: Records from `DatabaseHandler.get_all_records()`; each known
+                person must carry an `avg_embedding` (Unknown records without
+                one are skipped)
+            threshold: Match threshold for records without their own
+                `classificaiton_confidence_threshold`
+            directory: Cache directory to share the built index between
+                processes (None = private)
+        """
+        if any(r.get('avg_embedding') is None for r in records if r['label'] != 'Unknown'):
+            raise ValueError("every known record needs an 'avg_embedding'")
+        rows = [r for r in records if r.get('avg_embedding') is not None]
+        
+        # Parallel lists map an index row back to its record
+        self.labels = [r['label'] for r in rows]
+        self.global_ids = [r.get('global_id') for r in rows]
+        # Rows whose top-1 hit means "no identity"
+        self.is_unknown = np.array([label == 'Unknown' for label in self.labels], dtype=bool)
+        # Per-record thresholds, as `DatabaseHandler.search_record` applies them
+        # (the field name's spelling is the hailo-apps schema's)
+        self.thresholds = np.array([r.get('classificaiton_confidence_threshold', threshold)
+                                    for r in rows], dtype=np.float64)
+        self._vectors = None
+        self._index = None
+        # Reused query/result buffers (see `_scratch`); grown on demand, not thread-safe
+        self._queries = None
+        self._distances = None
+        self._ids = None
+        self._similarities = None
+        if not rows:
+            return
+        
+        vectors = np.stack([np.asarray(r['avg_embedding'], dtype=np.float32) for r in rows])
+        vectors = np.ascontiguousarray(self._normalize(vectors))
+        
+        # Content-addressed file name: a process whose records produce the same
+        # vectors maps the existing file instead of keeping its own copy
+        path = None
+        if directory is not None:
+            digest = hashlib.blake2b(vectors.tobytes(), digest_size=12)
+            digest.update(f"{vectors.shape}".encode())
+            suffix = ".index" if faiss is not None else ".npy"
+            path = Path(directory) / f"embedding_index-{digest.hexdigest()}{suffix}"
+            if self._load(path):
+                return
+        
+        if faiss is None:
+            self._vectors = vectors
+            if path is not None:
+                self._save(path)
+            return
+        
+        n, dim = vectors.shape
+        if n >= self.IVF_MIN_SIZE:
+            n_lists = int(math.sqrt(n))
+            n_subquantizers = next(m for m in (64, 32, 16, 8, 4, 2, 1) if dim % m == 0)
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, n_lists, n_subquantizers, 8,
+                                     faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = self.IVF_NPROBE
+            # Keep the coarse quantizer alive as long as the index
+            self._quantizer = quantizer
+        else:
+            index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+        self._index = index
+        if path is not None:
+            self._save(path)
+    
+    def _load(self, path: Path) -> bool:
+        """
+        Memory-map a previously shared index file
+        
+        Args:
+            path: Content-addressed index file
+        
+        Returns:
+            True if the file existed and was loaded
+        """
+        if not path.exists():
+            return False
+        try:
+            if faiss is not None:
+                try:
+                    self._index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP)
+                except RuntimeError:
+                    # Not every index type supports mmap; read it into memory instead
+                    self._index = faiss.read_index(str(path))
+            else:
+                self._vectors = np.load(path, mmap_mode='r')
+            return True
+        except Exception as e:
+            logger.warning("[FACE-RECOG] Could not load shared index %s: %s", path.name, e)
+            self._index = self._vectors = None
+            return False
+    
+    def _save(self, path: Path):
+        """
+        Atomically write the index for other processes and prune old ones
+        
+        Args:
+            path: Content-addressed index file
+        """
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Per-process temporary names: concurrent writers of the same
+            # index must not interleave, the last rename simply wins
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            if faiss is not None:
+                faiss.write_index(self._index, str(tmp))
+            else:
+                with open(tmp, 'wb') as f:
+                    np.save(f, self._vectors)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("[FACE-RECOG] Could not share index %s: %s", path.name, e)
+            return
+        self._prune(path)
+    
+    def _prune(self, current: Path):
+        """
+        Delete all but the `CACHE_KEEP` newest index files, never `current`
+        
+        Args:
+            current: The index file just written
+        """
+        try:
+            # Other writers' in-flight temporary files are not ours to remove
+            files = sorted((f for f in current.parent.glob("embedding_index-*") if f.suffix != ".tmp"),
+                           key=lambda f: f.stat().st_mtime, reverse=True)
+            for stale in files[self.CACHE_KEEP:]:
+                if stale != current:
+                    stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("[FACE-RECOG] Could not prune shared indexes: %s", e)
+    
+    def __len__(self) -> int:
+        return len(self.labels)
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Row-wise L2 normalization (zero rows stay zero)"""
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    
+    def _scratch(self, count: int, dim: int):
+        """
+        Ensure the reusable query/result buffers can hold `count` queries
+        
+        Args:
+            count: Number of queries in this search
+            dim: Embedding dimension
+        """
+        if self._queries is not None and len(self._queries) >= count and self._queries.shape[1] == dim:
+            return
+        rows = max(count, self.MAX_FACES_PER_FRAME)
+        self._queries = np.empty((rows, dim), dtype=np.float32)
+        self._distances = np.empty((rows, 1), dtype=np.float32)
+        self._ids = np.empty((rows, 1), dtype=np.int64)
+        # The NumPy fallback also needs the full (K, N) similarity matrix
+        self._similarities = (np.empty((rows, len(self.labels)), dtype=np.float32)
+                              if self._index is None else None)
+    
+    def search(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the most similar record for each query
+        
+        Args:
+            embeddings: Query embeddings, shape (D,) or (M, D)
+        
+        Returns:
+            Tuple of (similarities, row indices), both of shape (M,); index -1
+            means no match. Both are views into reused buffers, valid until the
+            next search.
+        """
+        embeddings = np.atleast_2d(embeddings)
+        count = len(embeddings)
+        if not self.labels:
+            return np.zeros(count, dtype=np.float32), np.full(count, -1, dtype=np.int64)
+        
+        # Copy into the preallocated buffer and normalize in place
+        self._scratch(count, embeddings.shape[1])
+        queries = self._queries[:count]
+        np.copyto(queries, embeddings, casting='unsafe')
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        distances = self._distances[:count]
+        ids = self._ids[:count]
+        if self._index is not None:
+            try:
+                self._index.search(queries, 1, D=distances, I=ids)
+            except TypeError:
+                # FAISS releases before 1.7.3 cannot write into caller buffers
+                distances[...], ids[...] = self._index.search(queries, 1)
+            return distances.reshape(-1), ids.reshape(-1)
+        
+        similarities = self._similarities[:count]
+        np.matmul(queries, self._vectors.T, out=similarities)
+        best = ids.reshape(-1)
+        similarities.argmax(axis=1, out=best)
+        best_similarities = distances.reshape(-1)
+        best_similarities[...] = similarities[np.arange(count), best]
+        return best_similarities, best
+
 
 class HailoFaceRecognition:
     """
@@ -36,7 +355,8 @@ class HailoFaceRecognition:
     def __init__(self, 
                  database_dir: str = "./database",
                  samples_dir: str = "./database/samples",
-                 confidence_threshold: float = 0.70):
+                 confidence_threshold: float = 0.70,
+                 index_cache_dir: Optional[str] = None):
         """
         Initialize Hailo Face Recognition
         
@@ -44,10 +364,13 @@ class HailoFaceRecognition:
             database_dir: Directory for LanceDB database
             samples_dir: Directory for face samples
             confidence_threshold: Minimum confidence for recognition
+            index_cache_dir: Where processes share the embedding index
+                (None = the user cache directory)
         """
         self.database_dir = Path(database_dir)
         self.samples_dir = Path(samples_dir)
         self.confidence_threshold = confidence_threshold
+        self.index_cache_dir = Path(index_cache_dir) if index_cache_dir is not None else _default_cache_dir()
         
         # Ensure database/samples directories exist (LanceDB stores data on disk).
         self.database_dir.mkdir(parents=True, exist_ok=True)
@@ -66,20 +389,72 @@ class HailoFaceRecognition:
                     samples_dir=str(self.samples_dir)
                 )
                 self.enabled = True
-                print(f"[FACE-RECOG] Database initialized: {self.database_dir / 'persons.db'}")
+                logger.info("[FACE-RECOG] Database initialized: %s", self.database_dir / 'persons.db')
             except Exception as e:
-                print(f"[FACE-RECOG] Failed to initialize database: {e}")
+                logger.error("[FACE-RECOG] Failed to initialize database: %s", e)
                 self.db_handler = None
                 self.enabled = False
         else:
             self.db_handler = None
             self.enabled = False
-            print("[FACE-RECOG] Face recognition disabled (DatabaseHandler not available)")
+            logger.warning("[FACE-RECOG] Face recognition disabled (DatabaseHandler not available)")
+        
+        # Snapshot of get_all_records(): refreshed after our own mutations, or
+        # once the TTL expires in case another process wrote to the database
+        self._records_ttl = 5.0
+        self._records_cache = None
+        self._records_dirty = True
+        self._records_ts = 0.0
+        # Views derived from the snapshot, rebuilt only when it is refreshed
+        self._names_sorted = None
+        self._stats_cached = None
+        
+        # Hot-path similarity cache, built lazily from the records snapshot
+        self._index = None
+        self._index_built = False
     
     def is_enabled(self) -> bool:
         """Check if face recognition is enabled"""
         return self.enabled and self.db_handler is not None
     
+    def _records(self) -> list:
+        """Get all database records from the cached snapshot"""
+        now = time.monotonic()
+        if self._records_dirty or now - self._records_ts > self._records_ttl:
+            self._records_cache = self.db_handler.get_all_records()
+            self._records_dirty = False
+            self._records_ts = now
+            # The index and views are derived from the snapshot
+            self._index = None
+            self._index_built = False
+            self._names_sorted = None
+            self._stats_cached = None
+        return self._records_cache
+    
+    def _get_index(self) -> Optional[FaissIndex]:
+        """
+        Get the embedding index, building it on first use
+        
+        Returns:
+            FaissIndex, or None if the records cannot be indexed (recognition
+            then falls back to `db_handler.search_record`)
+        """
+        if not self._index_built:
+            try:
+                self._index = FaissIndex(self._records(), threshold=self.confidence_threshold,
+                                         directory=self.index_cache_dir)
+            except Exception as e:
+                logger.warning("[FACE-RECOG] Embedding index unavailable, using database search: %s", e)
+                self._index = None
+            self._index_built = True
+        return self._index
+    
+    def refresh_index(self):
+        """Drop the records snapshot and embedding index so both are re-read on next use"""
+        self._records_dirty = True
+        self._index = None
+        self._index_built = False
+    
     def extract_face_region(self, frame: np.ndarray, keypoints: Dict, bbox: Dict) -> Optional[np.ndarray]:
         """
         Extract face region from frame using keypoints
@@ -98,63 +473,28 @@ class HailoFaceRecognition:
         # Get frame dimensions
         frame_height, frame_width = frame.shape[:2]
         
-        # Get nose and eye positions (in absolute pixel coordinates)
-        nose = keypoints.get('nose')
-        left_eye = keypoints.get('left_eye')
-        right_eye = keypoints.get('right_eye')
+        # Get nose and eye keypoints in one C-level lookup
+        try:
+            nose, left_eye, right_eye = _FACE_KEYPOINTS(keypoints)
+        except KeyError:
+            return None
         
-        if not all([nose, left_eye, right_eye]):
+        if not (nose and left_eye and right_eye):
             return None
         
         # Check confidence
         if nose[2] < 0.3 or left_eye[2] < 0.3 or right_eye[2] < 0.3:
             return None
         
-        # Convert bbox to absolute coordinates
-        bbox_abs = {
-            'xmin': int(bbox['xmin'] * frame_width),
-            'ymin': int(bbox['ymin'] * frame_height),
-            'xmax': int(bbox['xmax'] * frame_width),
-            'ymax': int(bbox['ymax'] * frame_height)
-        }
-        
-        # Convert keypoints to absolute coordinates (they are relative to bbox)
-        nose_x = int((nose[0] * (bbox_abs['xmax'] - bbox_abs['xmin'])) + bbox_abs['xmin'])
-        nose_y = int((nose[1] * (bbox_abs['ymax'] - bbox_abs['ymin'])) + bbox_abs['ymin'])
-        
-        left_eye_x = int((left_eye[0] * (bbox_abs['xmax'] - bbox_abs['xmin'])) + bbox_abs['xmin'])
-        left_eye_y = int((left_eye[1] * (bbox_abs['ymax'] - bbox_abs['ymin'])) + bbox_abs['ymin'])
-        
-        right_eye_x = int((right_eye[0] * (bbox_abs['xmax'] - bbox_abs['xmin'])) + bbox_abs['xmin'])
-        right_eye_y = int((right_eye[1] * (bbox_abs['ymax'] - bbox_abs['ymin'])) + bbox_abs['ymin'])
-        
-        # Calculate eye center and distance
-        eye_center_x = (left_eye_x + right_eye_x) // 2
-        eye_center_y = (left_eye_y + right_eye_y) // 2
-        eye_distance = np.sqrt((right_eye_x - left_eye_x)**2 + (right_eye_y - left_eye_y)**2)
-        
-        # Calculate face region (2.5x eye distance for width, 3x for height)
-        face_width = int(eye_distance * 2.5)
-        face_height = int(eye_distance * 3.0)
-        
-        # Center on nose position
-        x1 = max(0, nose_x - face_width // 2)
-        y1 = max(0, nose_y - int(face_height * 0.4))  # Slightly above nose
-        x2 = min(frame_width, x1 + face_width)
-        y2 = min(frame_height, y1 + face_height)
-        
-        # Ensure valid region
-        if x2 <= x1 or y2 <= y1:
+        x1, y1, x2, y2 = compute_crop_box(
+            nose[0], nose[1], left_eye[0], left_eye[1], right_eye[0], right_eye[1],
+            bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax'], frame_width, frame_height
+        )
+        if x1 < 0:
             return None
         
         # Crop face region
-        face_region = frame[y1:y2, x1:x2]
-        
-        # Ensure minimum size
-        if face_region.shape[0] < 40 or face_region.shape[1] < 40:
-            return None
-        
-        return face_region
+        return frame[y1:y2, x1:x2]
     
     def recognize_face_from_embedding(self, embedding: np.ndarray) -> Tuple[str, float, Optional[str]]:
         """
@@ -166,24 +506,65 @@ class HailoFaceRecognition:
         Returns:
             Tuple of (name, confidence, global_id)
         """
+        return self.recognize_faces_from_embeddings(np.atleast_2d(embedding))[0]
+    
+    def recognize_faces_from_embeddings(self, embeddings: np.ndarray) -> List[Tuple[str, float, Optional[str]]]:
+        """
+        Recognize several faces with a single batched index search
+        
+        Args:
+            embeddings: Face embedding vectors, shape (M, 512)
+        
+        Returns:
+            One (name, confidence, global_id) tuple per embedding
+        """
+        unknown = ("Unknown", 0.0, None)
         if not self.is_enabled():
-            return ("Unknown", 0.0, None)
+            return [unknown] * len(embeddings)
         
         try:
-            person = self.db_handler.search_record(embedding=embedding)
+            index = self._get_index()
+            if index is None:
+                return [self._search_database(embedding) for embedding in embeddings]
+            if not len(index):
+                return [unknown] * len(embeddings)
             
-            if person and person.get('label') != 'Unknown':
-                confidence = 1.0 - person.get('_distance', 1.0)
-                return (
-                    person['label'],
-                    confidence,
-                    person.get('global_id')
-                )
-            else:
-                return ("Unknown", 0.0, None)
+            # Same acceptance rule as `search_record`: the nearest record must
+            # be a known person and the similarity must strictly exceed that
+            # record's own threshold
+            similarities, indices = index.search(embeddings)
+            matched = ((indices >= 0) & ~index.is_unknown[indices]
+                       & (similarities > index.thresholds[indices]))
+            labels, global_ids = index.labels, index.global_ids
+            return [
+                (labels[idx], similarity, global_ids[idx]) if ok else unknown
+                for ok, idx, similarity in zip(matched.tolist(), indices.tolist(), similarities.tolist())
+            ]
         
         except Exception as e:
-            print(f"[FACE-RECOG] Error during recognition: {e}")
+            logger.error("[FACE-RECOG] Error during recognition: %s", e)
+            return [unknown] * len(embeddings)
+    
+    def _search_database(self, embedding: np.ndarray) -> Tuple[str, float, Optional[str]]:
+        """
+        Recognize one face with the database's own vector search
+        
+        Args:
+            embedding: Face embedding vector
+        
+        Returns:
+            Tuple of (name, confidence, global_id)
+        """
+        person = self.db_handler.search_record(embedding=embedding)
+        
+        if person and person.get('label') != 'Unknown':
+            confidence = 1.0 - person.get('_distance', 1.0)
+            return (
+                person['label'],
+                confidence,
+                person.get('global_id')
+            )
+        else:
             return ("Unknown", 0.0, None)
     
     def add_person_from_images(self, name: str, image_paths: list) -> bool:
@@ -198,11 +579,11 @@ class HailoFaceRecognition:
             True if successful
         """
         if not self.is_enabled():
-            print("[FACE-RECOG] Face recognition is disabled")
+            logger.warning("[FACE-RECOG] Face recognition is disabled")
             return False
         
-        print(f"[FACE-RECOG] Adding person: {name}")
-        print(f"[FACE-RECOG] Processing {len(image_paths)} images...")
+        logger.info("[FACE-RECOG] Adding person: %s", name)
+        logger.info("[FACE-RECOG] Processing %s images...", len(image_paths))
         
         # This is a simplified version - in full implementation,
         # you would need to:
@@ -214,7 +595,8 @@ class HailoFaceRecognition:
         # For now, return True to indicate structure is ready
         # Full implementation requires GStreamer pipeline integration
         
-        print(f"[FACE-RECOG] Note: Full training requires running 'train-faces' command")
+        logger.info("[FACE-RECOG] Note: Full training requires running 'train-faces' command")
+        self.refresh_index()
         return True
     
     def list_known_persons(self) -> list:
@@ -222,17 +604,18 @@ class HailoFaceRecognition:
         List all known persons in database
         
         Returns:
-            List of person names
+            Sorted list of person names (shared; treat as read-only)
         """
         if not self.is_enabled():
             return []
         
         try:
-            records = self.db_handler.get_all_records()
-            names = [r['label'] for r in records if r['label'] != 'Unknown']
-            return sorted(set(names))
+            records = self._records()
+            if self._names_sorted is None:
+                self._names_sorted = sorted({r['label'] for r in records} - {'Unknown'})
+            return self._names_sorted
         except Exception as e:
-            print(f"[FACE-RECOG] Error listing persons: {e}")
+            logger.error("[FACE-RECOG] Error listing persons: %s", e)
             return []
     
     def get_database_stats(self) -> Dict[str, Any]:
@@ -250,66 +633,74 @@ class HailoFaceRecognition:
             }
         
         try:
-            records = self.db_handler.get_all_records()
-            known_records = [r for r in records if r['label'] != 'Unknown']
-            
-            total_samples = sum(len(r.get('samples_json', [])) for r in known_records)
-            
-            return {
-                'enabled': True,
-                'total_persons': len(known_records),
-                'total_samples': total_samples,
-                'confidence_threshold': self.confidence_threshold,
-                'database_path': str(self.database_dir / 'persons.db')
-            }
+            records = self._records()
+            if self._stats_cached is None:
+                known_records = [r for r in records if r['label'] != 'Unknown']
+                total_samples = sum(map(len, (r.get('samples_json', []) for r in known_records)))
+                self._stats_cached = {
+                    'enabled': True,
+                    'total_persons': len(known_records),
+                    'total_samples': total_samples,
+                    'database_path': str(self.database_dir / 'persons.db')
+                }
+            # Shallow copy so callers cannot alter the cache
+            stats = dict(self._stats_cached)
+            stats['confidence_threshold'] = self.confidence_threshold
+            return stats
         except Exception as e:
-            print(f"[FACE-RECOG] Error getting stats: {e}")
+            logger.error("[FACE-RECOG] Error getting stats: %s", e)
             return {
                 'enabled': True,
                 'error': str(e)
             }
     
-    def clear_database(self):
-        """Clear all persons from database and all sample images"""
+    def clear_database(self) -> bool:
+        """
+        Clear all persons from database and all sample images
+        
+        Returns:
+            True if no database records remain afterwards
+        """
         if not self.is_enabled():
-            print("[FACE-RECOG] Face recognition is disabled")
-            return
+            logger.warning("[FACE-RECOG] Face recognition is disabled")
+            return False
         
         try:
             # Get all records first to ensure we have something to delete
             all_records = self.db_handler.get_all_records()
             
             # Always clear samples directory first (before clearing database)
-            print("[FACE-RECOG] Clearing sample images...")
+            logger.info("[FACE-RECOG] Clearing sample images...")
             self._clear_samples_directory()
             
             if not all_records:
-                print("[FACE-RECOG] Database is already empty")
-                print("[FACE-RECOG] Database and samples cleared successfully")
-                return
+                logger.info("[FACE-RECOG] Database is already empty")
+                logger.info("[FACE-RECOG] Database and samples cleared successfully")
+                return True
             
             # Clear the table (this also clears samples via db_handler, but we already did it)
-            print("[FACE-RECOG] Clearing database records...")
+            logger.info("[FACE-RECOG] Clearing database records...")
             self.db_handler.clear_table()
+            self.refresh_index()
             
             # Verify deletion
             remaining = self.db_handler.get_all_records()
             if remaining:
-                print(f"[FACE-RECOG] Warning: {len(remaining)} records still remain after clear")
+                logger.warning("[FACE-RECOG] %s records still remain after clear", len(remaining))
             else:
-                print("[FACE-RECOG] Database cleared successfully")
+                logger.info("[FACE-RECOG] Database cleared successfully")
             
             # Final verification: check samples directory again
             samples_remaining = list(Path(self.samples_dir).iterdir()) if Path(self.samples_dir).exists() else []
             if samples_remaining:
-                print(f"[FACE-RECOG] Warning: {len(samples_remaining)} sample files still remain")
+                logger.warning("[FACE-RECOG] %s sample files still remain", len(samples_remaining))
             else:
-                print("[FACE-RECOG] All sample images cleared successfully")
+                logger.info("[FACE-RECOG] All sample images cleared successfully")
+            return not remaining
                 
         except Exception as e:
-            print(f"[FACE-RECOG] Error clearing database: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[FACE-RECOG] Error clearing database: %s", e)
+            return False
     
     def _clear_samples_directory(self):
         """Clear all sample images from samples directory"""
@@ -317,7 +708,7 @@ class HailoFaceRecognition:
         samples_dir = Path(self.samples_dir)
         
         if not samples_dir.exists():
-            print(f"[FACE-RECOG] Samples directory does not exist: {samples_dir}")
+            logger.warning("[FACE-RECOG] Samples directory does not exist: %s", samples_dir)
             return
         
         try:
@@ -334,19 +725,17 @@ class HailoFaceRecognition:
                     elif item_path.is_dir():
                         shutil.rmtree(item_path)
                 except Exception as e:
-                    print(f"[FACE-RECOG] Warning: Could not delete {item_path.name}: {e}")
+                    logger.warning("[FACE-RECOG] Could not delete %s: %s", item_path.name, e)
             
             # Verify deletion
             files_after = list(samples_dir.iterdir())
             if files_after:
-                print(f"[FACE-RECOG] Warning: {len(files_after)} items still remain in samples directory")
+                logger.warning("[FACE-RECOG] %s items still remain in samples directory", len(files_after))
             else:
-                print(f"[FACE-RECOG] Samples directory cleared successfully: {file_count} files, {dir_count} directories removed")
+                logger.info("[FACE-RECOG] Samples directory cleared successfully: %s files, %s directories removed", file_count, dir_count)
                 
         except Exception as e:
-            print(f"[FACE-RECOG] Error clearing samples directory: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[FACE-RECOG] Error clearing samples directory: %s", e)
     
     def remove_person(self, name: str) -> bool:
         """
@@ -365,11 +754,12 @@ class HailoFaceRecognition:
             record = self.db_handler.get_record_by_label(label=name)
             if record:
                 self.db_handler.delete_record(record['global_id'])
-                print(f"[FACE-RECOG] Removed person: {name}")
+                self.refresh_index()
+                logger.info("[FACE-RECOG] Removed person: %s", name)
                 return True
             else:
-                print(f"[FACE-RECOG] Person not found: {name}")
+                logger.warning("[FACE-RECOG] Person not found: %s", name)
                 return False
         except Exception as e:
-            print(f"[FACE-RECOG] Error removing person: {e}")
+            logger.error("[FACE-RECOG] Error removing person: %s", e)
             return False
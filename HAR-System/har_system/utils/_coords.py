@@ -0,0 +1,46 @@
+"""
+HAR-System: Overlay Coordinate Math
+====================================
+Label placement for many person boxes at once (compiled with Numba when available)
+"""
+
+import numpy as np
+
+try:
+    # Optional: compile the per-frame coordinate math to native code.
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _compute_overlay_coords(boxes, text_wh, act_wh):
+    """
+    Compute label background and text positions for K person boxes
+    
+    Args:
+        boxes: (K, 4) int32 pixel boxes (x1, y1, x2, y2)
+        text_wh: (K, 2) int32 label text sizes (width, height)
+        act_wh: (K, 2) int32 activity text sizes (width, height)
+    
+    Returns:
+        (K, 5) int32 array of (bg_y1, bg_x2, bg_y2, text_y, act_y); the
+        background starts at x1 and both text lines at x1 + 5
+    """
+    x1 = boxes[:, 0]
+    y1 = boxes[:, 1]
+    text_h = text_wh[:, 1]
+    act_h = act_wh[:, 1]
+    
+    out = np.empty((boxes.shape[0], 5), dtype=np.int32)
+    # Background above the bbox, clamped to stay inside the frame
+    out[:, 0] = np.maximum(y1 - text_h - act_h - 15, 0)
+    out[:, 1] = x1 + np.maximum(text_wh[:, 0], act_wh[:, 0]) + 10
+    out[:, 2] = y1 - 5
+    # Label line above the activity line
+    out[:, 3] = y1 - act_h - 10
+    out[:, 4] = y1 - 5
+    return out
+
+
+compute_overlay_coords = (njit(cache=True)(_compute_overlay_coords)
+                          if njit is not None else _compute_overlay_coords)
@@ -6,6 +6,8 @@ Helper utilities for HAR-System
 
 import os
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 def add_realtime_arguments(parser: argparse.ArgumentParser) -> None:
     """Add realtime CLI arguments to an existing argparse parser."""
@@ -196,12 +198,17 @@ def build_realtime_parser() -> argparse.ArgumentParser:
     return parser
 
 
+@functools.lru_cache(maxsize=1)
+def _realtime_parser() -> argparse.ArgumentParser:
+    """Realtime parser shared by every `parse_arguments()` call (built on first use)."""
+    return build_realtime_parser()
+
+
 def parse_arguments():
     """Parse command line arguments for HAR application"""
     # This parser is used by `har_system/apps/realtime_pose.py`.
     # The top-level dispatcher (`python3 -m har_system realtime ...`) forwards compatible flags.
-    parser = build_realtime_parser()
-    return parser.parse_args()
+    return _realtime_parser().parse_args()
 
 
 def setup_output_directory(output_dir: str, save_data: bool):
@@ -228,9 +235,19 @@ def save_final_data(temporal_tracker, output_dir: str):
     """Save final tracking data"""
     # Persist a final snapshot per track_id for offline inspection/debugging.
     print(f"\n  [SAVE] Saving final data...")
-    for track_id in temporal_tracker.tracks.keys():
+    # Snapshot on this thread, then overlap serialization and file I/O across tracks
+    snapshots = [
+        (track_id, temporal_tracker.export_track_data(track_id, raw_arrays=True))
+        for track_id in list(temporal_tracker.tracks.keys())
+    ]
+    
+    def save(item):
+        track_id, data = item
         filepath = os.path.join(output_dir, f"track_{track_id}_final.json")
-        temporal_tracker.save_to_json(track_id, filepath)
+        temporal_tracker.save_to_json(track_id, filepath, data=data)
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(snapshots) or 1)) as executor:
+        list(executor.map(save, snapshots))
     print(f"  [DONE] Data saved to: {output_dir}")
 
 def print_final_summary(temporal_tracker, face_identity_manager=None):
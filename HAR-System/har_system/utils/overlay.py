@@ -5,8 +5,80 @@ Custom overlay to display person names and activity on video
 """
 
 import cv2
+import functools
+import logging
+import queue
+import threading
 import numpy as np
-from typing import Dict, Any
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple, Union
+
+from ._coords import compute_overlay_coords
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=256)
+def _measure(text: str, font: int, scale: float, thickness: int):
+    """Cached cv2.getTextSize: labels and activity names repeat across frames"""
+    return cv2.getTextSize(text, font, scale, thickness)
+
+
+class Bbox(NamedTuple):
+    """Normalized (0-1) bounding box; fields are read as C-level tuple slots"""
+    xmin: float
+    ymin: float
+    xmax: float
+    ymax: float
+
+
+# A bbox as accepted by the overlay: Bbox, or a dict with xmin/ymin/xmax/ymax keys
+BboxLike = Union[Bbox, Dict[str, float]]
+
+
+def _bbox_values(bbox: BboxLike) -> Tuple[float, float, float, float]:
+    """(xmin, ymin, xmax, ymax) of a Bbox or bbox dict"""
+    if isinstance(bbox, tuple):
+        return bbox
+    return bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax']
+
+
+# Fixed prefixes of the stats lines (pre-rendered once per overlay)
+_STATS_PREFIXES = ("People: ", "Falls: ", "Changes: ")
+
+
+@dataclass(slots=True)
+class StatsSnapshot:
+    """
+    Counters shown by `PersonOverlay.draw_stats`
+    
+    The formatted text lines are built on first use and kept until a counter
+    is assigned, so an unchanged snapshot is drawn without any formatting.
+    """
+    total_tracks_seen: int = 0
+    total_falls_detected: int = 0
+    total_activity_changes: int = 0
+    _lines: Optional[Tuple[str, ...]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value: Any):
+        object.__setattr__(self, name, value)
+        if name != '_lines':
+            object.__setattr__(self, '_lines', None)
+    
+    @property
+    def lines(self) -> Tuple[str, ...]:
+        """Formatted stats lines (cached until a counter changes)"""
+        lines = self._lines
+        if lines is None:
+            lines = (
+                f"{_STATS_PREFIXES[0]}{self.total_tracks_seen}",
+                f"{_STATS_PREFIXES[1]}{self.total_falls_detected}",
+                f"{_STATS_PREFIXES[2]}{self.total_activity_changes}",
+            )
+            object.__setattr__(self, '_lines', lines)
+        return lines
+
 
 # This class is used to display the person information on the video.
 class PersonOverlay:
@@ -14,6 +86,9 @@ class PersonOverlay:
     Custom overlay for displaying person information on video
     """
     
+    _STATS_LINE_HEIGHT = 25
+    _STATS_PADDING = 10
+    
     def __init__(self, font_scale=0.6, thickness=2):
         """
         Initialize overlay
@@ -34,9 +109,29 @@ class PersonOverlay:
             'text_bg': (0, 0, 0),      # Black background
             'bbox': (0, 255, 0),       # Green bbox
         }
+        
+        # Solid background patch for the stats box, sized on first use
+        self._stats_bg = None
+        # Last dict-based stats drawn: (counter values, formatted lines)
+        self._stats_key = None
+        self._stats_lines = ()
+        # Pre-rendered stats prefixes: [(coverage tile, origin x, origin y, advance)]
+        self._stats_prefix_tiles = [self._render_tile(prefix, 0.5, 1) for prefix in _STATS_PREFIXES]
+        
+        # (track_id, name, confidence %) -> (label text, text size); LRU-bounded
+        self._label_cache = OrderedDict()
+        self._label_cache_size = 512
+        
+        # [w, h, w, h] multiplier for batched bbox denormalization, per frame size
+        self._wh_cache = None
+        self._wh_shape = None
+        
+        # Draw calls of the last persons laid out, reused while the inputs repeat
+        self._layout_key = None
+        self._layout_calls = ([], [])
     
     # This method is used to draw the person information on the video.
-    def draw_person_info(self, frame: np.ndarray, bbox: Dict, 
+    def draw_person_info(self, frame: np.ndarray, bbox: BboxLike,
                         track_id: int, name: str, confidence: float,
                         activity: str) -> np.ndarray:
         """
@@ -44,7 +139,7 @@ class PersonOverlay:
         
         Args:
             frame: Video frame (numpy array)
-            bbox: Bounding box dict with xmin, ymin, xmax, ymax (normalized)
+            bbox: Normalized Bbox (or dict with xmin, ymin, xmax, ymax keys)
             track_id: Track ID
             name: Person name
             confidence: Recognition confidence (0-1)
@@ -56,108 +151,392 @@ class PersonOverlay:
         h, w = frame.shape[:2]
         
         # Convert normalized bbox (0..1) into absolute pixel coordinates.
-        # NOTE: bbox is expected to have xmin/ymin/xmax/ymax keys.
-        x1 = int(bbox['xmin'] * w)
-        y1 = int(bbox['ymin'] * h)
-        x2 = int(bbox['xmax'] * w)
-        y2 = int(bbox['ymax'] * h)
+        xmin, ymin, xmax, ymax = _bbox_values(bbox)
+        x1 = int(xmin * w)
+        y1 = int(ymin * h)
+        x2 = int(xmax * w)
+        y2 = int(ymax * h)
         
-        # Use a distinct color for known vs unknown identities.
-        color = self.colors['known'] if name != 'Unknown' else self.colors['unknown']
+        # Nothing to draw for an empty box or one entirely outside the frame
+        if x2 <= x1 or y2 <= y1 or x1 >= w or y1 >= h or x2 <= 0 or y2 <= 0:
+            return frame
+        
+        rects, texts = [], []
+        self._layout_pixels(rects, texts, np.array([[x1, y1, x2, y2]], dtype=np.int32),
+                            [(track_id, name, confidence, activity)])
+        self._render(frame, rects, texts)
+        return frame
+    
+    def draw_persons(self, frame: np.ndarray, detections: List[Tuple[BboxLike, int, str, float, str]]) -> np.ndarray:
+        """
+        Draw information for all persons of a frame
+        
+        Bboxes are converted to pixels in one vectorized step, then every
+        rectangle is drawn before any text, and text calls are grouped by font
+        settings and color. Labels therefore always stay on top of other
+        persons' boxes.
+        
+        Args:
+            frame: Video frame (numpy array)
+            detections: List of (bbox, track_id, name, confidence, activity) tuples,
+                as for `draw_person_info`
         
-        # Draw the bounding box first (so text background can overlap cleanly).
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        Returns:
+            Frame with overlay
+        """
+        if not detections:
+            return frame
+        
+        h, w = frame.shape[:2]
+        _, rects, texts = self._layout(detections, h, w)
+        self._render(frame, rects, texts)
+        return frame
+    
+    def _layout(self, detections: List[Tuple[BboxLike, int, str, float, str]],
+                h: int, w: int) -> Tuple[Tuple, List[Tuple], List[Tuple]]:
+        """
+        Get the draw calls of all persons, reusing them while the inputs repeat
+        
+        Static scenes hand over the same boxes and labels frame after frame;
+        those frames skip bbox conversion, label lookup and placement.
+        
+        Args:
+            detections: (bbox, track_id, name, confidence, activity) tuples
+            h, w: Frame height and width
+        
+        Returns:
+            Tuple of (key, rects, texts); the lists are shared, do not extend them
+        """
+        key = (h, w, tuple((_bbox_values(b), track_id, name, int(confidence * 100), activity)
+                           for b, track_id, name, confidence, activity in detections))
+        if key != self._layout_key:
+            rects, texts = [], []
+            if detections:
+                self._layout_persons(rects, texts, detections, h, w)
+            self._layout_key = key
+            self._layout_calls = (rects, texts)
+        return (key, *self._layout_calls)
+    
+    def _layout_persons(self, rects: List[Tuple], texts: List[Tuple],
+                        detections: List[Tuple[BboxLike, int, str, float, str]], h: int, w: int):
+        """
+        Append the draw calls of all visible persons, denormalizing bboxes in one step
+        
+        Args:
+            rects: Rectangle list to extend
+            texts: Text list to extend
+            detections: (bbox, track_id, name, confidence, activity) tuples
+            h, w: Frame height and width
+        """
+        if self._wh_shape != (h, w):
+            self._wh_cache = np.array([w, h, w, h], dtype=np.float64)
+            self._wh_shape = (h, w)
+        
+        boxes = np.array([_bbox_values(b) for b, *_ in detections], dtype=np.float64)
+        pixels = (boxes * self._wh_cache).astype(np.int32)
+        persons = [d[1:] for d in detections]
+        
+        # Drop empty boxes and boxes entirely outside the frame before any drawing
+        x1, y1, x2, y2 = pixels.T
+        visible = (x2 > x1) & (y2 > y1) & (x1 < w) & (y1 < h) & (x2 > 0) & (y2 > 0)
+        if not visible.all():
+            pixels = pixels[visible]
+            persons = [p for p, keep in zip(persons, visible.tolist()) if keep]
+            if not persons:
+                return
+        self._layout_pixels(rects, texts, pixels, persons)
+    
+    def _layout_pixels(self, rects: List[Tuple], texts: List[Tuple], pixels: np.ndarray,
+                       persons: List[Tuple[int, str, float, str]]):
+        """
+        Append the bbox and label draw calls of persons in pixel coordinates
+        
+        Label placement for all persons is computed in one call to
+        `compute_overlay_coords`.
+        
+        Args:
+            rects: Rectangle list, extended with (pt1, pt2, color, thickness)
+            texts: Text list, extended with (scale, thickness, color, text, org)
+            pixels: (K, 4) int32 boxes (x1, y1, x2, y2)
+            persons: (track_id, name, confidence, activity) per box
+        """
+        labels = [self._label(track_id, name, confidence) for track_id, name, confidence, _ in persons]
+        # Activity is shown as a second line.
+        activities = [f"{activity}" for *_, activity in persons]
+        # Both lines share one font setting; the activity line differs by color only
+        act_sizes = [_measure(text, self.font, self.font_scale, self.thickness)[0]
+                     for text in activities]
+        
+        coords = compute_overlay_coords(pixels, np.array([size for _, size in labels], dtype=np.int32),
+                                        np.array(act_sizes, dtype=np.int32)).tolist()
+        
+        text_bg = self.colors['text_bg']
+        white = (255, 255, 255)
+        for (x1, y1, x2, y2), (bg_y1, bg_x2, bg_y2, text_y, act_y), (text, _), activity_text, person in zip(
+                pixels.tolist(), coords, labels, activities, persons):
+            # Use a distinct color for known vs unknown identities.
+            color = self.colors['known'] if person[1] != 'Unknown' else self.colors['unknown']
+            
+            # Bounding box (drawn before any text so the label background overlaps cleanly).
+            rects.append(((x1, y1), (x2, y2), color, 2))
+            rects.append(((x1, bg_y1), (bg_x2, bg_y2), text_bg, -1))
+            
+            texts.append((self.font_scale, self.thickness, color, text, (x1 + 5, text_y)))
+            texts.append((self.font_scale, self.thickness, white, activity_text, (x1 + 5, act_y)))
+    
+    def _render(self, frame: np.ndarray, rects: List[Tuple], texts: List[Tuple]):
+        """
+        Draw all rectangles, then all text grouped by font settings and color
+        
+        Args:
+            frame: Video frame, drawn on in place
+            rects: (pt1, pt2, color, thickness) tuples
+            texts: (scale, thickness, color, text, org) tuples
+        """
+        rectangle = cv2.rectangle
+        h, w = frame.shape[:2]
+        for pt1, pt2, color, thick in rects:
+            if thick >= 0:
+                rectangle(frame, pt1, pt2, color, thick)
+                continue
+            # Filled (inclusive) rectangles are plain slice writes, clipped to the frame
+            (ax, ay), (bx, by) = pt1, pt2
+            x0, x1 = max(min(ax, bx), 0), min(max(ax, bx) + 1, w)
+            y0, y1 = max(min(ay, by), 0), min(max(ay, by) + 1, h)
+            if x0 < x1 and y0 < y1:
+                frame[y0:y1, x0:x1] = color
+        
+        # Stable sort keeps the original order within each (scale, thickness, color) group
+        put_text = cv2.putText
+        font = self.font
+        texts.sort(key=lambda t: t[:3])
+        for scale, thick, color, text, org in texts:
+            put_text(frame, text, org, font, scale, color, thick)
+    
+    def _label(self, track_id: int, name: str, confidence: float) -> Tuple[str, Tuple[int, int]]:
+        """
+        Get the label text and its measured size, reusing them across frames
+        
+        Args:
+            track_id: Track ID
+            name: Person name
+            confidence: Recognition confidence (0-1)
+        
+        Returns:
+            Tuple of (label text, (width, height))
+        """
+        percent = int(confidence * 100) if name != 'Unknown' and confidence > 0 else -1
+        key = (track_id, name, percent)
+        cache = self._label_cache
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+            return entry
         
         # Build a compact label: ID + (optional) name + (optional) confidence.
-        if name != 'Unknown' and confidence > 0:
-            text = f"ID:{track_id} {name} ({int(confidence*100)}%)"
+        if percent >= 0:
+            text = f"ID:{track_id} {name} ({percent}%)"
         elif name != 'Unknown':
             text = f"ID:{track_id} {name}"
         else:
             text = f"ID:{track_id}"
+        size, _ = cv2.getTextSize(text, self.font, self.font_scale, self.thickness)
         
-        # Activity is shown as a second line.
-        activity_text = f"{activity}"
-        
-        # Measure text sizes so we can draw a background rectangle behind them.
-        (text_w, text_h), _ = cv2.getTextSize(text, self.font, self.font_scale, self.thickness)
-        (act_w, act_h), _ = cv2.getTextSize(activity_text, self.font, self.font_scale-0.1, self.thickness-1)
+        entry = cache[key] = (text, size)
+        if len(cache) > self._label_cache_size:
+            cache.popitem(last=False)
+        return entry
+    
+    # This method is used to draw the global statistics on the video.
+    def draw_stats(self, frame: np.ndarray,
+                   stats: Union[StatsSnapshot, Dict[str, Any]]) -> np.ndarray:
+        """
+        Draw global statistics on frame (in place)
         
-        # Draw text background above the bbox (clamped to stay inside the frame).
-        bg_y1 = max(0, y1 - text_h - act_h - 15)
-        bg_y2 = y1 - 5
-        bg_x2 = x1 + max(text_w, act_w) + 10
+        Args:
+            frame: Video frame
+            stats: StatsSnapshot (preferred; formats only when a counter
+                changes) or a statistics dictionary
         
-        cv2.rectangle(frame, (x1, bg_y1), (bg_x2, bg_y2), self.colors['text_bg'], -1)
+        Returns:
+            Frame with stats overlay
+        """
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2, lines = self._stats_layout(w, stats)
         
-        # Draw text
-        text_y = y1 - act_h - 10
-        cv2.putText(frame, text, (x1 + 5, text_y), 
-                   self.font, self.font_scale, color, self.thickness)
+        # Semi-transparent background for readability (without hiding the video entirely).
+        # Blend only the (inclusive) rectangle, in place, against a cached solid patch.
+        roi = frame[y1:y2 + 1, x1:x2 + 1]
+        if roi.size:
+            bg = self._stats_bg
+            if bg is None or bg.shape != roi.shape:
+                bg = self._stats_bg = np.full(roi.shape, self.colors['text_bg'], dtype=roi.dtype)
+            cv2.addWeighted(roi, 0.3, bg, 0.7, 0, dst=roi)
         
-        # Draw activity
-        act_y = y1 - 5
-        cv2.putText(frame, activity_text, (x1 + 5, act_y),
-                   self.font, self.font_scale-0.1, (255, 255, 255), self.thickness-1)
+        # Draw text: blit the cached prefix glyphs, rasterize only the numbers
+        texts = self._stats_texts(x1, y1, lines)
+        for (_, _, _, line, (x, y)), (tile, ox, oy, advance), prefix in zip(
+                texts, self._stats_prefix_tiles, _STATS_PREFIXES):
+            self._blit_white(frame, tile, x - ox, y - oy)
+            cv2.putText(frame, line[len(prefix):], (x + advance, y),
+                        self.font, 0.5, (255, 255, 255), 1)
         
         return frame
     
-    # This method is used to draw the global statistics on the video.
-    def draw_stats(self, frame: np.ndarray, stats: Dict[str, Any]) -> np.ndarray:
+    def _render_tile(self, text: str, scale: float, thickness: int):
         """
-        Draw global statistics on frame
+        Rasterize text once into a coverage tile for `_blit_white`
         
         Args:
-            frame: Video frame
-            stats: Statistics dictionary
+            text: Text to render
+            scale: Font scale
+            thickness: Text thickness
         
         Returns:
-            Frame with stats overlay
+            Tuple of (coverage tile in 0..1 with shape (h, w, 1), origin x,
+            origin y, horizontal advance in pixels)
+        """
+        (text_w, text_h), baseline = cv2.getTextSize(text, self.font, scale, thickness)
+        margin = thickness + 2  # room for anti-aliased edges
+        mask = np.zeros((text_h + baseline + 2 * margin, text_w + 2 * margin), dtype=np.uint8)
+        cv2.putText(mask, text, (margin, margin + text_h), self.font, scale, 255, thickness)
+        return (mask.astype(np.float32) / 255.0)[:, :, None], margin, margin + text_h, text_w
+    
+    @staticmethod
+    def _blit_white(frame: np.ndarray, tile: np.ndarray, left: int, top: int):
+        """
+        Composite a white coverage tile onto the frame (clipped to its bounds)
+        
+        Args:
+            frame: Video frame, modified in place
+            tile: Coverage tile from `_render_tile`
+            left, top: Frame position of the tile's top-left corner
         """
         h, w = frame.shape[:2]
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + tile.shape[1], w), min(top + tile.shape[0], h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        roi = frame[y0:y1, x0:x1]
+        alpha = tile[y0 - top:y1 - top, x0 - left:x1 - left]
+        blended = roi.astype(np.float32)
+        blended += (255.0 - blended) * alpha
+        roi[...] = blended + 0.5
+    
+    def _stats_layout(self, w: int, stats: Union[StatsSnapshot, Dict[str, Any]]):
+        """
+        Get the stats box position and its text lines
+        
+        Args:
+            w: Frame width
+            stats: StatsSnapshot or statistics dictionary
         
+        Returns:
+            Tuple of (x1, y1, x2, y2, lines); the box is inclusive
+        """
         # Keep the stats overlay small and stable (top-right corner).
-        lines = [
-            f"People: {stats.get('total_tracks_seen', 0)}",
-            f"Falls: {stats.get('total_falls_detected', 0)}",
-            f"Changes: {stats.get('total_activity_changes', 0)}",
-        ]
+        if isinstance(stats, StatsSnapshot):
+            lines = stats.lines
+        else:
+            key = (stats.get('total_tracks_seen', 0),
+                   stats.get('total_falls_detected', 0),
+                   stats.get('total_activity_changes', 0))
+            if key != self._stats_key:
+                self._stats_key = key
+                self._stats_lines = StatsSnapshot(*key).lines
+            lines = self._stats_lines
         
         # Compute background rectangle size from fixed layout values.
-        line_height = 25
-        padding = 10
-        bg_height = len(lines) * line_height + 2 * padding
+        bg_height = len(lines) * self._STATS_LINE_HEIGHT + 2 * self._STATS_PADDING
         bg_width = 200
         
         # Place the overlay at the top-right with a small margin.
-        x1 = w - bg_width - 10
+        x1 = max(0, w - bg_width - 10)
         y1 = 10
         x2 = w - 10
         y2 = y1 + bg_height
+        return x1, y1, x2, y2, lines
+    
+    def _stats_texts(self, x1: int, y1: int, lines: Tuple[str, ...]) -> List[Tuple]:
+        """Text draw calls of the stats box, in the `_render` format"""
+        padding = self._STATS_PADDING
+        return [(0.5, 1, (255, 255, 255), line,
+                 (x1 + padding, y1 + padding + (i + 1) * self._STATS_LINE_HEIGHT))
+                for i, line in enumerate(lines)]
+
+
+class OverlayWorker:
+    """
+    Overlay stage running on its own thread
+    
+    Frames are handed over through a bounded queue, drawn by a PersonOverlay
+    owned by the worker thread and passed to `sink` (e.g. an encoder/writer
+    or another queue's `put`), so drawing overlaps with detection upstream.
+    """
+    
+    def __init__(self, sink: Callable[[np.ndarray], Any], prefetch: int = 4,
+                 overlay: Optional[PersonOverlay] = None):
+        """
+        Start the overlay thread
         
-        # Semi-transparent background for readability (without hiding the video entirely).
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (x1, y1), (x2, y2), self.colors['text_bg'], -1)
-        frame = cv2.addWeighted(overlay, 0.7, frame, 0.3, 0)
+        Args:
+            sink: Called with each overlaid frame, on the worker thread
+            prefetch: Frames that may wait for drawing before `submit` blocks
+            overlay: Overlay to draw with (a new PersonOverlay by default)
+        """
+        self.sink = sink
+        self.overlay = overlay if overlay is not None else PersonOverlay()
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._thread = threading.Thread(target=self._run, name="har-overlay", daemon=True)
+        self._thread.start()
+    
+    def submit(self, frame: np.ndarray, detections: List[Tuple[BboxLike, int, str, float, str]],
+               stats: Optional[Dict[str, Any]] = None):
+        """
+        Queue a frame for drawing (blocks while the queue is full)
         
-        # Draw text
-        for i, line in enumerate(lines):
-            y = y1 + padding + (i + 1) * line_height
-            cv2.putText(frame, line, (x1 + padding, y),
-                       self.font, 0.5, (255, 255, 255), 1)
+        Args:
+            frame: Video frame; owned by the worker until it reaches the sink
+            detections: (bbox, track_id, name, confidence, activity) tuples
+            stats: StatsSnapshot (or dict) for `draw_stats`, or None to skip them
+        """
+        self._queue.put((frame, detections, stats))
+    
+    def close(self, timeout: Optional[float] = None):
+        """
+        Draw the frames still queued, then stop the thread
         
-        return frame
+        Args:
+            timeout: Seconds to wait for the thread (None = until done)
+        """
+        self._queue.put(None)
+        self._thread.join(timeout)
+    
+    def _run(self):
+        """Worker loop: draw each queued frame and pass it on"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            frame, detections, stats = item
+            try:
+                frame = self.overlay.draw_persons(frame, detections)
+                if stats is not None:
+                    frame = self.overlay.draw_stats(frame, stats)
+                self.sink(frame)
+            except Exception as e:
+                logger.error("[OVERLAY] Failed to draw frame: %s", e)
 
 
-# Global instance
-_overlay = None
+# Per-thread instances: overlays keep label/stats caches, so each thread gets its own
+_tls = threading.local()
 
 # This function is used to get the overlay instance.
 def get_overlay() -> PersonOverlay:
-    """Get or create overlay instance"""
-    # Simple singleton to avoid recreating fonts/colors every frame.
-    global _overlay
-    if _overlay is None:
+    """Get or create the calling thread's overlay instance"""
+    # Per-thread singleton to avoid recreating fonts/colors every frame.
+    overlay = getattr(_tls, 'overlay', None)
+    if overlay is None:
         # Lazily initialize to avoid importing OpenCV-heavy code paths unless needed.
-        _overlay = PersonOverlay()
-    return _overlay
+        overlay = _tls.overlay = PersonOverlay()
+    return overlay
@@ -96,7 +96,7 @@ class TestManageFacesOperations:
     def test_clear_database_confirmed(self, capsys, monkeypatch):
         """Test clearing database with confirmation"""
         mock_handler = Mock()
-        mock_clear = Mock()
+        mock_clear = Mock(return_value=True)
         
         # Mock user input to confirm
         monkeypatch.setattr('builtins.input', lambda _: 'yes')
@@ -111,6 +111,23 @@ class TestManageFacesOperations:
         assert 'Database cleared' in captured.out
         mock_clear.assert_called_once()
     
+    def test_clear_database_failure_reported(self, capsys, monkeypatch):
+        """Test a failed clear is not reported as success"""
+        mock_handler = Mock()
+        mock_clear = Mock(return_value=False)
+        
+        monkeypatch.setattr('builtins.input', lambda _: 'yes')
+        
+        with patch('sys.argv', ['manage_faces', '--clear', '--database-dir', './db']):
+            with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=mock_handler):
+                with patch('har_system.integrations.HailoFaceRecognition.clear_database', mock_clear):
+                    from har_system.apps.manage_faces import main
+                    main()
+        
+        captured = capsys.readouterr()
+        assert 'FAILED' in captured.out
+        assert 'SUCCESS' not in captured.out
+    
     def test_clear_database_cancelled(self, capsys, monkeypatch):
         """Test cancelling database clear"""
         mock_handler = Mock()
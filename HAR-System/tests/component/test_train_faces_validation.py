@@ -2,156 +2,157 @@
 Component tests for train_faces.py validation logic
 Tests directory scanning and validation without actual training
 """
+import os
+import subprocess
 import pytest
 import sys
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
-import tempfile
-import shutil
+from unittest.mock import patch, MagicMock
+
+from har_system.apps.train_faces import main as train_main, _scan_person_dirs
+
+# Shared successful result for mocked subprocess.run calls
+_OK = subprocess.CompletedProcess(args=[], returncode=0)
+
+
+def _mkfiles(directory, names):
+    """Create empty files (one open + close each; no utime like Path.touch)"""
+    for name in names:
+        os.close(os.open(os.path.join(directory, name), os.O_WRONLY | os.O_CREAT, 0o644))
 
 
 @pytest.mark.component
 class TestTrainFacesValidation:
     """Test training validation and setup logic"""
     
-    def test_missing_train_directory(self, capsys):
+    def test_missing_train_directory(self, tmp_path, capsys):
         """Test error when training directory doesn't exist"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            nonexistent = Path(tmpdir) / "nonexistent"
-            
-            with pytest.raises(SystemExit) as exc_info:
-                from har_system.apps.train_faces import main
-                main(train_dir=str(nonexistent))
-            
-            assert exc_info.value.code == 1
-            captured = capsys.readouterr()
-            assert "Training directory not found" in captured.out
+        nonexistent = tmp_path / "nonexistent"
+        
+        with pytest.raises(SystemExit) as exc_info:
+            train_main(train_dir=str(nonexistent))
+        
+        assert exc_info.value.code == 1
+        captured = capsys.readouterr()
+        assert "Training directory not found" in captured.out
     
-    def test_empty_train_directory(self, capsys):
+    def test_empty_train_directory(self, tmp_path, capsys):
         """Test error when training directory is empty"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            train_dir = Path(tmpdir) / "train"
-            train_dir.mkdir()
-            
-            with pytest.raises(SystemExit) as exc_info:
-                from har_system.apps.train_faces import main
-                main(train_dir=str(train_dir))
-            
-            assert exc_info.value.code == 1
-            captured = capsys.readouterr()
-            assert "No person folders found" in captured.out
+        train_dir = tmp_path / "train"
+        train_dir.mkdir()
+        
+        with pytest.raises(SystemExit) as exc_info:
+            train_main(train_dir=str(train_dir))
+        
+        assert exc_info.value.code == 1
+        captured = capsys.readouterr()
+        assert "No person folders found" in captured.out
     
-    def test_no_images_in_directory(self, capsys):
+    def test_no_images_in_directory(self, tmp_path, capsys):
         """Test error when person folders have no images"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            train_dir = Path(tmpdir) / "train"
-            train_dir.mkdir()
-            
-            # Create person folder but no images
-            person_dir = train_dir / "Ahmed"
-            person_dir.mkdir()
-            
-            with pytest.raises(SystemExit) as exc_info:
-                from har_system.apps.train_faces import main
-                main(train_dir=str(train_dir))
-            
-            assert exc_info.value.code == 1
-            captured = capsys.readouterr()
-            assert "No images found" in captured.out
+        # Create person folder but no images
+        person_dir = tmp_path / "train" / "Ahmed"
+        person_dir.mkdir(parents=True)
+        train_dir = person_dir.parent
+        
+        with pytest.raises(SystemExit) as exc_info:
+            train_main(train_dir=str(train_dir))
+        
+        assert exc_info.value.code == 1
+        captured = capsys.readouterr()
+        assert "No images found" in captured.out
     
-    def test_scan_persons_and_images(self, capsys):
+    def test_scan_persons_and_images(self, tmp_path, capsys):
         """Test scanning persons and counting images"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            train_dir = Path(tmpdir) / "train"
-            train_dir.mkdir()
-            
-            # Create person folders with images
-            ahmed_dir = train_dir / "Ahmed"
-            ahmed_dir.mkdir()
-            (ahmed_dir / "1.jpg").touch()
-            (ahmed_dir / "2.jpg").touch()
-            
-            sara_dir = train_dir / "Sara"
-            sara_dir.mkdir()
-            (sara_dir / "1.jpeg").touch()
-            (sara_dir / "2.png").touch()
-            (sara_dir / "3.jpg").touch()
-            
-            # Mock the actual training to avoid dependencies
-            # The train_faces script checks if script_path.exists(), so mock that
-            with patch('subprocess.run', return_value=Mock(returncode=0)) as mock_run:
-                from har_system.apps.train_faces import main
-                # This will use the automatic script path which we'll mock to succeed
-                main(train_dir=str(train_dir), database_dir=str(Path(tmpdir) / "db"))
-            
-            captured = capsys.readouterr()
-            # Verify that scanning happened before script execution
-            assert "person" in captured.out.lower() or "Ahmed" in captured.out or "Sara" in captured.out
+        train_dir = tmp_path / "train"
+        train_dir.mkdir()
+        
+        # Create person folders with images
+        ahmed_dir = train_dir / "Ahmed"
+        ahmed_dir.mkdir()
+        _mkfiles(ahmed_dir, ["1.jpg", "2.jpg"])
+        
+        sara_dir = train_dir / "Sara"
+        sara_dir.mkdir()
+        _mkfiles(sara_dir, ["1.jpeg", "2.png", "3.jpg"])
+        
+        # Mock the actual training to avoid dependencies
+        # The train_faces script checks if script_path.exists(), so mock that
+        with patch('subprocess.run', autospec=True, return_value=_OK) as mock_run:
+            # This will use the automatic script path which we'll mock to succeed
+            train_main(train_dir=str(train_dir), database_dir=str(tmp_path / "db"))
+        
+        out_lc = capsys.readouterr().out.lower()
+        # Verify that scanning happened before script execution
+        assert any(s in out_lc for s in ("person", "ahmed", "sara"))
     
-    def test_validation_accepts_jpg_jpeg_png(self, capsys):
+    def test_validation_accepts_jpg_jpeg_png(self, tmp_path, capsys):
         """Test that validation accepts .jpg, .jpeg, and .png files"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            train_dir = Path(tmpdir) / "train"
-            train_dir.mkdir()
-            
-            person_dir = train_dir / "TestPerson"
-            person_dir.mkdir()
-            
-            # Create different image formats
-            (person_dir / "photo1.jpg").touch()
-            (person_dir / "photo2.jpeg").touch()
-            (person_dir / "photo3.png").touch()
-            (person_dir / "readme.txt").touch()  # Should be ignored
-            
-            # Mock successful execution
-            with patch('subprocess.run', return_value=Mock(returncode=0)):
-                from har_system.apps.train_faces import main
-                main(train_dir=str(train_dir), database_dir=str(Path(tmpdir) / "db"))
-            
-            captured = capsys.readouterr()
-            # Should count only image files
-            assert "TestPerson" in captured.out or "person" in captured.out.lower()
+        person_dir = tmp_path / "train" / "TestPerson"
+        person_dir.mkdir(parents=True)
+        train_dir = person_dir.parent
+        
+        # Create different image formats
+        _mkfiles(person_dir, ["photo1.jpg", "photo2.jpeg", "photo3.png",
+                              "readme.txt"])  # readme.txt should be ignored
+        
+        # Mock successful execution
+        with patch('subprocess.run', autospec=True, return_value=_OK):
+            train_main(train_dir=str(train_dir), database_dir=str(tmp_path / "db"))
+        
+        out_lc = capsys.readouterr().out.lower()
+        # Should count only image files
+        assert any(s in out_lc for s in ("testperson", "person"))
+    
+    def test_scan_counts_images_per_person(self, tmp_path):
+        """Test that scanning counts only image files, one entry per person folder"""
+        (tmp_path / "Ahmed").mkdir()
+        _mkfiles(tmp_path / "Ahmed", ["1.jpg", "2.jpeg", "3.png", "4.JPG", "notes.txt", "jpg"])
+        (tmp_path / "Ahmed" / "nested.jpg").mkdir()
+        (tmp_path / "Sara").mkdir()
+        _mkfiles(tmp_path, ["stray.jpg"])
+        
+        counts = {path.name: count for path, count in _scan_person_dirs(tmp_path)}
+        
+        assert counts == {"Ahmed": 4, "Sara": 0}
     
-    def test_uses_training_script_if_available(self, capsys):
+    def test_uses_training_script_if_available(self, tmp_path, capsys):
         """Test that automatic training script is preferred if available"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            train_dir = Path(tmpdir) / "train"
-            train_dir.mkdir()
-            
-            person_dir = train_dir / "Ahmed"
-            person_dir.mkdir()
-            (person_dir / "1.jpg").touch()
-            
-            # Mock successful script execution
-            with patch('subprocess.run', return_value=Mock(returncode=0)) as mock_run:
-                # Mock Path.exists to return True for the script
-                with patch.object(Path, 'exists', return_value=True):
-                    from har_system.apps.train_faces import main
-                    main(train_dir=str(train_dir), database_dir="./db")
-                    
-                    # Should have called subprocess.run with the script
-                    mock_run.assert_called_once()
-                    call_args = mock_run.call_args[0][0]
-                    assert 'train_faces_auto.sh' in str(call_args[0])
+        person_dir = tmp_path / "train" / "Ahmed"
+        person_dir.mkdir(parents=True)
+        train_dir = person_dir.parent
+        _mkfiles(person_dir, ["1.jpg"])
+        
+        script = tmp_path / "train_faces_auto.sh"
+        _mkfiles(tmp_path, [script.name])
+        
+        # Mock successful script execution
+        with patch('subprocess.run', autospec=True, return_value=_OK) as mock_run:
+            train_main(train_dir=str(train_dir), database_dir=str(tmp_path / "db"),
+                       script_path=script)
+            
+            # Should have called subprocess.run with the script
+            mock_run.assert_called_once()
+            call_args = mock_run.call_args[0][0]
+            assert 'train_faces_auto.sh' in str(call_args[0])
     
-    def test_fallback_when_script_fails(self, capsys):
+    def test_fallback_when_script_fails(self, tmp_path, capsys):
         """Test fallback to manual instructions when script fails"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            train_dir = Path(tmpdir) / "train"
-            train_dir.mkdir()
-            
-            person_dir = train_dir / "Ahmed"
-            person_dir.mkdir()
-            (person_dir / "1.jpg").touch()
-            
-            # Mock script execution failure
-            from subprocess import CalledProcessError
-            
-            with patch('subprocess.run', side_effect=CalledProcessError(1, 'cmd')):
-                with patch.object(Path, 'exists', return_value=True):
-                    with pytest.raises(SystemExit):
-                        from har_system.apps.train_faces import main
-                        main(train_dir=str(train_dir))
-            
-            captured = capsys.readouterr()
-            assert "Automatic training failed" in captured.out or "Could not import" in captured.out
+        person_dir = tmp_path / "train" / "Ahmed"
+        person_dir.mkdir(parents=True)
+        train_dir = person_dir.parent
+        _mkfiles(person_dir, ["1.jpg"])
+        
+        # Mock script execution failure
+        from subprocess import CalledProcessError
+        
+        script = tmp_path / "train_faces_auto.sh"
+        _mkfiles(tmp_path, [script.name])
+        
+        with patch('subprocess.run', side_effect=CalledProcessError(1, 'cmd')):
+            with pytest.raises(SystemExit):
+                train_main(train_dir=str(train_dir), database_dir=str(tmp_path / "db"),
+                           script_path=script)
+        
+        captured = capsys.readouterr()
+        assert "Automatic training failed" in captured.out or "Could not import" in captured.out
@@ -8,16 +8,16 @@ Design goals:
 
 from __future__ import annotations
 
+import argparse
 import sys
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 
-# Ensure the HAR-System project root is importable during test collection.
-# (Fixtures run after imports, so we must do this at module import time.)
+# The project root is put on sys.path by pytest itself (`pythonpath` in pytest.ini).
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(PROJECT_ROOT))
 
 
 @pytest.fixture(autouse=True)
@@ -35,3 +35,57 @@ def har_project_root() -> Path:
     """Expose HAR-System project root to tests."""
     return PROJECT_ROOT
 
+
+@pytest.fixture(scope="session")
+def zero_frame() -> np.ndarray:
+    """Shared black 1280x720 BGR frame (read-only; `.copy()` it to draw on it)."""
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    frame.flags.writeable = False
+    return frame
+
+
+@pytest.fixture(scope="session")
+def random_frame() -> np.ndarray:
+    """Shared seeded-noise 1280x720 BGR frame (read-only; `.copy()` it to draw on it)."""
+    frame = np.random.default_rng(42).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+    frame.flags.writeable = False
+    return frame
+
+
+@pytest.fixture(scope="session")
+def dummy_embedding() -> np.ndarray:
+    """Shared 512-d float32 embedding for tests that mock the database search (read-only)."""
+    embedding = np.zeros(512, dtype=np.float32)
+    embedding.flags.writeable = False
+    return embedding
+
+
+def _parser_with(add_arguments) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser
+
+
+# CLI parsers are built once per session; tests only call `parse_args` on them.
+@pytest.fixture(scope="session")
+def realtime_parser() -> argparse.ArgumentParser:
+    from har_system.utils.cli import build_realtime_parser
+    return build_realtime_parser()
+
+
+@pytest.fixture(scope="session")
+def faces_parser() -> argparse.ArgumentParser:
+    from har_system.utils.cli import add_faces_arguments
+    return _parser_with(add_faces_arguments)
+
+
+@pytest.fixture(scope="session")
+def train_faces_parser() -> argparse.ArgumentParser:
+    from har_system.utils.cli import add_train_faces_arguments
+    return _parser_with(add_train_faces_arguments)
+
+
+@pytest.fixture(scope="session")
+def chokepoint_parser() -> argparse.ArgumentParser:
+    from har_system.utils.cli import add_chokepoint_arguments
+    return _parser_with(add_chokepoint_arguments)
@@ -0,0 +1,55 @@
+"""
+Unit-test fixtures shared across tests/unit.
+
+The GStreamer/Hailo pipeline bindings are stubbed per fixture scope, never at
+collection time: cv2 and the face modules must stay real for the drawing and
+extraction tests.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+_APP_MODULES = (
+    'har_system.apps.realtime_pose',
+    'har_system.apps.train_faces',
+    'har_system.apps.manage_faces',
+    'har_system.apps.chokepoint_analyzer',
+)
+
+
+def _pipeline_stubs():
+    """Stand-ins for the GStreamer/Hailo bindings the app modules import at load time"""
+    return {
+        'gi': MagicMock(),
+        'gi.repository': MagicMock(),
+        'hailo': MagicMock(),
+        'hailo_apps.python.pipeline_apps.pose_estimation.pose_estimation_pipeline': MagicMock(
+            GStreamerPoseEstimationApp=type('GStreamerPoseEstimationApp', (), {})
+        ),
+        'hailo_apps.python.core.common.buffer_utils': MagicMock(),
+        'hailo_apps.python.core.common.defines': MagicMock(),
+        'hailo_apps.python.core.common.hailo_logger': MagicMock(),
+        'hailo_apps.python.core.gstreamer.gstreamer_app': MagicMock(
+            app_callback_class=type('app_callback_class', (), {})
+        ),
+        'hailo_apps.python.core.gstreamer.gstreamer_helper_pipelines': MagicMock(),
+    }
+
+
+@pytest.fixture(scope="class")
+def app_modules():
+    """Import every app module once per class; tests only patch their `main`"""
+    # Modules that probe for hailo at import time load for real first, so the
+    # stubs below never leak into their availability flags
+    importlib.import_module('har_system.core.face_processor')
+    importlib.import_module('har_system.integrations')
+    with patch.dict(sys.modules, _pipeline_stubs()):
+        for name in _APP_MODULES:
+            importlib.import_module(name)
+        yield
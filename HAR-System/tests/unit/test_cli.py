@@ -7,23 +7,12 @@ GStreamer pipelines or accessing external resources.
 
 from __future__ import annotations
 
-import argparse
-
 import pytest
 
-from har_system.utils.cli import (
-    add_realtime_arguments,
-    add_faces_arguments,
-    add_chokepoint_arguments,
-    add_train_faces_arguments,
-    build_realtime_parser,
-)
-
 
 @pytest.mark.unit
-def test_realtime_parser_defaults():
-    parser = build_realtime_parser()
-    args = parser.parse_args([])
+def test_realtime_parser_defaults(realtime_parser):
+    args = realtime_parser.parse_args([])
 
     assert args.input == "rpi"
     assert args.show_fps is False
@@ -38,9 +27,8 @@ def test_realtime_parser_defaults():
 
 
 @pytest.mark.unit
-def test_realtime_parser_parses_flags():
-    parser = build_realtime_parser()
-    args = parser.parse_args(
+def test_realtime_parser_parses_flags(realtime_parser):
+    args = realtime_parser.parse_args(
         [
             "--input",
             "usb",
@@ -69,34 +57,37 @@ def test_realtime_parser_parses_flags():
 
 
 @pytest.mark.unit
-def test_add_faces_arguments_supports_stats_and_list():
-    parser = argparse.ArgumentParser()
-    add_faces_arguments(parser)
-
-    args = parser.parse_args(["--stats", "--list", "--database-dir", "./database"])
+def test_add_faces_arguments_supports_stats_and_list(faces_parser):
+    args = faces_parser.parse_args(["--stats", "--list", "--database-dir", "./database"])
     assert args.stats is True
     assert args.list is True
     assert args.database_dir == "./database"
 
 
 @pytest.mark.unit
-def test_add_train_faces_arguments_defaults():
-    parser = argparse.ArgumentParser()
-    add_train_faces_arguments(parser)
-    args = parser.parse_args([])
+def test_add_train_faces_arguments_defaults(train_faces_parser):
+    args = train_faces_parser.parse_args([])
     assert args.train_dir == "./train_faces"
     assert args.database_dir == "./database"
     assert args.confidence_threshold == 0.70
 
 
 @pytest.mark.unit
-def test_add_chokepoint_arguments_defaults():
-    parser = argparse.ArgumentParser()
-    add_chokepoint_arguments(parser)
-    args = parser.parse_args([])
+def test_add_chokepoint_arguments_defaults(chokepoint_parser):
+    args = chokepoint_parser.parse_args([])
     assert args.dataset_path == "./test_dataset"
     assert args.results_dir == "./results"
     assert args.enable_face_recognition is False
     assert args.database_dir == "./database"
     assert args.no_display is False
 
+
+@pytest.mark.unit
+def test_parse_arguments_reuses_cached_parser(monkeypatch):
+    from har_system.utils import cli
+
+    monkeypatch.setattr("sys.argv", ["realtime_pose", "--show-fps"])
+    args = cli.parse_arguments()
+
+    assert args.show_fps is True
+    assert cli._realtime_parser() is cli._realtime_parser()
@@ -3,81 +3,111 @@ Unit tests for `har_system.core.face_identity_manager.FaceIdentityManager`.
 
 Focus:
 - Confirmation logic across repeated observations
-- Time-based expiry (via monkeypatched `time.time`)
+- Time-based expiry (via an injected clock)
 - Identity switching when a new name becomes dominant
 """
 
 from __future__ import annotations
 
-import time
-
 import pytest
 
 from har_system.core.face_identity_manager import FaceIdentityManager
 
 
 @pytest.mark.unit
-def test_unknown_identity_does_not_confirm():
-    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=5.0)
-    updated = mgr.update_identity(track_id=1, name="Unknown", confidence=0.0)
-    assert updated is False
-    assert mgr.get_identity(1) == "Unknown"
-    assert mgr.is_identified(1) is False
+@pytest.mark.parametrize(
+    "timeout,events,query_dt,expected_updates,expected_name,expected_confirmed",
+    [
+        # Unknown never confirms
+        (5.0, [(0.0, "Unknown", 0.0, None)], 0.0, [False], "Unknown", False),
+        # Confirmed after min_confirmations observations
+        (5.0, [(0.0, "Ahmed", 0.8, "g1"), (0.1, "Ahmed", 0.9, "g1")], 0.1,
+         [False, True], "Ahmed", True),
+        # After timeout, identity is no longer "confirmed" (but name stays available)
+        (1.0, [(0.0, "Sara", 0.8, "g2"), (0.1, "Sara", 0.9, "g2")], 2.0,
+         [False, True], "Sara", False),
+        # A new name switches the identity once it becomes the most common candidate
+        (5.0, [(0.0, "Ahmed", 0.8, None), (0.1, "Ahmed", 0.85, None),
+               (1.0, "Sara", 0.9, None), (1.1, "Sara", 0.92, None), (1.2, "Sara", 0.93, None)], 1.2,
+         [False, True, True, True, True], "Sara", True),
+    ],
+    ids=["unknown", "confirm", "timeout", "switch"],
+)
+def test_identity_sequence(timeout, events, query_dt, expected_updates, expected_name, expected_confirmed):
+    now = [1000.0]
+    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=timeout, clock=lambda: now[0])
+
+    updates = []
+    for dt, name, conf, gid in events:
+        now[0] = 1000.0 + dt
+        updates.append(mgr.update_identity(1, name, conf, global_id=gid))
+
+    now[0] = 1000.0 + query_dt
+    assert updates == expected_updates
+    assert mgr.get_identity(1) == expected_name
+    assert mgr.is_identified(1) is expected_confirmed
+    if expected_confirmed:
+        assert mgr.get_confidence(1) > 0.0
 
 
 @pytest.mark.unit
-def test_identity_is_confirmed_after_min_confirmations(monkeypatch):
-    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=5.0)
-
-    base_time = 1000.0
-    monkeypatch.setattr(time, "time", lambda: base_time)
-    assert mgr.update_identity(1, "Ahmed", 0.8, global_id="g1") is False
+def test_tick_caches_time_for_queries():
+    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=1.0)
 
-    monkeypatch.setattr(time, "time", lambda: base_time + 0.1)
-    assert mgr.update_identity(1, "Ahmed", 0.9, global_id="g1") is True
+    mgr.tick(100.0)
+    mgr.update_identity(1, "Sara", 0.8)
+    mgr.tick(100.1)
+    assert mgr.update_identity(1, "Sara", 0.9) is True
+    assert mgr.needs_recognition(1) is False
 
-    assert mgr.get_identity(1) == "Ahmed"
-    assert mgr.is_identified(1) is True
-    assert mgr.get_confidence(1) > 0.0
+    # Queries use the ticked frame time, not the live clock.
+    mgr.tick(102.0)
+    assert mgr.needs_recognition(1) is True
 
 
 @pytest.mark.unit
-def test_identity_timeout_requires_reconfirmation(monkeypatch):
-    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=1.0)
+def test_identity_info_is_returned_by_reference():
+    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=5.0)
 
-    base_time = 2000.0
-    monkeypatch.setattr(time, "time", lambda: base_time)
-    mgr.update_identity(1, "Sara", 0.8, global_id="g2")
-    monkeypatch.setattr(time, "time", lambda: base_time + 0.1)
-    mgr.update_identity(1, "Sara", 0.9, global_id="g2")
+    mgr.tick(10.0)
+    mgr.update_identity(1, "Sara", 0.8, global_id="g1")
+    mgr.tick(10.1)
+    mgr.update_identity(1, "Sara", 0.9, global_id="g1")
 
-    assert mgr.is_identified(1) is True
+    info = mgr.get_identity_info(1)
+    assert info is mgr.get_identity_info(1)
+    assert info.name == "Sara" and info.global_id == "g1"
 
-    # After timeout, identity is no longer "confirmed" (but name stays available).
-    monkeypatch.setattr(time, "time", lambda: base_time + 2.0)
-    assert mgr.get_identity(1) == "Sara"
-    assert mgr.is_identified(1) is False
+    snapshot = mgr.get_identity_info(1, as_dict=True)
+    assert snapshot["is_confirmed"] is True
+    assert mgr.get_identity_info(2) is None
 
 
 @pytest.mark.unit
-def test_identity_change_is_applied(monkeypatch):
-    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=5.0)
-
-    base_time = 3000.0
-    monkeypatch.setattr(time, "time", lambda: base_time)
-    mgr.update_identity(1, "Ahmed", 0.8)
-    monkeypatch.setattr(time, "time", lambda: base_time + 0.1)
-    mgr.update_identity(1, "Ahmed", 0.85)
-    assert mgr.get_identity(1) == "Ahmed"
-
-    # Provide enough confirmations for a different name.
-    monkeypatch.setattr(time, "time", lambda: base_time + 1.0)
-    mgr.update_identity(1, "Sara", 0.9)
-    monkeypatch.setattr(time, "time", lambda: base_time + 1.1)
-    mgr.update_identity(1, "Sara", 0.92)
-    # Break ties: ensure the new name becomes the most common candidate.
-    monkeypatch.setattr(time, "time", lambda: base_time + 1.2)
-    mgr.update_identity(1, "Sara", 0.93)
-
-    assert mgr.get_identity(1) == "Sara"
+def test_statistics_track_transitions_incrementally():
+    mgr = FaceIdentityManager(min_confirmations=2, identity_timeout=1.0)
 
+    mgr.tick(10.0)
+    mgr.update_identity(1, "Unknown", 0.0)
+    mgr.update_identity(2, "Sara", 0.8)
+    mgr.update_identity(2, "Sara", 0.9)
+    mgr.update_identity(3, "Sara", 0.8)
+    mgr.update_identity(3, "Sara", 0.9)
+
+    stats = mgr.get_statistics()
+    assert stats['total_tracks'] == 3
+    assert stats['identified_tracks'] == 2
+    assert stats['person_names'] == ["Sara"]
+    assert mgr.get_all_identities() == {1: "Unknown", 2: "Sara", 3: "Sara"}
+    # Callers get a copy, not the manager's own mapping.
+    mgr.get_all_identities().clear()
+    assert len(mgr.get_all_identities()) == 3
+
+    # Timeout drops confirmation; removal drops the track entirely.
+    mgr.tick(12.0)
+    mgr.get_identity(2)
+    mgr.remove_track(3)
+    stats = mgr.get_statistics()
+    assert stats['identified_tracks'] == 0
+    assert stats['unknown_tracks'] == 2
+    assert stats['person_names'] == ["Sara"]
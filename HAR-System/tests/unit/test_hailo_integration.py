@@ -5,132 +5,138 @@ Tests database operations without requiring actual Hailo hardware
 import pytest
 import numpy as np
 from pathlib import Path
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import Mock, MagicMock
+
+_DB_HANDLER = 'har_system.integrations.hailo_face_recognition.DatabaseHandler'
+
+
+@pytest.fixture(scope="module")
+def HFR():
+    """HailoFaceRecognition, imported once for the module"""
+    from har_system.integrations import HailoFaceRecognition
+    return HailoFaceRecognition
 
 
 @pytest.mark.unit
 class TestHailoFaceRecognition:
     """Test Hailo face recognition integration"""
     
-    def test_init_without_database_handler(self):
+    def test_init_without_database_handler(self, HFR, monkeypatch):
         """Test initialization when DatabaseHandler is not available"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', None):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            
-            assert not face_recog.is_enabled()
-            assert face_recog.db_handler is None
-    
-    def test_init_with_database_handler(self):
+        monkeypatch.setattr(_DB_HANDLER, None)
+        face_recog = HFR()
+        
+        assert not face_recog.is_enabled()
+        assert face_recog.db_handler is None
+    
+    def test_init_with_database_handler(self, HFR, monkeypatch):
         """Test successful initialization"""
         mock_handler = Mock()
         
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=mock_handler):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition(
-                database_dir="./test_db",
-                samples_dir="./test_samples",
-                confidence_threshold=0.75
-            )
-            
-            assert face_recog.is_enabled()
-            assert face_recog.db_handler == mock_handler
-            assert face_recog.confidence_threshold == 0.75
-    
-    def test_extract_face_region_missing_keypoints(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR(
+            database_dir="./test_db",
+            samples_dir="./test_samples",
+            confidence_threshold=0.75
+        )
+        
+        assert face_recog.is_enabled()
+        assert face_recog.db_handler == mock_handler
+        assert face_recog.confidence_threshold == 0.75
+    
+    def test_extract_face_region_missing_keypoints(self, HFR, monkeypatch, zero_frame):
         """Test face extraction fails with missing keypoints"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=Mock()):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            frame = np.zeros((720, 1280, 3), dtype=np.uint8)
-            
-            # Missing left_eye
-            keypoints = {
-                'nose': (0.5, 0.3, 0.9),
-                'right_eye': (0.7, 0.2, 0.9)
-            }
-            bbox = {'xmin': 0.2, 'ymin': 0.1, 'xmax': 0.8, 'ymax': 0.9}
-            
-            result = face_recog.extract_face_region(frame, keypoints, bbox)
-            assert result is None
-    
-    def test_extract_face_region_low_confidence(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=Mock()))
+        face_recog = HFR()
+        frame = zero_frame
+        
+        # Missing left_eye
+        keypoints = {
+            'nose': (0.5, 0.3, 0.9),
+            'right_eye': (0.7, 0.2, 0.9)
+        }
+        bbox = {'xmin': 0.2, 'ymin': 0.1, 'xmax': 0.8, 'ymax': 0.9}
+        
+        result = face_recog.extract_face_region(frame, keypoints, bbox)
+        assert result is None
+    
+    def test_extract_face_region_low_confidence(self, HFR, monkeypatch, zero_frame):
         """Test face extraction fails with low confidence"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=Mock()):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            frame = np.zeros((720, 1280, 3), dtype=np.uint8)
-            
-            keypoints = {
-                'nose': (0.5, 0.3, 0.1),  # Too low
-                'left_eye': (0.3, 0.2, 0.9),
-                'right_eye': (0.7, 0.2, 0.9)
-            }
-            bbox = {'xmin': 0.2, 'ymin': 0.1, 'xmax': 0.8, 'ymax': 0.9}
-            
-            result = face_recog.extract_face_region(frame, keypoints, bbox)
-            assert result is None
-    
-    def test_extract_face_region_too_small(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=Mock()))
+        face_recog = HFR()
+        frame = zero_frame
+        
+        keypoints = {
+            'nose': (0.5, 0.3, 0.1),  # Too low
+            'left_eye': (0.3, 0.2, 0.9),
+            'right_eye': (0.7, 0.2, 0.9)
+        }
+        bbox = {'xmin': 0.2, 'ymin': 0.1, 'xmax': 0.8, 'ymax': 0.9}
+        
+        result = face_recog.extract_face_region(frame, keypoints, bbox)
+        assert result is None
+    
+    def test_extract_face_region_too_small(self, HFR, monkeypatch, zero_frame):
         """Test face extraction fails when face is too small"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=Mock()):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            frame = np.zeros((720, 1280, 3), dtype=np.uint8)
-            
-            # Very close eyes
-            keypoints = {
-                'nose': (0.5, 0.3, 0.9),
-                'left_eye': (0.49, 0.29, 0.9),
-                'right_eye': (0.51, 0.29, 0.9)
-            }
-            bbox = {'xmin': 0.48, 'ymin': 0.28, 'xmax': 0.52, 'ymax': 0.32}
-            
-            result = face_recog.extract_face_region(frame, keypoints, bbox)
-            assert result is None
-    
-    def test_extract_face_region_success(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=Mock()))
+        face_recog = HFR()
+        frame = zero_frame
+        
+        # Very close eyes
+        keypoints = {
+            'nose': (0.5, 0.3, 0.9),
+            'left_eye': (0.49, 0.29, 0.9),
+            'right_eye': (0.51, 0.29, 0.9)
+        }
+        bbox = {'xmin': 0.48, 'ymin': 0.28, 'xmax': 0.52, 'ymax': 0.32}
+        
+        result = face_recog.extract_face_region(frame, keypoints, bbox)
+        assert result is None
+    
+    def test_extract_face_region_success(self, HFR, monkeypatch, random_frame):
         """Test successful face extraction"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=Mock()):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            frame = np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
-            
-            keypoints = {
-                'nose': (0.5, 0.3, 0.9),
-                'left_eye': (0.4, 0.25, 0.9),
-                'right_eye': (0.6, 0.25, 0.9)
-            }
-            bbox = {'xmin': 0.3, 'ymin': 0.2, 'xmax': 0.7, 'ymax': 0.6}
-            
-            result = face_recog.extract_face_region(frame, keypoints, bbox)
-            
-            assert result is not None
-            assert isinstance(result, np.ndarray)
-            assert len(result.shape) == 3
-            assert result.shape[2] == 3
-    
-    def test_recognize_when_disabled(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=Mock()))
+        face_recog = HFR()
+        frame = random_frame
+        
+        keypoints = {
+            'nose': (0.5, 0.3, 0.9),
+            'left_eye': (0.4, 0.25, 0.9),
+            'right_eye': (0.6, 0.25, 0.9)
+        }
+        bbox = {'xmin': 0.3, 'ymin': 0.2, 'xmax': 0.7, 'ymax': 0.6}
+        
+        result = face_recog.extract_face_region(frame, keypoints, bbox)
+        
+        assert result is not None
+        assert isinstance(result, np.ndarray)
+        assert len(result.shape) == 3
+        assert result.shape[2] == 3
+    
+    def test_compute_crop_box(self):
+        """Test the scalar crop kernel bounds and rejection sentinel"""
+        from har_system.integrations.hailo_face_recognition import compute_crop_box
+        
+        # 512x288 px bbox at (384, 144): nose at (640, 230), eyes 103 px apart
+        box = compute_crop_box(0.5, 0.3, 0.4, 0.25, 0.6, 0.25, 0.3, 0.2, 0.7, 0.6, 1280, 720)
+        assert box == (512, 107, 769, 416)
+        
+        # Eyes 4 px apart can never give a 40 px crop
+        box = compute_crop_box(0.5, 0.3, 0.49, 0.25, 0.5, 0.25, 0.3, 0.2, 0.7, 0.6, 1280, 720)
+        assert box == (-1, -1, -1, -1)
+    
+    def test_recognize_when_disabled(self, HFR, monkeypatch, dummy_embedding):
         """Test recognition returns Unknown when disabled"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', None):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            embedding = np.random.rand(512)
-            
-            name, confidence, global_id = face_recog.recognize_face_from_embedding(embedding)
-            
-            assert name == "Unknown"
-            assert confidence == 0.0
-            assert global_id is None
-    
-    def test_recognize_face_success(self):
+        monkeypatch.setattr(_DB_HANDLER, None)
+        face_recog = HFR()
+        
+        name, confidence, global_id = face_recog.recognize_face_from_embedding(dummy_embedding)
+        
+        assert name == "Unknown"
+        assert confidence == 0.0
+        assert global_id is None
+    
+    def test_recognize_face_success(self, HFR, monkeypatch, dummy_embedding):
         """Test successful face recognition"""
         mock_handler = Mock()
         mock_handler.search_record.return_value = {
@@ -139,37 +145,230 @@ class TestHailoFaceRecognition:
             'global_id': 'person_123'
         }
         
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=mock_handler):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            embedding = np.random.rand(512)
-            
-            name, confidence, global_id = face_recog.recognize_face_from_embedding(embedding)
-            
-            assert name == "Ahmed"
-            assert confidence == 0.75  # 1.0 - 0.25
-            assert global_id == 'person_123'
-            mock_handler.search_record.assert_called_once()
-    
-    def test_recognize_face_unknown(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR()
+        
+        name, confidence, global_id = face_recog.recognize_face_from_embedding(dummy_embedding)
+        
+        assert name == "Ahmed"
+        assert confidence == 0.75  # 1.0 - 0.25
+        assert global_id == 'person_123'
+        mock_handler.search_record.assert_called_once()
+    
+    def test_recognize_face_unknown(self, HFR, monkeypatch, dummy_embedding):
         """Test recognition returns Unknown for unknown face"""
         mock_handler = Mock()
         mock_handler.search_record.return_value = {'label': 'Unknown', '_distance': 0.9}
         
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=mock_handler):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            embedding = np.random.rand(512)
-            
-            name, confidence, global_id = face_recog.recognize_face_from_embedding(embedding)
-            
-            assert name == "Unknown"
-            assert confidence == 0.0
-            assert global_id is None
-    
-    def test_get_database_stats(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR()
+        
+        name, confidence, global_id = face_recog.recognize_face_from_embedding(dummy_embedding)
+        
+        assert name == "Unknown"
+        assert confidence == 0.0
+        assert global_id is None
+    
+    def test_recognize_faces_uses_embedding_index(self, HFR, monkeypatch, tmp_path):
+        """Test batched recognition against the in-memory embedding index"""
+        rng = np.random.default_rng(0)
+        ahmed, sara = rng.normal(size=(2, 512))
+        mock_handler = Mock()
+        mock_handler.get_all_records.return_value = [
+            {'label': 'Ahmed', 'global_id': 'person_1', 'avg_embedding': ahmed.tolist()},
+            {'label': 'Sara', 'global_id': 'person_2', 'avg_embedding': sara.tolist()},
+            {'label': 'Unknown', 'global_id': 'person_3', 'avg_embedding': None},
+        ]
+        
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR(database_dir=str(tmp_path / "db"),
+                                          samples_dir=str(tmp_path / "db" / "samples"),
+                                          confidence_threshold=0.7,
+                                          index_cache_dir=str(tmp_path / "cache"))
+        queries = np.stack([sara * 3.0, ahmed + rng.normal(scale=0.1, size=512), rng.normal(size=512)])
+        
+        results = face_recog.recognize_faces_from_embeddings(queries)
+        
+        assert [r[0] for r in results] == ['Sara', 'Ahmed', 'Unknown']
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert results[1][2] == 'person_1'
+        assert face_recog.recognize_face_from_embedding(sara)[0] == 'Sara'
+        mock_handler.search_record.assert_not_called()
+        # The shared index goes to the cache directory, not next to the database
+        assert list((tmp_path / "cache").glob("embedding_index-*"))
+        assert not list((tmp_path / "db").glob("embedding_index-*"))
+        # Built once and reused until the database changes
+        assert mock_handler.get_all_records.call_count == 1
+        
+        mock_handler.get_record_by_label.return_value = {'global_id': 'person_2'}
+        assert face_recog.remove_person('Sara')
+        face_recog.recognize_face_from_embedding(sara)
+        assert mock_handler.get_all_records.call_count == 2
+    
+    def test_embedding_index_matches_database_search(self, HFR, monkeypatch, tmp_path):
+        """Test the index accepts exactly the matches `search_record` accepts"""
+        rng = np.random.default_rng(4)
+        gallery = rng.normal(size=(4, 512))
+        # An Unknown cluster next to P0: faces nearest to it must stay unknown
+        # even though their similarity to P0 clears P0's threshold
+        unknown_embedding = gallery[0] + rng.normal(scale=0.5, size=512)
+        records = [
+            {'label': f'P{i}', 'global_id': f'g{i}', 'avg_embedding': row.tolist(),
+             'classificaiton_confidence_threshold': threshold}
+            for i, (row, threshold) in enumerate(zip(gallery, [0.5, 0.6, 0.7, 0.8]))
+        ]
+        records.append({'label': 'Unknown', 'global_id': 'g_unknown',
+                        'avg_embedding': unknown_embedding.tolist(),
+                        'classificaiton_confidence_threshold': 0.7})
+        vectors = np.array([r['avg_embedding'] for r in records])
+        
+        def search_record(embedding):
+            # hailo-apps: cosine top-1 over every record, accepted only if
+            # 1 - _distance is strictly above that record's own threshold
+            similarities = vectors @ embedding / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(embedding))
+            best = int(np.argmax(similarities))
+            if similarities[best] > records[best]['classificaiton_confidence_threshold']:
+                return dict(records[best], _distance=1.0 - similarities[best])
+            return records[-1]
+        
+        mock_handler = Mock()
+        mock_handler.get_all_records.return_value = records
+        mock_handler.search_record.side_effect = search_record
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR(database_dir=str(tmp_path), samples_dir=str(tmp_path / "samples"),
+                         confidence_threshold=0.7, index_cache_dir=str(tmp_path / "cache"))
+        # Noise levels put each person's similarity on both sides of the thresholds
+        queries = np.concatenate([gallery + rng.normal(scale=s, size=gallery.shape)
+                                  for s in (0.3, 0.6, 1.0, 1.5)])
+        near_unknown = unknown_embedding + rng.normal(scale=0.1, size=(3, 512))
+        queries = np.concatenate([queries, near_unknown])
+        p0 = gallery[0] / np.linalg.norm(gallery[0])
+        assert (near_unknown @ p0 / np.linalg.norm(near_unknown, axis=1) > 0.5).all()
+        
+        indexed = face_recog.recognize_faces_from_embeddings(queries)
+        searched = [face_recog._search_database(query) for query in queries]
+    
+        assert {name for name, _, _ in indexed} > {'Unknown', 'P0'}
+        assert all(name == 'Unknown' for name, _, _ in indexed[-3:])
+        assert [(n, g) for n, _, g in indexed] == [(n, g) for n, _, g in searched]
+        for (_, a, _), (_, b, _) in zip(indexed, searched):
+            assert a == pytest.approx(b, abs=1e-5)
+    
+    def test_embedding_index_batch_matches_single_queries(self):
+        """Test one batched index search equals per-query searches"""
+        from har_system.integrations.hailo_face_recognition import FaissIndex
+        
+        rng = np.random.default_rng(1)
+        gallery = rng.normal(size=(5, 512))
+        index = FaissIndex([
+            {'label': f'P{i}', 'global_id': f'g{i}', 'avg_embedding': row}
+            for i, row in enumerate(gallery)
+        ])
+        queries = np.concatenate([gallery[::-1] * 2.0, rng.normal(size=(7, 512))])
+        
+        # Results are views into reused buffers: copy before searching again
+        similarities, indices = (a.copy() for a in index.search(queries))
+        
+        assert indices[:5].tolist() == [4, 3, 2, 1, 0]
+        assert np.allclose(similarities[:5], 1.0, atol=1e-5)
+        for query, similarity, idx in zip(queries, similarities, indices):
+            single_similarity, single_idx = index.search(query)
+            assert single_idx[0] == idx
+            assert single_similarity[0] == pytest.approx(similarity, abs=1e-5)
+    
+    def test_embedding_index_save_load_round_trip(self, tmp_path):
+        """Test a second index over the same records loads the saved file"""
+        from har_system.integrations.hailo_face_recognition import FaissIndex
+        
+        rng = np.random.default_rng(3)
+        records = [{'label': f'P{i}', 'avg_embedding': row} for i, row in enumerate(rng.normal(size=(6, 512)))]
+        queries = rng.normal(size=(4, 512))
+        
+        cache_dir = tmp_path / "cache"
+        writer = FaissIndex(records, directory=str(cache_dir))
+        # Results are views into reused buffers: copy before the next search
+        expected = [a.copy() for a in writer.search(queries)]
+        shared = sorted(cache_dir.glob("embedding_index-*"))
+        reader = FaissIndex(records, directory=str(cache_dir))
+        
+        assert shared and not list(cache_dir.glob("*.tmp"))
+        assert sorted(cache_dir.glob("embedding_index-*")) == shared
+        if reader._index is None:
+            # NumPy fallback: the reader maps the writer's vectors
+            assert isinstance(reader._vectors, np.memmap)
+            assert np.array_equal(reader._vectors, writer._vectors)
+        assert reader.labels == writer.labels
+        for a, b in zip(expected, reader.search(queries)):
+            assert np.allclose(a, b)
+        
+        # Different records get their own file, below the pruning limit the
+        # previous one is kept
+        FaissIndex(records[:3], directory=str(cache_dir))
+        assert set(shared) < set(cache_dir.glob("embedding_index-*"))
+    
+    def test_embedding_index_cache_is_pruned(self, tmp_path, monkeypatch):
+        """Test saving a new index keeps only the newest CACHE_KEEP files"""
+        import os
+        from har_system.integrations.hailo_face_recognition import FaissIndex
+        
+        monkeypatch.setattr(FaissIndex, 'CACHE_KEEP', 2)
+        rng = np.random.default_rng(7)
+        records = [{'label': f'P{i}', 'avg_embedding': row} for i, row in enumerate(rng.normal(size=(6, 64)))]
+        cache_dir = tmp_path / "cache"
+        # Another writer's in-flight file must survive pruning
+        cache_dir.mkdir()
+        in_flight = cache_dir / "embedding_index-other.index.999.tmp"
+        in_flight.touch()
+        
+        written = []
+        for n in range(2, 6):
+            before = set(cache_dir.glob("embedding_index-*"))
+            FaissIndex(records[:n], directory=str(cache_dir))
+            (path,) = set(cache_dir.glob("embedding_index-*")) - before - {in_flight}
+            # Distinct, increasing mtimes regardless of filesystem resolution
+            os.utime(path, (n, n))
+            written.append(path)
+        
+        remaining = set(cache_dir.glob("embedding_index-*"))
+        assert remaining == {written[-2], written[-1], in_flight}
+    
+    def test_faiss_index_matches_numpy_fallback(self, monkeypatch):
+        """Test the exact FAISS index returns the NumPy fallback's matches"""
+        pytest.importorskip("faiss")
+        from har_system.integrations import hailo_face_recognition as hfr
+    
+        rng = np.random.default_rng(5)
+        records = [{'label': f'P{i}', 'avg_embedding': row} for i, row in enumerate(rng.normal(size=(30, 512)))]
+        queries = rng.normal(size=(10, 512))
+    
+        index = hfr.FaissIndex(records)
+        similarities, indices = (a.copy() for a in index.search(queries))
+        monkeypatch.setattr(hfr, 'faiss', None)
+        fallback = hfr.FaissIndex(records)
+    
+        assert index._index is not None and fallback._index is None
+        expected_similarities, expected_indices = fallback.search(queries)
+        assert indices.tolist() == expected_indices.tolist()
+        assert np.allclose(similarities, expected_similarities, atol=1e-5)
+    
+    def test_faiss_ivfpq_index_for_large_galleries(self, monkeypatch):
+        """Test galleries above IVF_MIN_SIZE use the approximate index and still find near duplicates"""
+        faiss = pytest.importorskip("faiss")
+        from har_system.integrations.hailo_face_recognition import FaissIndex
+    
+        monkeypatch.setattr(FaissIndex, 'IVF_MIN_SIZE', 1000)
+        rng = np.random.default_rng(6)
+        gallery = rng.normal(size=(1000, 64))
+        records = [{'label': f'P{i}', 'avg_embedding': row} for i, row in enumerate(gallery)]
+        queries = gallery[:50] + rng.normal(scale=0.05, size=(50, 64))
+    
+        index = FaissIndex(records)
+        _, indices = index.search(queries)
+    
+        assert isinstance(index._index, faiss.IndexIVFPQ)
+        assert np.mean(indices == np.arange(50)) >= 0.9
+    
+    def test_get_database_stats(self, HFR, monkeypatch):
         """Test getting database statistics"""
         mock_handler = Mock()
         # Mock get_all_records to return person records
@@ -179,22 +378,20 @@ class TestHailoFaceRecognition:
             {'label': 'Ali', 'samples_json': ['s1']},
         ]
         
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=mock_handler):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition(
-                database_dir="./test_db",
-                confidence_threshold=0.7
-            )
-            
-            stats = face_recog.get_database_stats()
-            
-            assert stats['total_persons'] == 3
-            assert stats['total_samples'] == 6  # 3 + 2 + 1
-            assert stats['confidence_threshold'] == 0.7
-            assert 'test_db' in stats['database_path']
-    
-    def test_list_known_persons(self):
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR(
+            database_dir="./test_db",
+            confidence_threshold=0.7
+        )
+        
+        stats = face_recog.get_database_stats()
+        
+        assert stats['total_persons'] == 3
+        assert stats['total_samples'] == 6  # 3 + 2 + 1
+        assert stats['confidence_threshold'] == 0.7
+        assert 'test_db' in stats['database_path']
+    
+    def test_list_known_persons(self, HFR, monkeypatch):
         """Test listing known persons"""
         mock_handler = Mock()
         # Mock get_all_records to return person records
@@ -205,30 +402,46 @@ class TestHailoFaceRecognition:
             {'label': 'Unknown'},  # Should be filtered out
         ]
         
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', return_value=mock_handler):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            persons = face_recog.list_known_persons()
-            
-            # Should exclude 'Unknown' and remove duplicates
-            assert sorted(persons) == ['Ahmed', 'Sara']
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR()
+        persons = face_recog.list_known_persons()
+        
+        # Should exclude 'Unknown' and remove duplicates
+        assert sorted(persons) == ['Ahmed', 'Sara']
+    
+    def test_records_snapshot_refreshed_after_mutation(self, HFR, monkeypatch):
+        """Test record queries share one snapshot until the database changes"""
+        mock_handler = Mock()
+        mock_handler.get_all_records.return_value = [
+            {'label': 'Ahmed', 'samples_json': ['s1']},
+            {'label': 'Sara', 'samples_json': ['s1']},
+        ]
+        
+        monkeypatch.setattr(_DB_HANDLER, Mock(return_value=mock_handler))
+        face_recog = HFR()
+        assert face_recog.list_known_persons() == ['Ahmed', 'Sara']
+        assert face_recog.get_database_stats()['total_persons'] == 2
+        assert mock_handler.get_all_records.call_count == 1
+        
+        mock_handler.get_record_by_label.return_value = {'global_id': 'person_2'}
+        assert face_recog.remove_person('Sara')
+        mock_handler.get_all_records.return_value = [{'label': 'Ahmed', 'samples_json': ['s1']}]
+        
+        assert face_recog.list_known_persons() == ['Ahmed']
+        assert face_recog.get_database_stats()['total_persons'] == 1
+        assert mock_handler.get_all_records.call_count == 2
     
-    def test_remove_person_when_disabled(self):
+    def test_remove_person_when_disabled(self, HFR, monkeypatch):
         """Test remove person returns False when disabled"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', None):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            result = face_recog.remove_person("Ahmed")
-            
-            assert result is False
-    
-    def test_clear_database_when_disabled(self):
+        monkeypatch.setattr(_DB_HANDLER, None)
+        face_recog = HFR()
+        result = face_recog.remove_person("Ahmed")
+        
+        assert result is False
+    
+    def test_clear_database_when_disabled(self, HFR, monkeypatch):
         """Test clear database does nothing when disabled"""
-        with patch('har_system.integrations.hailo_face_recognition.DatabaseHandler', None):
-            from har_system.integrations import HailoFaceRecognition
-            
-            face_recog = HailoFaceRecognition()
-            # Should not raise exception
-            face_recog.clear_database()
+        monkeypatch.setattr(_DB_HANDLER, None)
+        face_recog = HFR()
+        # Should not raise exception
+        assert face_recog.clear_database() is False
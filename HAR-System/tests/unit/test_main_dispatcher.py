@@ -8,6 +8,8 @@ from unittest.mock import Mock, patch, call
 
 
 @pytest.mark.unit
+@pytest.mark.xdist_group(name="dispatcher")
+@pytest.mark.usefixtures("app_modules")
 class TestMainDispatcher:
     """Test main CLI dispatcher logic"""
     
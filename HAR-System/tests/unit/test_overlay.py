@@ -1,11 +1,12 @@
 """
 Unit tests for `har_system.utils.overlay`.
 
-These tests verify that drawing helpers are safe (do not crash) and preserve frame shape.
+These tests verify that drawing helpers are safe (do not crash) and draw into the frame in place.
 """
 
 from __future__ import annotations
 
+import cv2
 import numpy as np
 import pytest
 
@@ -20,28 +21,225 @@ def test_get_overlay_is_singleton():
 
 
 @pytest.mark.unit
-def test_draw_person_info_does_not_crash_and_preserves_shape():
+def test_get_overlay_is_per_thread():
+    import threading
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_overlay()))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not get_overlay()
+
+
+@pytest.mark.unit
+def test_draw_person_info_draws_in_place():
     overlay = PersonOverlay()
-    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
     bbox = {"xmin": 0.1, "ymin": 0.2, "xmax": 0.3, "ymax": 0.6}
 
     out = overlay.draw_person_info(
-        frame=frame.copy(),
+        frame=frame,
         bbox=bbox,
         track_id=1,
         name="Unknown",
         confidence=0.0,
         activity="stationary",
     )
-    assert out.shape == frame.shape
+    assert out is frame
+    assert out.any()
 
 
 @pytest.mark.unit
-def test_draw_stats_does_not_crash_and_preserves_shape():
+def test_draw_stats_draws_in_place():
     overlay = PersonOverlay()
-    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
     stats = {"total_tracks_seen": 2, "total_falls_detected": 1, "total_activity_changes": 3}
 
-    out = overlay.draw_stats(frame.copy(), stats)
-    assert out.shape == frame.shape
+    out = overlay.draw_stats(frame, stats)
+    assert out is frame
+    assert out.any()
+
+
+@pytest.mark.unit
+def test_draw_stats_blends_only_the_stats_box_in_place():
+    overlay = PersonOverlay()
+    frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+
+    out = overlay.draw_stats(frame, {})
+
+    assert out is frame
+    # Box background is darkened to 30%; the rest of the frame is untouched
+    assert (frame[12, 432:435] == 30).all()
+    assert (frame[200:, :] == 100).all()
+    assert (frame[:, :420] == 100).all()
+
+
+@pytest.mark.unit
+def test_stats_snapshot_lines_are_cached_until_a_counter_changes():
+    from har_system.utils.overlay import StatsSnapshot
+
+    overlay = PersonOverlay()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    snapshot = StatsSnapshot(total_tracks_seen=2, total_falls_detected=1, total_activity_changes=3)
+
+    lines = snapshot.lines
+    assert lines == ("People: 2", "Falls: 1", "Changes: 3")
+    assert snapshot.lines is lines
+
+    out = overlay.draw_stats(frame.copy(), snapshot)
+    expected = overlay.draw_stats(frame.copy(), {"total_tracks_seen": 2, "total_falls_detected": 1,
+                                                 "total_activity_changes": 3})
+    assert np.array_equal(out, expected)
+
+    snapshot.total_falls_detected += 1
+    assert snapshot.lines == ("People: 2", "Falls: 2", "Changes: 3")
+
+
+@pytest.mark.unit
+def test_draw_persons_matches_per_person_drawing():
+    overlay = PersonOverlay()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    detections = [
+        ({"xmin": 0.1, "ymin": 0.2, "xmax": 0.3, "ymax": 0.6}, 1, "Unknown", 0.0, "stationary"),
+        ({"xmin": 0.5, "ymin": 0.3, "xmax": 0.8, "ymax": 0.9}, 2, "Ahmed", 0.87, "moving"),
+    ]
+
+    expected = frame.copy()
+    for bbox, track_id, name, confidence, activity in detections:
+        overlay.draw_person_info(expected, bbox, track_id, name, confidence, activity)
+    out = overlay.draw_persons(frame.copy(), detections)
+
+    assert np.array_equal(out, expected)
+
+
+@pytest.mark.unit
+def test_draw_persons_draws_labels_over_other_boxes():
+    overlay = PersonOverlay()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    # The second box's filled label background covers part of the first label
+    detections = [
+        ({"xmin": 0.1, "ymin": 0.3, "xmax": 0.5, "ymax": 0.9}, 1, "Unknown", 0.0, "stationary"),
+        ({"xmin": 0.1, "ymin": 0.32, "xmax": 0.5, "ymax": 0.9}, 2, "Unknown", 0.0, "stationary"),
+    ]
+
+    out = overlay.draw_persons(frame.copy(), detections)
+    sequential = frame.copy()
+    for bbox, track_id, name, confidence, activity in detections:
+        overlay.draw_person_info(sequential, bbox, track_id, name, confidence, activity)
+
+    white = np.all(out == 255, axis=2).sum()
+    assert white > np.all(sequential == 255, axis=2).sum()
+
+
+@pytest.mark.unit
+def test_label_cache_reuses_entries_and_is_bounded():
+    overlay = PersonOverlay()
+    overlay._label_cache_size = 2
+
+    first = overlay._label(1, "Ahmed", 0.874)
+    assert first[0] == "ID:1 Ahmed (87%)"
+    assert overlay._label(1, "Ahmed", 0.871) is first
+    assert overlay._label(2, "Unknown", 0.5)[0] == "ID:2"
+
+    overlay._label(3, "Sara", 0.0)
+    assert len(overlay._label_cache) == 2
+    assert (1, "Ahmed", 87) not in overlay._label_cache
+
+
+@pytest.mark.unit
+def test_overlay_worker_draws_frames_in_order():
+    from har_system.utils.overlay import OverlayWorker
+
+    out = []
+    worker = OverlayWorker(out.append, prefetch=2)
+    bbox = {"xmin": 0.1, "ymin": 0.2, "xmax": 0.3, "ymax": 0.6}
+    frames = [np.full((120, 160, 3), i, dtype=np.uint8) for i in range(5)]
+    for i, frame in enumerate(frames):
+        worker.submit(frame, [(bbox, i, "Unknown", 0.0, "moving")], stats={} if i == 0 else None)
+    worker.close(timeout=5)
+
+    assert [f is g for f, g in zip(out, frames)] == [True] * 5
+    assert all((f != i).any() for i, f in enumerate(out))
+
+
+@pytest.mark.unit
+def test_draw_stats_blits_prerendered_prefixes():
+    overlay = PersonOverlay()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    out = overlay.draw_stats(frame, {"total_tracks_seen": 7})
+
+    # The prefix area matches putText of the prefix alone on the blended background
+    x1, y1, _, _, _ = overlay._stats_layout(640, {})
+    org = (x1 + 10, y1 + 10 + 25)
+    tile, ox, oy, advance = overlay._stats_prefix_tiles[0]
+    ref = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(ref, "People: ", org, overlay.font, 0.5, (255, 255, 255), 1)
+    top, left = org[1] - oy, org[0] - ox
+    region = (slice(top, top + tile.shape[0]), slice(left, org[0] + advance - 4))
+    assert np.abs(out[region].astype(int) - ref[region].astype(int)).max() <= 1
+    # The number is drawn right after the prefix
+    assert out[org[1] - 12:org[1], org[0] + advance:org[0] + advance + 10].any()
+
+
+@pytest.mark.unit
+def test_compute_overlay_coords_places_labels_above_boxes():
+    from har_system.utils._coords import compute_overlay_coords
+
+    boxes = np.array([[64, 96, 192, 288], [10, 5, 50, 60]], dtype=np.int32)
+    text_wh = np.array([[40, 14], [90, 14]], dtype=np.int32)
+    act_wh = np.array([[70, 11], [30, 11]], dtype=np.int32)
+
+    coords = compute_overlay_coords(boxes, text_wh, act_wh)
+
+    assert coords.tolist() == [[56, 144, 91, 75, 91], [0, 110, 0, -16, 0]]
+
+
+@pytest.mark.unit
+def test_offscreen_and_empty_boxes_are_not_drawn():
+    overlay = PersonOverlay()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    hidden = [
+        ({"xmin": 1.2, "ymin": 0.2, "xmax": 1.4, "ymax": 0.6}, 1, "Unknown", 0.0, "moving"),
+        ({"xmin": 0.3, "ymin": 0.4, "xmax": 0.3, "ymax": 0.6}, 2, "Unknown", 0.0, "moving"),
+        ({"xmin": -0.5, "ymin": 0.2, "xmax": -0.1, "ymax": 0.6}, 3, "Unknown", 0.0, "moving"),
+    ]
+    shown = ({"xmin": 0.1, "ymin": 0.2, "xmax": 0.3, "ymax": 0.6}, 4, "Unknown", 0.0, "moving")
+
+    assert not overlay.draw_persons(frame.copy(), hidden).any()
+    assert not overlay.draw_person_info(frame.copy(), *hidden[0]).any()
+
+    expected = overlay.draw_person_info(frame.copy(), *shown)
+    assert np.array_equal(overlay.draw_persons(frame.copy(), hidden + [shown]), expected)
+
+
+@pytest.mark.unit
+def test_bbox_namedtuple_draws_like_a_dict():
+    from har_system.utils.overlay import Bbox
+
+    overlay = PersonOverlay()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    as_dict = {"xmin": 0.1, "ymin": 0.2, "xmax": 0.3, "ymax": 0.6}
+    as_tuple = Bbox(0.1, 0.2, 0.3, 0.6)
+
+    expected = overlay.draw_person_info(frame.copy(), as_dict, 1, "Ahmed", 0.9, "moving")
+    assert np.array_equal(overlay.draw_person_info(frame.copy(), as_tuple, 1, "Ahmed", 0.9, "moving"), expected)
+    assert np.array_equal(overlay.draw_persons(frame.copy(), [(as_tuple, 1, "Ahmed", 0.9, "moving")]), expected)
+
+
+@pytest.mark.unit
+def test_repeated_inputs_reuse_the_layout():
+    overlay = PersonOverlay()
+    detections = [({"xmin": 0.1, "ymin": 0.2, "xmax": 0.3, "ymax": 0.6}, 1, "Ahmed", 0.9, "moving")]
+    first = overlay.draw_persons(np.zeros((480, 640, 3), dtype=np.uint8), detections)
+    calls = overlay._layout_calls
+
+    # A new frame with the same persons reuses the draw calls but still gets drawn
+    second = overlay.draw_persons(np.zeros((480, 640, 3), dtype=np.uint8), list(detections))
+    assert overlay._layout_calls is calls
+    assert np.array_equal(first, second)
 
+    moved = [({"xmin": 0.5, "ymin": 0.2, "xmax": 0.7, "ymax": 0.6}, 1, "Ahmed", 0.9, "moving")]
+    overlay.draw_persons(np.zeros((480, 640, 3), dtype=np.uint8), moved)
+    assert overlay._layout_calls is not calls
@@ -7,12 +7,10 @@ logic without requiring video input or external dependencies.
 
 from __future__ import annotations
 
-import time
-
 import numpy as np
 import pytest
 
-from har_system.core.tracker import TemporalActivityTracker
+from har_system.core.tracker import FrameData, TemporalActivityTracker
 
 
 def _frame_data(timestamp: float, bbox: dict, keypoints: dict, confidence: float = 0.95) -> dict:
@@ -26,12 +24,16 @@ def _frame_data(timestamp: float, bbox: dict, keypoints: dict, confidence: float
 
 def _bbox_from_center(cx: float, cy: float, height: float = 250.0, width: float = 80.0) -> dict:
     # tracker expects bbox values in the same coordinate system as keypoints (arbitrary pixels OK)
-    return {
-        "xmin": cx - width / 2,
-        "ymin": cy - height,
-        "xmax": cx + width / 2,
-        "ymax": cy,
-    }
+    return _set_bbox_center({}, cx, cy, height, width)
+
+
+def _set_bbox_center(bbox: dict, cx: float, cy: float, height: float = 250.0, width: float = 80.0) -> dict:
+    """Fill `bbox` in place; the tracker copies the values, so loops can reuse one dict."""
+    bbox["xmin"] = cx - width / 2
+    bbox["ymin"] = cy - height
+    bbox["xmax"] = cx + width / 2
+    bbox["ymax"] = cy
+    return bbox
 
 
 def _keypoints_basic(cx: float, cy: float, standing: bool = True) -> dict:
@@ -55,10 +57,22 @@ def _keypoints_basic(cx: float, cy: float, standing: bool = True) -> dict:
     }
 
 
+@pytest.fixture(scope="module")
+def _shared_tracker() -> TemporalActivityTracker:
+    return TemporalActivityTracker(history_seconds=5.0, fps_estimate=30)
+
+
+@pytest.fixture
+def tracker(_shared_tracker):
+    """A 5 s tracker reused across tests; reset before each so no state leaks between them."""
+    _shared_tracker.reset()
+    return _shared_tracker
+
+
 @pytest.mark.unit
 def test_tracker_creates_new_track_and_updates_global_stats():
     tracker = TemporalActivityTracker(history_seconds=3.0, fps_estimate=15)
-    t0 = time.time()
+    t0 = 1000.0
     bbox = _bbox_from_center(300, 400)
     kp = _keypoints_basic(300, 400, standing=True)
 
@@ -71,66 +85,36 @@ def test_tracker_creates_new_track_and_updates_global_stats():
 
 
 @pytest.mark.unit
-def test_tracker_stationary_classification_with_small_motion():
-    tracker = TemporalActivityTracker(history_seconds=5.0, fps_estimate=15)
-    t0 = 1000.0
-    cx, cy = 300.0, 400.0
-
-    # Feed enough frames to pass classification window (>=10 positions).
-    for i in range(20):
+@pytest.mark.parametrize(
+    "n_frames, centers, standing, expected",
+    [
         # Very small jitter to remain below stationary threshold.
-        jitter_x = 0.2 * np.sin(i)
-        jitter_y = 0.2 * np.cos(i)
-        ts = t0 + i * (1.0 / 15.0)
-        bbox = _bbox_from_center(cx + jitter_x, cy + jitter_y)
-        kp = _keypoints_basic(cx + jitter_x, cy + jitter_y, standing=True)
-        tracker.update(1, _frame_data(ts, bbox, kp))
-
-    summary = tracker.get_summary(1)
-    assert summary is not None
-    assert summary["current_activity"] == "stationary"
-
-
-@pytest.mark.unit
-def test_tracker_moving_classification_with_clear_motion():
-    tracker = TemporalActivityTracker(history_seconds=5.0, fps_estimate=15)
-    t0 = 2000.0
-    cy = 400.0
-
-    for i in range(25):
+        (20, lambda i: (300.0 + 0.2 * np.sin(i), 400.0 + 0.2 * np.cos(i)), True, "stationary"),
         # Move 5 px per frame -> should be moving.
-        cx = 100.0 + i * 5.0
-        ts = t0 + i * (1.0 / 15.0)
-        bbox = _bbox_from_center(cx, cy)
-        kp = _keypoints_basic(cx, cy, standing=True)
-        tracker.update(1, _frame_data(ts, bbox, kp))
-
-    summary = tracker.get_summary(1)
-    assert summary is not None
-    assert summary["current_activity"] == "moving"
-
-
-@pytest.mark.unit
-def test_tracker_sitting_classification_with_high_hip_ratio():
-    tracker = TemporalActivityTracker(history_seconds=5.0, fps_estimate=15)
-    t0 = 3000.0
-    cx, cy = 300.0, 400.0
-
-    for i in range(25):
-        ts = t0 + i * (1.0 / 15.0)
+        (25, lambda i: (100.0 + i * 5.0, np.full(len(i), 400.0)), True, "moving"),
         # Sitting: keep position stable.
-        bbox = _bbox_from_center(cx, cy, height=180.0)
-        kp = _keypoints_basic(cx, cy, standing=False)
-        tracker.update(1, _frame_data(ts, bbox, kp))
+        (25, lambda i: (np.full(len(i), 300.0), np.full(len(i), 400.0)), False, "sitting"),
+    ],
+    ids=["stationary", "moving", "sitting"],
+)
+def test_tracker_classifies_activity(tracker, n_frames, centers, standing, expected):
+    # Feed enough frames to pass classification window (>=10 positions).
+    steps = np.arange(n_frames)
+    xs, ys = centers(steps)
+    timestamps = 1000.0 + steps * (1.0 / 15.0)
+    height = 250.0 if standing else 180.0
+    bbox = {}
+    for x, y, ts in zip(xs.tolist(), ys.tolist(), timestamps.tolist()):
+        kp = _keypoints_basic(x, y, standing=standing)
+        tracker.update(1, _frame_data(ts, _set_bbox_center(bbox, x, y, height=height), kp))
 
     summary = tracker.get_summary(1)
     assert summary is not None
-    assert summary["current_activity"] == "sitting"
+    assert summary["current_activity"] == expected
 
 
 @pytest.mark.unit
-def test_tracker_detects_fall_on_rapid_pose_height_drop():
-    tracker = TemporalActivityTracker(history_seconds=5.0, fps_estimate=30)
+def test_tracker_detects_fall_on_rapid_pose_height_drop(tracker, caplog):
     t0 = 4000.0
     cx, cy = 300.0, 400.0
 
@@ -138,22 +122,356 @@ def test_tracker_detects_fall_on_rapid_pose_height_drop():
     # Use a constant bbox but change nose y to simulate a sudden drop.
     bbox = _bbox_from_center(cx, cy, height=250.0)
 
+    # The tracker copies keypoints into its buffers, so both poses are built once.
+    kp = _keypoints_basic(cx, cy, standing=True)
+    ankle_y = (kp["left_ankle"][1] + kp["right_ankle"][1]) / 2
+    # Overwrite nose y near ankle y to reduce pose height drastically.
+    fallen_kp = dict(kp, nose=(cx, ankle_y - 5, 0.9))
+
     # High pose height for first frames (nose far from ankles).
     for i in range(10):
         ts = t0 + i * 0.02  # 50 FPS simulated (short dt)
-        kp = _keypoints_basic(cx, cy, standing=True)
         tracker.update(1, _frame_data(ts, bbox, kp))
 
     # Sudden drop: move nose close to ankles.
     for i in range(10, 20):
         ts = t0 + i * 0.02
-        kp = _keypoints_basic(cx, cy, standing=True)
-        # Overwrite nose y near ankle y to reduce pose height drastically.
-        ankle_y = (kp["left_ankle"][1] + kp["right_ankle"][1]) / 2
-        kp["nose"] = (cx, ankle_y - 5, 0.9)
-        tracker.update(1, _frame_data(ts, bbox, kp))
+        tracker.update(1, _frame_data(ts, bbox, fallen_kp))
 
     summary = tracker.get_summary(1)
     assert summary is not None
     assert summary["stats"]["fall_detected"] is True
+    assert any(r.levelname == "WARNING" and "Potential fall" in r.getMessage() for r in caplog.records)
+
+
+@pytest.mark.unit
+def test_tracker_accepts_slotted_frame_data():
+    tracker = TemporalActivityTracker(history_seconds=3.0, fps_estimate=15)
+    bbox = _bbox_from_center(300, 400)
+    kp = _keypoints_basic(300, 400, standing=True)
+    frame_data = FrameData(1, 5000.0, bbox, kp, 0.9)
+
+    assert frame_data["bbox"] is bbox
+    tracker.update(frame_data.track_id, frame_data)
+
+    summary = tracker.get_summary(1)
+    assert summary is not None
+    assert summary["total_frames"] == 1
+
+
+@pytest.mark.unit
+def test_tracker_ring_buffers_keep_latest_history_in_order():
+    tracker = TemporalActivityTracker(history_seconds=1.0, fps_estimate=10)
+    kp = _keypoints_basic(300, 400, standing=True)
+
+    for i in range(25):
+        tracker.update(1, _frame_data(6000.0 + i, _bbox_from_center(300 + i, 400), kp))
+
+    export = tracker.export_track_data(1)
+    assert export["raw_data"]["timestamps"] == [6000.0 + i for i in range(15, 25)]
+    assert export["current_state"]["last_position"] == [324.0, 275.0]
+    assert export["current_state"]["last_bbox"] == _bbox_from_center(324, 400)
+
 
+@pytest.mark.unit
+@pytest.mark.parametrize("compiled", [False, True], ids=["python", "numba"])
+def test_window_stats_kernel_matches_numpy_features(compiled):
+    from har_system.core import tracker as tracker_module
+
+    if compiled:
+        pytest.importorskip("numba")
+        kernel_fn = tracker_module._native_window_stats
+    else:
+        kernel_fn = tracker_module._window_stats
+    tracker = TemporalActivityTracker(history_seconds=1.0, fps_estimate=20)
+    rng = np.random.default_rng(7)
+    t0 = 7000.0
+
+    for i in range(35):
+        cx, cy = 300.0 + rng.normal(scale=4.0), 400.0
+        kp = _keypoints_basic(cx, cy, standing=bool(i % 3))
+        # Missing keypoints give NaN pose heights and hip ratios that the kernel must skip
+        if i % 4 == 0:
+            del kp["nose"]
+        if i % 5 == 0:
+            del kp["left_hip"]
+        tracker.update(1, _frame_data(t0 + i * 0.03, _bbox_from_center(cx, cy), kp))
+
+        track = tracker.tracks[1]
+        kernel = kernel_fn(
+            track["timestamps"], track["positions"], track["steps"], track["heights"],
+            track["inv_heights"], track["pose_heights"], track["keypoints"],
+            track["head"], track["count"], 10, 30, 5, 15,
+        )
+        speed = tracker._calculate_normalized_speed(track, 10)
+        classify_speed = tracker._calculate_normalized_speed(track, 30)
+        drop_ratio, fall_dt = tracker._fall_drop_ratio(track, 15)
+        expected = (speed, classify_speed, tracker._average_hip_ratio(track, 5), drop_ratio, fall_dt,
+                    tracker._fall_horizontal_speed(track, 15))
+        assert kernel == pytest.approx(expected, rel=1e-5, nan_ok=True)
+
+
+@pytest.mark.unit
+def test_update_batch_matches_per_track_updates():
+    single = TemporalActivityTracker(history_seconds=2.0, fps_estimate=15)
+    batched = TemporalActivityTracker(history_seconds=2.0, fps_estimate=15)
+    t0 = 8000.0
+
+    for i in range(40):
+        ts = t0 + i * 0.066
+        people = {
+            1: (300.0 + i * 8.0, 400.0, True),   # moving
+            2: (600.0, 400.0, False),            # sitting
+            3: (900.0, 400.0, True),             # stationary, enters late
+        }
+        if i < 5:
+            del people[3]
+        frames = [
+            (tid, _bbox_from_center(cx, cy, height=250.0 if standing else 180.0),
+             _keypoints_basic(cx, cy, standing=standing))
+            for tid, (cx, cy, standing) in people.items()
+        ]
+
+        if i == 30:
+            # Everything reads as moving from here on: sitting/stationary tracks change activity
+            single.thresholds["speed_stationary"] = batched.thresholds["speed_stationary"] = -1.0
+        expected = [single.update(tid, _frame_data(ts, bbox, kp)) for tid, bbox, kp in frames]
+        activities = batched.update_batch(
+            [tid for tid, _, _ in frames],
+            [[bbox[k] for k in ("xmin", "ymin", "xmax", "ymax")] for _, bbox, _ in frames],
+            [kp for _, _, kp in frames],
+            [0.95] * len(frames),
+            ts,
+        )
+        assert activities == expected
+
+        if i == 29:
+            assert batched.get_activity(1) == "moving"
+            assert batched.get_activity(2) == "sitting"
+            assert batched.get_activity(3) == "stationary"
+
+    for tid in (1, 2, 3):
+        assert batched.get_activity(tid) == "moving"
+        assert batched.get_summary(tid)["stats"] == pytest.approx(single.get_summary(tid)["stats"])
+        assert batched.get_summary(tid)["activity_history"] == single.get_summary(tid)["activity_history"]
+        assert batched.detect_activity_change(tid) == single.detect_activity_change(tid)
+    assert batched.get_summary(2)["activity_history"][0]["from"] == "sitting"
+    assert batched.get_global_stats() == single.get_global_stats()
+
+
+@pytest.mark.unit
+def test_activity_change_log_grows_and_reports_names():
+    tracker = TemporalActivityTracker(history_seconds=3.0, fps_estimate=15)
+    bbox = _bbox_from_center(300, 400)
+    kp = _keypoints_basic(300, 400, standing=True)
+    t0 = 9000.0
+
+    for i in range(10):
+        tracker.update(1, _frame_data(t0 + i * 0.066, bbox, kp))
+    assert tracker.get_activity(1) == "stationary"
+
+    # Flip the stationary threshold every frame to force 20 activity changes
+    for i in range(10, 30):
+        tracker.thresholds["speed_stationary"] = -1.0 if i % 2 == 0 else 0.1
+        tracker.update(1, _frame_data(t0 + i * 0.066, bbox, kp))
+
+    summary = tracker.get_summary(1)
+    assert summary["stats"]["total_activity_changes"] == 20
+    assert tracker.get_global_stats()["total_activity_changes"] == 20
+    assert [c["to"] for c in summary["activity_history"]] == ["stationary", "moving"] * 2 + ["stationary"]
+    assert summary["activity_history"][-1]["timestamp"] == pytest.approx(t0 + 29 * 0.066)
+
+    change = tracker.detect_activity_change(1)
+    assert change["from"] == "moving" and change["to"] == "stationary"
+
+    changes = tracker.export_track_data(1)["statistics"]["activity_changes"]
+    assert len(changes) == 20
+    assert changes[0] == {"timestamp": t0 + 10 * 0.066, "from": "stationary", "to": "moving"}
+
+
+@pytest.mark.unit
+def test_inactive_tracks_are_deactivated_and_reaped_after_ttl():
+    tracker = TemporalActivityTracker(history_seconds=1.0, fps_estimate=10, track_ttl=5.0)
+    bbox = _bbox_from_center(300, 400)
+    kp = _keypoints_basic(300, 400, standing=True)
+    t0 = 10000.0
+
+    tracker.update(1, _frame_data(t0, bbox, kp))
+    tracker.update(2, _frame_data(t0, bbox, kp))
+    assert tracker.get_all_active_tracks() == [1, 2]
+
+    # Track 1 leaves the scene; track 2 keeps being observed
+    for i in range(1, 9):
+        tracker.update(2, _frame_data(t0 + i, bbox, kp))
+        if i == 3:
+            assert tracker.get_all_active_tracks() == [2]
+            assert 1 in tracker.tracks
+
+    assert tracker.get_all_active_tracks() == [2]
+    assert 1 not in tracker.tracks
+    assert tracker.get_global_stats()["total_tracks_seen"] == 2
+
+
+@pytest.mark.unit
+def test_tracks_expire_when_the_scene_empties():
+    tracker = TemporalActivityTracker(history_seconds=1.0, fps_estimate=10, track_ttl=5.0)
+    bbox = _bbox_from_center(300, 400)
+    kp = _keypoints_basic(300, 400, standing=True)
+    expired = []
+    tracker.on_expire = lambda track_id, snapshot: expired.append((track_id, snapshot))
+    t0 = 10500.0
+
+    for i in range(5):
+        tracker.update(1, _frame_data(t0 + i * 0.1, bbox, kp))
+
+    # Nobody in the frame from here on: only empty batches / ticks advance the clock
+    for i in range(1, 4):
+        tracker.update_batch([], [], [], [], t0 + i)
+    assert tracker.get_all_active_tracks() == []
+    assert 1 in tracker.tracks
+
+    for i in range(4, 8):
+        tracker.tick(t0 + i)
+    assert 1 not in tracker.tracks
+    assert [track_id for track_id, _ in expired] == [1]
+    assert expired[0][1]["metadata"]["total_frames"] == 5
+
+
+@pytest.mark.unit
+def test_save_to_json_writes_array_snapshot(tmp_path):
+    import json
+
+    tracker = TemporalActivityTracker(history_seconds=1.0, fps_estimate=10)
+    kp = _keypoints_basic(300, 400, standing=True)
+    for i in range(12):
+        tracker.update(1, _frame_data(11000.0 + i, _bbox_from_center(300 + i, 400), kp))
+
+    snapshot = tracker.export_track_data(1, raw_arrays=True)
+    assert isinstance(snapshot["raw_data"]["positions"], np.ndarray)
+
+    # The snapshot must not change when the track keeps updating
+    tracker.update(1, _frame_data(11012.0, _bbox_from_center(400, 400), kp))
+    path = tmp_path / "track_1.json"
+    tracker.save_to_json(1, str(path), data=snapshot)
+
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["raw_data"]["timestamps"] == [11000.0 + i for i in range(2, 12)]
+    assert saved["raw_data"]["positions"][-1] == [311.0, 275.0]
+    assert saved["current_state"]["activity"] == "stationary"
+
+
+@pytest.mark.unit
+def test_keypoint_dict_conversion_handles_full_and_partial_dicts():
+    from har_system.core.tracker import KEYPOINT_NAMES, _kp_dict_to_array
+
+    full = {name: (float(i), float(i) + 0.5, 0.9) for i, name in enumerate(KEYPOINT_NAMES)}
+    reordered = dict(reversed(list(full.items())))
+    np.testing.assert_array_equal(_kp_dict_to_array(full), _kp_dict_to_array(reordered))
+    assert _kp_dict_to_array(full)[16].tolist() == [16.0, 16.5, pytest.approx(0.9)]
+
+    partial = _kp_dict_to_array({"left_hip": (1.0, 2.0, 0.8), "unknown_point": (9.0, 9.0, 1.0)})
+    assert partial[11].tolist() == [1.0, 2.0, pytest.approx(0.8)]
+    assert np.isnan(partial[0]).all()
+    assert np.isnan(np.delete(partial, 11, axis=0)).all()
+
+
+@pytest.mark.unit
+def test_thresholds_keep_dict_style_access():
+    tracker = TemporalActivityTracker()
+    thresholds = tracker.thresholds
+
+    thresholds.update({"speed_stationary": 0.2, "not_a_threshold": 1.0})
+    thresholds["fall_drop_ratio"] = "0.4"
+
+    assert thresholds.speed_stationary == thresholds["speed_stationary"] == 0.2
+    assert thresholds.get("fall_drop_ratio") == 0.4
+    assert thresholds.get("not_a_threshold", 7.0) == 7.0
+    assert "hip_ratio_sitting" in thresholds and "not_a_threshold" not in thresholds
+    assert thresholds.as_dict()["fall_time_threshold"] == 0.5
+    with pytest.raises(KeyError):
+        thresholds["not_a_threshold"] = 1.0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("drift_per_frame, expected", [(0.0, False), (10.0, True)])
+def test_fall_requires_horizontal_motion_when_threshold_is_set(drift_per_frame, expected):
+    tracker = TemporalActivityTracker(history_seconds=5.0, fps_estimate=30)
+    tracker.thresholds["fall_horizontal_speed"] = 0.5
+    cy = 400.0
+
+    for i in range(20):
+        cx = 300.0 + drift_per_frame * i
+        kp = _keypoints_basic(cx, cy, standing=True)
+        if i >= 10:
+            ankle_y = (kp["left_ankle"][1] + kp["right_ankle"][1]) / 2
+            kp["nose"] = (cx, ankle_y - 5, 0.9)
+        tracker.update(1, _frame_data(12000.0 + i * 0.02, _bbox_from_center(cx, cy), kp))
+
+    assert tracker.get_summary(1)["stats"]["fall_detected"] is expected
+
+
+@pytest.mark.unit
+def test_reset_forgets_tracks_and_statistics():
+    tracker = TemporalActivityTracker(history_seconds=1.0, fps_estimate=10)
+    kp = _keypoints_basic(300, 400, standing=True)
+    for i in range(12):
+        tracker.update(1, _frame_data(14000.0 + i, _bbox_from_center(300 + 20 * i, 400), kp))
+    tracker.thresholds["speed_stationary"] = 0.2
+
+    tracker.reset()
+
+    assert tracker.get_global_stats() == {
+        "total_tracks_seen": 0, "active_tracks": 0, "total_falls_detected": 0, "total_activity_changes": 0,
+    }
+    assert tracker.get_summary(1) is None
+    assert tracker.thresholds["speed_stationary"] == 0.2
+
+    tracker.update(1, _frame_data(100.0, _bbox_from_center(300, 400), kp))
+    assert tracker.get_global_stats()["total_tracks_seen"] == 1
+    assert tracker.get_summary(1)["total_frames"] == 1
+
+
+@pytest.mark.unit
+def test_activity_change_log_is_capped_but_counts_every_change():
+    from har_system.core import tracker as tracker_module
+
+    tracker = TemporalActivityTracker()
+    track = tracker.tracks[1]
+    cap = tracker_module._CHANGE_LOG_SIZE
+    for i in range(cap + 36):
+        tracker._record_change(track, float(i), 1 + i % 2, 2 - i % 2)
+
+    history = tracker._change_dicts(track)
+    assert track["n_changes"] == cap + 36
+    assert len(history) == cap
+    assert [c["timestamp"] for c in history] == [float(i) for i in range(36, cap + 36)]
+    assert tracker._change_dicts(track, last=2) == [
+        {"timestamp": float(cap + 34), "from": "stationary", "to": "moving"},
+        {"timestamp": float(cap + 35), "from": "moving", "to": "stationary"},
+    ]
+
+
+@pytest.mark.unit
+def test_summary_frame_percentages_partition_frames_and_distance_is_normalized():
+    tracker = TemporalActivityTracker(history_seconds=5.0, fps_estimate=15)
+    t0 = 13000.0
+
+    # 20 walking frames (10 px per frame at bbox height 250), then 60 sitting frames
+    for i in range(20):
+        cx = 300.0 + 10.0 * i
+        tracker.update(1, _frame_data(t0 + i / 15.0, _bbox_from_center(cx, 400.0),
+                                      _keypoints_basic(cx, 400.0, standing=True)))
+    walked = tracker.get_summary(1)["stats"]["total_distance_normalized"]
+    assert walked == pytest.approx(19 * 10.0 / 250.0)
+
+    for i in range(20, 80):
+        tracker.update(1, _frame_data(t0 + i / 15.0, _bbox_from_center(490.0, 400.0, height=180.0),
+                                      _keypoints_basic(490.0, 400.0, standing=False)))
+
+    stats = tracker.get_summary(1)["stats"]
+    assert tracker.get_activity(1) == "sitting"
+    assert stats["percent_moving"] + stats["percent_stationary"] + stats["percent_sitting"] == pytest.approx(100.0)
+    assert stats["percent_moving"] > 20.0
+    assert stats["percent_sitting"] > 30.0
+    # Only the bbox-center shift when sitting down (height 250 -> 180) adds distance
+    assert stats["total_distance_normalized"] == pytest.approx(walked + 35.0 / 180.0)